@@ -0,0 +1,150 @@
+"""
+Codificação das respostas grandes (fetch e process-sources)
+- JSON com orjson quando instalado (senão json da stdlib, compacto)
+- gzip/brotli negociados por Accept-Encoding acima de RESPONSE_COMPRESSION_MIN_BYTES
+- fields=: projeção dos campos de cada vídeo
+- format=columnar|msgpack: vídeos agrupados por fonte, campos da fonte uma vez só
+brotli e msgpack são opcionais (pip install brotli msgpack)
+"""
+import gzip
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from app.core.config import get_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+settings = get_settings()
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+FORMATS = ("json", "columnar", "msgpack")
+
+# Campos de um vídeo no fetch; os da fonte se repetem em todas as linhas
+VIDEO_FIELDS = (
+    "platform", "external_id", "external_video_id", "title", "url",
+    "duration", "view_count", "group_name", "fetched_at"
+)
+SOURCE_FIELDS = ("platform", "external_id", "group_name")
+
+# Acima disso a compressão sai do event loop
+_THREAD_THRESHOLD = 256 * 1024
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse com orjson (usada como resposta padrão do app)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """fields=external_video_id,title -> lista validada (None = todos)"""
+    if not fields:
+        return None
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in VIDEO_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}; allowed: {list(VIDEO_FIELDS)}")
+    return selected
+
+
+def project(videos: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Mantém só os campos pedidos; entradas de erro passam inteiras"""
+    if not fields:
+        return videos
+    return [
+        video if "error" in video else {name: video.get(name) for name in fields}
+        for video in videos
+    ]
+
+
+def columnar(videos: List[Dict], fields: Optional[List[str]]) -> Dict:
+    """Uma fonte: lista de nomes de campos + linhas (sem os campos da fonte)"""
+    names = [name for name in (fields or VIDEO_FIELDS) if name not in SOURCE_FIELDS]
+    return {
+        "fields": names,
+        "rows": [[video.get(name) for name in names] for video in videos if "error" not in video],
+    }
+
+
+def response_format(request: Request, output: Optional[str]) -> str:
+    """format= explícito ou Accept: application/msgpack"""
+    if not output:
+        output = "msgpack" if MSGPACK_MEDIA_TYPE in request.headers.get("accept", "") else "json"
+    if output not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {output!r}; allowed: {list(FORMATS)}")
+    if output == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=406, detail="msgpack output is not available (msgpack not installed)")
+    return output
+
+
+def _negotiate(accept_encoding: str) -> Optional[str]:
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            offered[token] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+
+
+async def encoded_response(request: Request, content: Any, output: str = "json") -> Response:
+    """
+    Serializa (JSON ou msgpack) e comprime conforme Accept-Encoding
+    Corpos pequenos vão sem compressão (não compensa o custo)
+    """
+    if output == "msgpack":
+        body = msgpack.packb(content, default=str, use_bin_type=True)
+        media_type = MSGPACK_MEDIA_TYPE
+    else:
+        body = dumps(content)
+        media_type = "application/json"
+
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if len(body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = _negotiate(request.headers.get("accept-encoding", ""))
+    if encoding:
+        if len(body) >= _THREAD_THRESHOLD:
+            body = await asyncio.to_thread(_compress, body, encoding)
+        else:
+            body = _compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
@@ -1,19 +1,24 @@
 """
-Endpoint de confirmação de publicação - simplificado (stateless)
-Apenas retorna confirmação, histórico gerenciado no n8n/Google Sheets
+Endpoint de confirmação de publicação
+Registra o estado por destino (usado pelo ranking do /v1/select) e marca o arquivo como publicado (retenção)
 """
+import asyncio
 from fastapi import APIRouter
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
+from app.core.config import get_settings
+from app.services.media.store import get_media_index
+from app.services.selection.store import get_candidate_store
 
 router = APIRouter()
+settings = get_settings()
 
 class ConfirmPublishRequest(BaseModel):
     """Request para confirmar publicação"""
     video_id: str
     destination_platform: str
     destination_account_id: str
-    result: str  # success, error
+    result: Literal["success", "error"]
     platform_post_id: Optional[str] = None
     error_message: Optional[str] = None
 
@@ -21,8 +26,25 @@ class ConfirmPublishRequest(BaseModel):
 async def confirm_publish(request: ConfirmPublishRequest):
     """
     Confirma publicação de um vídeo
-    Retorna confirmação - histórico deve ser salvo no n8n/Google Sheets
+    Sucesso tira o vídeo da seleção deste destino; erro conta tentativa (até SELECT_MAX_PUBLISH_ATTEMPTS)
+    Com todos os destinos resolvidos (nenhum selected ou error com tentativas sobrando) e ao menos
+    um sucesso, marca o arquivo como publicado e remove o pin (pode ser liberado pela retenção)
     """
+    publication = await asyncio.to_thread(
+        get_candidate_store().record_publish,
+        request.video_id,
+        request.destination_platform,
+        request.destination_account_id,
+        request.result,
+        platform_post_id=request.platform_post_id,
+        error_message=request.error_message
+    )
+    settled = await asyncio.to_thread(
+        get_candidate_store().publish_settled, request.video_id, settings.SELECT_MAX_PUBLISH_ATTEMPTS
+    )
+    if settled:
+        await asyncio.to_thread(get_media_index().mark_published, request.video_id)
+
     return {
         "status": "confirmed",
         "message": f"Publish {request.result} confirmed for video {request.video_id}",
@@ -31,6 +53,7 @@ async def confirm_publish(request: ConfirmPublishRequest):
             "destination": f"{request.destination_platform}/{request.destination_account_id}",
             "result": request.result,
             "platform_post_id": request.platform_post_id,
-            "error_message": request.error_message
+            "error_message": request.error_message,
+            "attempts": publication["attempts"]
         }
     }
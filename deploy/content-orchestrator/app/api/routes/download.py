@@ -1,13 +1,22 @@
 """
-Endpoint de download - stateless
-Recebe dados do vídeo e faz download
+Endpoint de download
+Recebe dados do vídeo, enfileira o download e expõe o estado do job
 """
-from fastapi import APIRouter, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional
+import uuid
+import asyncio
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from app.core.config import get_settings
+from app.services.downloader.limits import download_host
+from app.services.downloader.paths import plan_path
+from app.services.downloader.profiles import PROFILE_FIELDS, all_profiles, resolve_profile
 from app.services.downloader.service import DownloaderService
+from app.services.executor.service import get_executor
+from app.services.jobs.service import get_download_queue
 
 router = APIRouter()
+settings = get_settings()
 
 class DownloadRequest(BaseModel):
     """Request para download"""
@@ -16,29 +25,197 @@ class DownloadRequest(BaseModel):
     external_video_id: str
     group_name: Optional[str] = None
     source_name: Optional[str] = None
+    title: Optional[str] = None  # Com título, o caminho final já volta na resposta
+    callback_url: Optional[str] = None  # Recebe POST com o job ao terminar
+    priority: int = 0  # Maior primeiro
+    postprocess: Optional[Dict[str, Any]] = None  # Ex: {"preset": "watermark"}; enfileira após o download
+    profile: Optional[str] = None  # Perfil de download (padrão: do grupo ou da plataforma)
+
+class BatchDownloadRequest(BaseModel):
+    """Request para vários downloads de uma vez"""
+    items: List[DownloadRequest] = Field(..., min_length=1)
+
+class PlanRequest(BaseModel):
+    """Request para calcular o caminho final de um vídeo"""
+    external_video_id: str
+    platform: str
+    group_name: Optional[str] = None
+    source_name: Optional[str] = None
+    title: Optional[str] = None
+    video_url: Optional[str] = None  # Sem título, busca os metadados (cache reaproveitado no download)
+
+class BatchPlanRequest(BaseModel):
+    """Request para planejar vários caminhos de uma vez (sem extração de metadados)"""
+    items: List[PlanRequest] = Field(..., min_length=1)
+
+def _plan(request) -> Dict:
+    """Reserva o caminho no índice de mídias (SQLite): chamar fora do event loop"""
+    return plan_path(
+        request.external_video_id,
+        request.platform,
+        request.group_name,
+        request.source_name,
+        request.title
+    )
+
+def _resolve_profile(request: DownloadRequest) -> str:
+    try:
+        return resolve_profile(request.platform, request.group_name, request.profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _enqueue(request: DownloadRequest, batch_id: Optional[str] = None, check_capacity: bool = True) -> Dict:
+    """
+    Novo job, ou o job queued/running do mesmo vídeo e perfil (deduplicated=True)
+    No job reaproveitado valem callback_url e prioridade do pedido original
+    """
+    # Perfil resolvido na hora do pedido: o job mostra qual foi usado
+    payload = request.model_dump(exclude={"callback_url", "priority"})
+    payload["profile"] = _resolve_profile(request)
+    return get_download_queue().enqueue(
+        payload=payload,
+        priority=request.priority,
+        callback_url=request.callback_url,
+        video_id=request.external_video_id,
+        host=download_host(request.video_url),
+        batch_id=batch_id,
+        check_capacity=check_capacity,
+        unique=True
+    )
 
 @router.post("")
-async def download_content(
-    request: DownloadRequest,
-    background_tasks: BackgroundTasks
-):
+async def download_content(request: DownloadRequest):
     """
-    Faz download de um vídeo
+    Enfileira o download de um vídeo
     Organiza por grupo/fonte se fornecido
+    Retorna job_id para acompanhar em GET /v1/download/{job_id}
+    Vídeo já na fila com o mesmo perfil: devolve o job existente (deduplicated)
+    Com title, retorna também o caminho final do arquivo
+    Retorna 503 se a fila do yt-dlp da plataforma estiver cheia
     """
-    downloader = DownloaderService()
-    
-    # Executar em background
-    background_tasks.add_task(
-        downloader.download_video,
-        video_url=request.video_url,
-        platform=request.platform,
-        external_video_id=request.external_video_id,
-        group_name=request.group_name,
-        source_name=request.source_name
-    )
-    
+    get_executor().check_capacity(request.platform)
+    path = (await asyncio.to_thread(_plan, request))["path"] if request.title else None
+    job = await asyncio.to_thread(_enqueue, request)
+
+    return {
+        "status": job["state"],
+        "message": f"Download iniciado para {request.external_video_id}",
+        "job_id": job["job_id"],
+        "deduplicated": job.get("deduplicated", False),
+        "path": path
+    }
+
+@router.post("/batch")
+async def download_batch(request: BatchDownloadRequest):
+    """
+    Enfileira vários downloads em um único request
+    Remove duplicados por external_video_id (mantém a maior prioridade)
+    Jobs respeitam limite de concorrência por host e de banda global
+    """
+    unique: Dict[str, DownloadRequest] = {}
+    for item in request.items:
+        current = unique.get(item.external_video_id)
+        if current is None or item.priority > current.priority:
+            unique[item.external_video_id] = item
+
+    for platform in {item.platform for item in unique.values()}:
+        get_executor().check_capacity(platform)
+    queue = get_download_queue()
+    await asyncio.to_thread(queue.ensure_capacity, len(unique))
+    for item in unique.values():
+        _resolve_profile(item)  # Perfil inválido recusa o lote inteiro antes de enfileirar
+
+    batch_id = uuid.uuid4().hex
+    jobs = []
+    for item in unique.values():
+        path = (await asyncio.to_thread(_plan, item))["path"] if item.title else None
+        job = await asyncio.to_thread(_enqueue, item, batch_id=batch_id, check_capacity=False)
+        jobs.append({
+            "external_video_id": item.external_video_id,
+            "job_id": job["job_id"],
+            "deduplicated": job.get("deduplicated", False),
+            "path": path
+        })
+
     return {
         "status": "queued",
-        "message": f"Download iniciado para {request.external_video_id}"
+        "batch_id": batch_id,
+        "jobs_queued": len(jobs),
+        "duplicates_removed": len(request.items) - len(unique),
+        "jobs": jobs
+    }
+
+@router.post("/plan")
+async def plan_download_path(request: PlanRequest):
+    """
+    Caminho final do arquivo, igual ao que o download vai gravar
+    Colisões de nome são resolvidas com sufixo _{external_video_id} (primeiro a reservar fica com o nome)
+    """
+    if not request.title and request.video_url:
+        info = await DownloaderService()._get_video_info(request.video_url, request.platform)
+        if info and info.get("title"):
+            request = request.model_copy(update={"title": info["title"]})
+    return await asyncio.to_thread(_plan, request)
+
+@router.post("/plan/batch")
+async def plan_download_paths(request: BatchPlanRequest):
+    """
+    Planeja vários caminhos em ordem; itens sem título usam {external_video_id}.mp4
+    """
+    return {"plans": await asyncio.to_thread(lambda: [_plan(item) for item in request.items])}
+
+@router.get("/profiles")
+async def list_profiles():
+    """Perfis de download disponíveis e padrões por plataforma/grupo"""
+    return {
+        "profiles": all_profiles(),
+        "fields": sorted(PROFILE_FIELDS),
+        "platform_defaults": settings.DOWNLOAD_PLATFORM_PROFILES,
+        "group_defaults": settings.DOWNLOAD_GROUP_PROFILES,
+        "default": settings.DOWNLOAD_DEFAULT_PROFILE
     }
+
+@router.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """
+    Progresso agregado de um lote: contagem por estado e bytes concluídos
+    """
+    jobs = await asyncio.to_thread(get_download_queue().store.list_batch, batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+
+    states: Dict[str, int] = {}
+    for job in jobs:
+        states[job["state"]] = states.get(job["state"], 0) + 1
+    finished = states.get("completed", 0) + states.get("failed", 0)
+
+    return {
+        "batch_id": batch_id,
+        "total": len(jobs),
+        "states": states,
+        "progress": round(finished / len(jobs), 4),
+        "bytes_completed": sum(job["bytes"] or 0 for job in jobs if job["state"] == "completed"),
+        "jobs": [
+            {
+                "job_id": job["job_id"],
+                "external_video_id": job["payload"]["external_video_id"],
+                "priority": job["priority"],
+                "state": job["state"],
+                "path": job["path"],
+                "bytes": job["bytes"],
+                "error": job["error"]
+            }
+            for job in jobs
+        ]
+    }
+
+@router.get("/{job_id}")
+async def get_download_status(job_id: str):
+    """
+    Estado de um job de download: queued, running, completed ou failed
+    Inclui caminho, tamanho em bytes e erro quando houver
+    """
+    job = await asyncio.to_thread(get_download_queue().get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
@@ -1,10 +1,12 @@
 """
 Endpoint de fetch - simplificado
 """
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List, Optional
-from app.services.fetcher.service import FetcherService
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Optional
+from app.api.encoding import SOURCE_FIELDS, columnar, encoded_response, parse_fields, project, response_format
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.services.fetcher.service import FetchError, FetcherService
 
 router = APIRouter()
 
@@ -14,24 +16,111 @@ class SourceRequest(BaseModel):
     group_name: Optional[str] = None
     limit: Optional[int] = None  # Limite de vídeos (opcional)
     video_type: Optional[str] = "videos"  # "videos" ou "shorts" para YouTube
+    since_last: bool = False  # Apenas vídeos novos desde o último fetch com since_last
+    cursor: Optional[str] = None  # ID do vídeo mais recente já conhecido
+    stream: bool = False  # Resposta NDJSON: um vídeo por linha + resumo no final
+
+class PageRequest(BaseModel):
+    platform: str
+    external_id: str
+    group_name: Optional[str] = None
+    video_type: Optional[str] = "videos"
+    page_size: Optional[int] = None  # Padrão: FETCH_PAGE_SIZE_DEFAULT (máx. FETCH_PAGE_SIZE_MAX)
+    start: int = Field(0, ge=0)  # Posição inicial na listagem (0 = mais recente)
+    page_token: Optional[str] = None  # next_page_token da página anterior (ignora start)
+
+async def _stream_videos(videos: List[dict], cursor: Optional[str]) -> AsyncIterator[dict]:
+    for video in videos:
+        yield video
+    yield {"status": "completed", "videos_found": len(videos), "cursor": cursor}
 
 @router.post("/run")
-async def run_fetch(request: SourceRequest):
+async def run_fetch(
+    request: SourceRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    output: Optional[str] = Query(None, alias="format")
+):
     """
     Busca vídeos de uma fonte
     Retorna lista de vídeos encontrados
+    Com stream=true (ou Accept: application/x-ndjson) responde em NDJSON
+    fields=a,b: só esses campos por vídeo; format=columnar|msgpack: campos da fonte uma vez só
     """
+    selected_fields = parse_fields(fields)
+    output = response_format(http_request, output)
     fetcher = FetcherService()
     videos = await fetcher.fetch_from_source_data(
         platform=request.platform,
         external_id=request.external_id,
         group_name=request.group_name,
         limit=request.limit,
-        video_type=request.video_type or "videos"
+        video_type=request.video_type or "videos",
+        since_last=request.since_last,
+        cursor=request.cursor
     )
+    cursor = videos[0]["external_video_id"] if videos else request.cursor
+    
+    if wants_ndjson(http_request, request.stream):
+        return ndjson_response(_stream_videos(project(videos, selected_fields), cursor))
+    
+    if output != "json":
+        source = {name: getattr(request, name) for name in SOURCE_FIELDS}
+        return await encoded_response(http_request, {
+            "status": "completed",
+            "videos_found": len(videos),
+            "cursor": cursor,
+            "source": source,
+            **columnar(videos, selected_fields)
+        }, output)
     
-    return {
+    return await encoded_response(http_request, {
         "status": "completed",
         "videos_found": len(videos),
-        "videos": videos
-    }
+        "videos": project(videos, selected_fields),
+        "cursor": cursor
+    })
+
+@router.post("/page")
+async def fetch_page(
+    request: PageRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    output: Optional[str] = Query(None, alias="format")
+):
+    """
+    Uma página da listagem da fonte, para percorrer canais grandes aos poucos
+    Continue com next_page_token até has_more=false
+    """
+    selected_fields = parse_fields(fields)
+    output = response_format(http_request, output)
+    try:
+        page = await FetcherService().fetch_page(
+            platform=request.platform,
+            external_id=request.external_id,
+            group_name=request.group_name,
+            video_type=request.video_type or "videos",
+            page_size=request.page_size,
+            start=request.start,
+            page_token=request.page_token
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FetchError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    videos = page.pop("videos")
+    if output != "json":
+        source = {name: getattr(request, name) for name in SOURCE_FIELDS}
+        return await encoded_response(http_request, {
+            "status": "completed",
+            **page,
+            "source": source,
+            **columnar(videos, selected_fields)
+        }, output)
+
+    return await encoded_response(http_request, {
+        "status": "completed",
+        **page,
+        "videos": project(videos, selected_fields)
+    })
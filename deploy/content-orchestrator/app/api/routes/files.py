@@ -0,0 +1,51 @@
+"""
+Download dos arquivos de mídia pelo HTTP
+Substitui a leitura do volume compartilhado no n8n: streaming com Range, ETag e If-None-Match
+"""
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from app.services.media.store import get_media_index
+
+router = APIRouter()
+
+def _etag(record) -> str:
+    """ETag forte a partir do sha256 do índice (muda quando o conteúdo muda)"""
+    return f'"{record["sha256"]}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+@router.api_route("/{external_video_id}", methods=["GET", "HEAD"])
+async def get_file(external_video_id: str, request: Request):
+    """
+    Conteúdo do vídeo baixado
+    - Range: bytes=início-fim para leitura parcial (206)
+    - If-None-Match com o ETag recebido: 304 sem corpo
+    O arquivo é enviado em blocos (pathsend/zero-copy quando o servidor ASGI suporta), nunca inteiro em memória
+    """
+    index = get_media_index()
+    record = await asyncio.to_thread(index.get_valid, external_video_id)
+    if not record:
+        raise HTTPException(status_code=404, detail=f"Media {external_video_id} not found")
+    await asyncio.to_thread(index.touch, external_video_id)
+
+    headers = {}
+    if record["sha256"]:
+        etag = _etag(record)
+        headers["etag"] = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        record["path"],
+        media_type="video/mp4",
+        filename=record["file_name"],
+        content_disposition_type="inline",
+        headers=headers
+    )
@@ -0,0 +1,43 @@
+"""
+Endpoints do índice de mídias baixadas
+Consulta por external_video_id e listagem por grupo/fonte, sem `ls` no n8n
+"""
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.services.media.store import get_media_index
+
+router = APIRouter()
+
+@router.get("")
+async def list_media(
+    group_name: Optional[str] = None,
+    source_name: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Lista mídias baixadas, mais recentes primeiro
+    Filtra por grupo e/ou fonte (mesma normalização das pastas)
+    """
+    items = await asyncio.to_thread(
+        get_media_index().list,
+        group_name=group_name,
+        source_name=source_name,
+        limit=limit,
+        offset=offset
+    )
+    return {"count": len(items), "items": items}
+
+@router.get("/{external_video_id}")
+async def get_media(external_video_id: str):
+    """
+    Retorna caminho, tamanho, hash e datas de um vídeo baixado
+    404 se o vídeo não foi baixado ou o arquivo não existe mais
+    """
+    index = get_media_index()
+    record = await asyncio.to_thread(index.get_valid, external_video_id)
+    if not record:
+        raise HTTPException(status_code=404, detail=f"Media {external_video_id} not found")
+    await asyncio.to_thread(index.touch, external_video_id)
+    return record
@@ -3,12 +3,22 @@ Endpoints específicos para integração com n8n
 API stateless - recebe dados do n8n, processa e retorna resultados
 Dados gerenciados via Google Sheets no n8n
 """
-from fastapi import APIRouter, BackgroundTasks
-from pydantic import BaseModel
-from typing import List, Optional
+import time
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.config import get_settings
+from app.api.encoding import columnar, encoded_response, parse_fields, project, response_format
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.services.executor.service import QueueFullError
 from app.services.fetcher.service import FetcherService
+from app.services.seen.bloom import BloomFilter
+from app.services.seen.service import ExclusionFilter
+from app.services.seen.store import get_seen_store
 
 router = APIRouter()
+settings = get_settings()
 
 class SourceData(BaseModel):
     """Dados de uma fonte vinda do n8n/Google Sheets"""
@@ -16,46 +26,182 @@ class SourceData(BaseModel):
     external_id: str  # ID do canal/perfil
     group_name: Optional[str] = None
     video_type: Optional[str] = "videos"  # "videos" ou "shorts" para YouTube
+    cursor: Optional[str] = None  # ID do vídeo mais recente já conhecido
+
+class BloomFilterData(BaseModel):
+    """Bloom filter de IDs já vistos (formato em app/services/seen/bloom.py)"""
+    bits: str  # base64
+    size: int = Field(..., gt=0)  # Número de bits
+    hashes: int = Field(..., gt=0)  # Número de funções de hash
 
 class ProcessRequest(BaseModel):
     """Request para processar fontes"""
     sources: List[SourceData]
     limit: Optional[int] = None  # Limite de vídeos por fonte (opcional)
+    concurrency: Optional[int] = Field(None, ge=1)  # Fontes em paralelo (padrão: SOURCE_FETCH_CONCURRENCY)
+    source_timeout: Optional[float] = Field(None, gt=0)  # Prazo por fonte em segundos
+    since_last: bool = False  # Apenas vídeos novos desde a última execução
+    stream: bool = False  # Resposta NDJSON, fonte a fonte, na ordem de conclusão
+    # Vídeos a excluir da resposta (já baixados/publicados)
+    exclude_ids: List[str] = []
+    exclude_bloom: Optional[BloomFilterData] = None
+    exclude_seen: bool = False  # Usa o conjunto persistido (POST /v1/n8n/seen)
+
+class SeenRequest(BaseModel):
+    """IDs de vídeos consumidos pelo fluxo"""
+    video_ids: List[str]
+    group_name: Optional[str] = None
+
+async def _fetch_source(
+    fetcher: FetcherService,
+    source_data: SourceData,
+    limit: Optional[int],
+    timeout: float,
+    since_last: bool,
+    exclusion: ExclusionFilter,
+    semaphore: asyncio.Semaphore
+) -> Tuple[List[dict], dict]:
+    """
+    Busca uma fonte respeitando o limite de paralelismo e o prazo
+    Retorna (itens para a lista de vídeos, relatório da fonte)
+    """
+    async with semaphore:
+        started = time.monotonic()
+        report = {
+            "platform": source_data.platform,
+            "external_id": source_data.external_id,
+            "group_name": source_data.group_name,
+        }
+        try:
+            # Prazo da fonte inteira: fila, limite de taxa e novas tentativas inclusos
+            videos = await asyncio.wait_for(fetcher.fetch_from_source_data(
+                platform=source_data.platform,
+                external_id=source_data.external_id,
+                group_name=source_data.group_name,
+                limit=limit,
+                video_type=source_data.video_type or "videos",
+                raise_errors=True,
+                timeout=timeout,
+                since_last=since_last,
+                cursor=source_data.cursor
+            ), timeout)
+            cursor = videos[0]["external_video_id"] if videos else source_data.cursor
+            videos, excluded = await asyncio.to_thread(exclusion.apply, videos)
+            report.update(status="ok", videos_found=len(videos), excluded=excluded, cursor=cursor)
+        except asyncio.TimeoutError:
+            error = f"Timed out after {timeout:g}s"
+            report.update(status="timeout", videos_found=0, error=error)
+            videos = [{"error": error, "source": source_data.external_id, "platform": source_data.platform}]
+        except QueueFullError as e:
+            # Fila cheia ou circuito aberto: a fonte não foi consultada, vale repetir depois
+            report.update(status="unavailable", videos_found=0, error=str(e), retry_after=e.retry_after)
+            videos = [{"error": str(e), "source": source_data.external_id, "platform": source_data.platform}]
+        except Exception as e:
+            report.update(status="error", videos_found=0, error=str(e))
+            videos = [{"error": str(e), "source": source_data.external_id, "platform": source_data.platform}]
+
+        report["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+        return videos, report
+
+async def _stream_sources(tasks: List[asyncio.Task], fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Emite vídeos/erros de cada fonte assim que ela termina
+    Última linha: resumo com status e relatório por fonte
+    """
+    videos_found = 0
+    sources = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            videos, report = await next_done
+            for video in project(videos, fields):
+                yield video
+            videos_found += len(videos)
+            sources.append(report)
+    finally:
+        # Cliente desconectou: não continuar buscando fontes pendentes
+        for task in tasks:
+            task.cancel()
+
+    yield {"status": "completed", "videos_found": videos_found, "sources": sources}
 
 @router.post("/process-sources")
 async def process_sources(
     request: ProcessRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    http_request: Request,
+    fields: Optional[str] = None,
+    output: Optional[str] = Query(None, alias="format")
 ):
     """
     Processa fontes recebidas do n8n
-    Retorna lista de vídeos encontrados
+    Fontes são buscadas em paralelo, cada uma com seu próprio prazo
+    Retorna lista de vídeos na ordem das fontes e o status de cada fonte
+    Com stream=true (ou Accept: application/x-ndjson) responde em NDJSON
+    fields=a,b: só esses campos por vídeo
+    format=columnar|msgpack: vídeos dentro do relatório de cada fonte, sem repetir campos da fonte
     """
+    selected_fields = parse_fields(fields)
+    output = response_format(http_request, output)
     fetcher = FetcherService()
-    results = []
-    
-    for source_data in request.sources:
+    semaphore = asyncio.Semaphore(request.concurrency or settings.SOURCE_FETCH_CONCURRENCY)
+    timeout = request.source_timeout or settings.SOURCE_FETCH_TIMEOUT_SECONDS
+
+    bloom = None
+    if request.exclude_bloom:
         try:
-            videos = await fetcher.fetch_from_source_data(
-                platform=source_data.platform,
-                external_id=source_data.external_id,
-                group_name=source_data.group_name,
-                limit=request.limit,
-                video_type=source_data.video_type or "videos"
+            bloom = BloomFilter.from_base64(
+                request.exclude_bloom.bits,
+                request.exclude_bloom.size,
+                request.exclude_bloom.hashes
             )
-            results.extend(videos)
-        except Exception as e:
-            results.append({
-                "error": str(e),
-                "source": source_data.external_id,
-                "platform": source_data.platform
-            })
-    
-    return {
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    exclusion = ExclusionFilter(request.exclude_ids, bloom, request.exclude_seen)
+
+    jobs = [
+        _fetch_source(fetcher, source_data, request.limit, timeout, request.since_last, exclusion, semaphore)
+        for source_data in request.sources
+    ]
+
+    if wants_ndjson(http_request, request.stream):
+        return ndjson_response(_stream_sources([asyncio.create_task(job) for job in jobs], selected_fields))
+
+    outcomes = await asyncio.gather(*jobs)
+
+    if output != "json":
+        return await encoded_response(http_request, {
+            "status": "completed",
+            "videos_found": sum(len(videos) for videos, _ in outcomes),
+            "sources": [{**report, **columnar(videos, selected_fields)} for videos, report in outcomes]
+        }, output)
+
+    results = []
+    sources = []
+    for videos, report in outcomes:
+        results.extend(videos)
+        sources.append(report)
+
+    return await encoded_response(http_request, {
         "status": "completed",
         "videos_found": len(results),
-        "videos": results
-    }
+        "videos": project(results, selected_fields),
+        "sources": sources
+    })
+
+@router.post("/seen")
+async def mark_seen(request: SeenRequest):
+    """
+    Marca vídeos como consumidos no conjunto persistido
+    process-sources com exclude_seen=true deixa de retorná-los
+    """
+    marked = await asyncio.to_thread(get_seen_store().mark, request.video_ids, request.group_name)
+    return {"status": "ok", "marked": marked}
+
+@router.delete("/seen")
+async def unmark_seen(request: SeenRequest):
+    """Remove vídeos do conjunto persistido (voltam a aparecer)"""
+    removed = await asyncio.to_thread(get_seen_store().unmark, request.video_ids)
+    return {"status": "ok", "removed": removed}
 
 @router.get("/health")
 async def health_check():
@@ -0,0 +1,70 @@
+"""
+Endpoint de pós-processamento
+Enfileira presets do ffmpeg (watermark, scale, reencode) sobre vídeos baixados
+"""
+import asyncio
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, Optional
+from app.services.jobs.service import get_processing_queue
+from app.services.processor.service import PRESETS, ProcessingError, check_options
+
+router = APIRouter()
+
+class ProcessRequest(BaseModel):
+    """Request para processar um vídeo já baixado"""
+    preset: str
+    external_video_id: Optional[str] = None  # Resolve o arquivo pelo índice de mídias
+    path: Optional[str] = None  # Alternativa: caminho dentro do diretório de downloads
+    options: Dict[str, Any] = Field(default_factory=dict)
+    replace_original: bool = True
+    callback_url: Optional[str] = None
+    priority: int = 0
+
+    @model_validator(mode="after")
+    def check_input(self):
+        if self.preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{self.preset}'. Available: {', '.join(PRESETS)}")
+        if not self.external_video_id and not self.path:
+            raise ValueError("Either external_video_id or path is required")
+        try:
+            check_options(self.options)
+        except ProcessingError as e:
+            raise ValueError(str(e))
+        return self
+
+@router.get("/presets")
+async def list_presets():
+    """Presets disponíveis"""
+    return {"presets": list(PRESETS)}
+
+@router.post("")
+async def process_content(request: ProcessRequest):
+    """
+    Enfileira o processamento de um vídeo
+    Jobs rodam em paralelo até PROCESSING_WORKERS (padrão: número de CPUs)
+    Retorna job_id para acompanhar em GET /v1/process/{job_id}
+    """
+    job = await asyncio.to_thread(
+        get_processing_queue().enqueue,
+        payload=request.model_dump(exclude={"callback_url", "priority"}),
+        priority=request.priority,
+        callback_url=request.callback_url,
+        video_id=request.external_video_id
+    )
+
+    return {
+        "status": "queued",
+        "preset": request.preset,
+        "job_id": job["job_id"]
+    }
+
+@router.get("/{job_id}")
+async def get_process_status(job_id: str):
+    """
+    Estado de um job de processamento: queued, running, completed ou failed
+    """
+    job = await asyncio.to_thread(get_processing_queue().get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
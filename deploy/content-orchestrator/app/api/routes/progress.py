@@ -0,0 +1,166 @@
+"""
+Progresso dos downloads em tempo real
+SSE (GET) ou WebSocket, por job ou por grupo; eventos: started, progress, stalled, completed, failed
+Os eventos vêm do worker que executa o download; o stream de um job também consulta o
+estado no banco a cada heartbeat (download em outro worker do uvicorn)
+"""
+import time
+import asyncio
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from typing import AsyncGenerator, AsyncIterator, Dict, Optional, Set
+from app.api.encoding import dumps
+from app.api.streaming import sse_response
+from app.core.config import get_settings
+from app.services.jobs.service import get_download_queue
+from app.services.jobs.store import COMPLETED, FAILED
+from app.services.progress.bus import STALLED, TERMINAL, Subscription, get_progress_bus, group_topic, video_topic
+
+router = APIRouter()
+settings = get_settings()
+
+HEARTBEAT = {"type": "heartbeat"}
+
+
+async def _follow(subscription: Subscription) -> AsyncIterator[Dict]:
+    """Eventos do tópico + stalled (uma vez por travamento) + heartbeat quando ocioso"""
+    bus = get_progress_bus()
+    interval = settings.PROGRESS_HEARTBEAT_SECONDS
+    stalled: Set[str] = set()
+    checked_at = time.monotonic()
+    while True:
+        event = await subscription.get(interval)
+        if event is not None:
+            # Bytes voltaram a avançar: um novo travamento será avisado de novo
+            if event["type"] != STALLED and event.get("progressed_at") == event["timestamp"]:
+                stalled.discard(event["external_video_id"])
+            yield event
+        if event is None or time.monotonic() - checked_at >= interval:
+            checked_at = time.monotonic()
+            for stalled_event in bus.stalled_events(subscription.topic, stalled):
+                yield stalled_event
+        if event is None:
+            yield {**HEARTBEAT, "timestamp": time.time()}
+
+
+def _job_terminal(job: Dict) -> Dict:
+    return {
+        "type": job["state"],
+        "job_id": job["job_id"],
+        "external_video_id": job["payload"].get("external_video_id"),
+        "group_name": job["payload"].get("group_name"),
+        "path": job["path"],
+        "error": job["error"],
+        "timestamp": time.time()
+    }
+
+
+def _same_download(event: Dict, video_id: str, profile: Optional[str]) -> bool:
+    """Evento do download deste job (sem perfil no job: jobs anteriores aos perfis)"""
+    return event.get("external_video_id") == video_id and (profile is None or event.get("profile") == profile)
+
+
+def _get_job(job_id: str) -> Dict:
+    job = get_download_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+async def _job_events(job: Dict) -> AsyncIterator[Dict]:
+    """Até o evento final do job"""
+    queue = get_download_queue()
+    bus = get_progress_bus()
+    job_id = job["job_id"]
+    video_id = job["payload"]["external_video_id"]
+    profile = job["payload"].get("profile")
+    # Assina antes de reler o estado: não perde um término entre as duas coisas
+    with bus.subscribe(video_topic(video_id)) as subscription:
+        job = await asyncio.to_thread(queue.get, job_id)
+        yield {
+            "type": "job",
+            "job_id": job_id,
+            "external_video_id": video_id,
+            "state": job["state"],
+            "timestamp": time.time()
+        }
+        if job["state"] in (COMPLETED, FAILED):
+            yield _job_terminal(job)
+            return
+        for event in bus.active():
+            if _same_download(event, video_id, profile):
+                yield {**event, "job_id": job_id}
+
+        async for event in _follow(subscription):
+            if event["type"] == HEARTBEAT["type"]:
+                job = await asyncio.to_thread(queue.get, job_id)
+                if job and job["state"] in (COMPLETED, FAILED):
+                    yield _job_terminal(job)
+                    return
+                yield event
+                continue
+            # Outro perfil do mesmo vídeo (outro job): não é deste stream
+            if not _same_download(event, video_id, profile):
+                continue
+            yield {**event, "job_id": job_id}
+            if event["type"] in TERMINAL:
+                return
+
+
+async def _group_events(group_name: str) -> AsyncIterator[Dict]:
+    """Downloads em andamento do grupo e, depois, todos os eventos novos (sem fim)"""
+    bus = get_progress_bus()
+    with bus.subscribe(group_topic(group_name)) as subscription:
+        for event in bus.active(group_name):
+            yield event
+        async for event in _follow(subscription):
+            yield event
+
+
+async def _send_ws(websocket: WebSocket, events: AsyncGenerator[Dict, None]):
+    try:
+        async for event in events:
+            await websocket.send_text(dumps(event).decode())
+    except (WebSocketDisconnect, RuntimeError):
+        return  # Cliente desconectou
+    finally:
+        await events.aclose()
+    await websocket.close()
+
+
+@router.get("")
+async def list_progress(group_name: Optional[str] = None):
+    """Downloads em andamento neste worker (último evento de cada um, com stalled)"""
+    downloads = get_progress_bus().active(group_name)
+    return {
+        "count": len(downloads),
+        "stalled": sum(1 for download in downloads if download["stalled"]),
+        "downloads": downloads
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def job_progress(job_id: str):
+    """SSE do job até completed/failed"""
+    return sse_response(_job_events(await asyncio.to_thread(_get_job, job_id)))
+
+
+@router.get("/groups/{group_name}")
+async def group_progress(group_name: str):
+    """SSE de todos os downloads do grupo (conexão aberta até o cliente sair)"""
+    return sse_response(_group_events(group_name))
+
+
+@router.websocket("/ws/jobs/{job_id}")
+async def job_progress_ws(websocket: WebSocket, job_id: str):
+    await websocket.accept()
+    job = await asyncio.to_thread(get_download_queue().get, job_id)
+    if not job:
+        await websocket.close(code=4404, reason=f"Job {job_id} not found")
+        return
+    await _send_ws(websocket, _job_events(job))
+
+
+@router.websocket("/ws/groups/{group_name}")
+async def group_progress_ws(websocket: WebSocket, group_name: str):
+    await websocket.accept()
+    await _send_ws(websocket, _group_events(group_name))
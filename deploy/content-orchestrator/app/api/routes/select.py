@@ -1,43 +1,135 @@
 """
-Endpoint de seleção - simplificado (stateless)
-Recebe dados do n8n e retorna conteúdo disponível
+Endpoint de seleção
+Candidatos vêm do índice local (alimentado pelos fetches) e são ranqueados no servidor;
+available_videos continua aceito para compatibilidade com workflows antigos
 """
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Optional, List
+import asyncio
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, List
+from app.core.config import get_settings
+from app.services.selection.store import get_candidate_store
 
 router = APIRouter()
+settings = get_settings()
 
 class SelectRequest(BaseModel):
     """Request para selecionar conteúdo"""
     destination_platform: str
     destination_account_id: str
     group_name: Optional[str] = None
-    # Dados de vídeos disponíveis vêm do n8n/Google Sheets
-    available_videos: List[dict]
+    # Legado: lista de vídeos enviada pelo n8n/Google Sheets (também alimenta o índice)
+    available_videos: Optional[List[dict]] = None
+    count: int = Field(1, ge=1, le=100)  # Quantos candidatos retornar (selected = primeiro)
+    weights: Optional[Dict[str, float]] = None  # Sobrescreve views/recency/duration/downloaded
+    min_duration: Optional[float] = None  # Padrão: SELECT_DURATION_RANGES do destino
+    max_duration: Optional[float] = None
+    strict_duration: bool = False  # Descarta (em vez de só penalizar) fora da faixa
+    reserve: bool = True  # Reserva os escolhidos até o confirm (ou SELECT_LEASE_SECONDS)
+
+class CandidatesRequest(BaseModel):
+    videos: List[dict]
+
+def _weights(overrides: Optional[Dict[str, float]]) -> Dict[str, float]:
+    weights = {
+        "views": settings.SELECT_WEIGHT_VIEWS,
+        "recency": settings.SELECT_WEIGHT_RECENCY,
+        "duration": settings.SELECT_WEIGHT_DURATION,
+        "downloaded": settings.SELECT_WEIGHT_DOWNLOADED,
+    }
+    unknown = set(overrides or {}) - set(weights)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown weights: {sorted(unknown)}")
+    weights.update(overrides or {})
+    return weights
+
+async def _legacy_select(request: SelectRequest):
+    """Comportamento anterior: primeiro vídeo do grupo na lista recebida"""
+    await asyncio.to_thread(get_candidate_store().add, request.available_videos)
 
-@router.post("")
-async def select_content(request: SelectRequest):
-    """
-    Seleciona conteúdo baseado em regras simples
-    Retorna vídeo selecionado ou None
-    """
-    # Lógica simples: retorna primeiro vídeo disponível
-    # n8n pode implementar lógica mais complexa
-    if not request.available_videos:
-        return {"message": "No content available", "selected": None}
-    
-    # Filtrar por grupo se fornecido
     filtered = request.available_videos
     if request.group_name:
         filtered = [v for v in filtered if v.get("group_name") == request.group_name]
-    
+
     if not filtered:
         return {"message": "No content available for this group", "selected": None}
-    
-    # Retornar primeiro disponível
-    selected = filtered[0]
+
+    return {
+        "message": "Content selected",
+        "selected": filtered[0]
+    }
+
+@router.post("")
+async def select_content(request: SelectRequest):
+    """
+    Seleciona o melhor candidato ainda não publicado no destino
+    Ranking: views, recência, duração adequada ao destino e se já foi baixado
+    Retorna vídeo selecionado ou None
+    """
+    if request.available_videos:
+        return await _legacy_select(request)
+
+    duration_range = settings.SELECT_DURATION_RANGES.get(request.destination_platform) or [None, None]
+    candidates = await asyncio.to_thread(
+        get_candidate_store().rank,
+        destination_platform=request.destination_platform,
+        destination_account_id=request.destination_account_id,
+        group_name=request.group_name,
+        limit=request.count,
+        weights=_weights(request.weights),
+        min_duration=request.min_duration if request.min_duration is not None else duration_range[0],
+        max_duration=request.max_duration if request.max_duration is not None else duration_range[1],
+        strict_duration=request.strict_duration,
+        max_attempts=settings.SELECT_MAX_PUBLISH_ATTEMPTS,
+        lease_seconds=settings.SELECT_LEASE_SECONDS,
+        reserve=request.reserve
+    )
+    if not candidates:
+        message = "No content available for this group" if request.group_name else "No content available"
+        return {"message": message, "selected": None, "candidates": []}
+
     return {
         "message": "Content selected",
-        "selected": selected
+        "selected": candidates[0],
+        "candidates": candidates
     }
+
+@router.post("/candidates")
+async def add_candidates(request: CandidatesRequest):
+    """Inclui/atualiza candidatos manualmente (ex: backlog vindo da planilha)"""
+    indexed = await asyncio.to_thread(get_candidate_store().add, request.videos)
+    return {"status": "ok", "indexed": indexed}
+
+@router.get("/candidates")
+async def list_candidates(
+    destination_platform: str = "",
+    destination_account_id: str = "",
+    group_name: Optional[str] = None,
+    limit: int = 50
+):
+    """Prévia do ranking para um destino (não reserva nada)"""
+    duration_range = settings.SELECT_DURATION_RANGES.get(destination_platform) or [None, None]
+    candidates = await asyncio.to_thread(
+        get_candidate_store().rank,
+        destination_platform=destination_platform,
+        destination_account_id=destination_account_id,
+        group_name=group_name,
+        limit=min(max(limit, 1), 1000),
+        weights=_weights(None),
+        min_duration=duration_range[0],
+        max_duration=duration_range[1],
+        max_attempts=settings.SELECT_MAX_PUBLISH_ATTEMPTS,
+        lease_seconds=settings.SELECT_LEASE_SECONDS
+    )
+    return {"count": len(candidates), "candidates": candidates}
+
+@router.get("/candidates/stats")
+async def candidate_stats(group_name: Optional[str] = None):
+    """Candidatos e já publicados por grupo"""
+    return {"groups": await asyncio.to_thread(get_candidate_store().stats, group_name)}
+
+@router.delete("/candidates/{external_video_id}")
+async def remove_candidate(external_video_id: str):
+    if not await asyncio.to_thread(get_candidate_store().remove, external_video_id):
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return {"status": "removed", "external_video_id": external_video_id}
@@ -0,0 +1,41 @@
+"""
+Endpoints de uso e retenção do disco de downloads
+Substitui os `rm -rf` manuais no n8n por cotas, TTL e pins
+"""
+import asyncio
+from fastapi import APIRouter, HTTPException
+from app.services.media.store import get_media_index
+from app.services.storage.service import get_retention_sweeper
+
+router = APIRouter()
+
+@router.get("/usage")
+async def get_storage_usage():
+    """
+    Arquivos e bytes por grupo/fonte, cota de cada grupo e uso do disco
+    """
+    return get_retention_sweeper().usage()
+
+@router.post("/sweep")
+async def run_sweep(dry_run: bool = False):
+    """
+    Executa uma passada de retenção agora
+    dry_run=true lista o que seria removido sem apagar nada
+    """
+    return await asyncio.to_thread(get_retention_sweeper().sweep, dry_run)
+
+@router.put("/pins/{external_video_id}")
+async def pin_media(external_video_id: str):
+    """
+    Fixa o arquivo: nunca é removido pela retenção (ex: durante a publicação)
+    Confirmar a publicação remove o pin
+    """
+    if not get_media_index().set_pinned(external_video_id, True):
+        raise HTTPException(status_code=404, detail=f"Media {external_video_id} not found")
+    return {"external_video_id": external_video_id, "pinned": True}
+
+@router.delete("/pins/{external_video_id}")
+async def unpin_media(external_video_id: str):
+    if not get_media_index().set_pinned(external_video_id, False):
+        raise HTTPException(status_code=404, detail=f"Media {external_video_id} not found")
+    return {"external_video_id": external_video_id, "pinned": False}
@@ -0,0 +1,43 @@
+"""
+Endpoint de upload para o backend de publicação
+O orquestrador envia o arquivo direto do disco; o n8n só recebe a resposta do destino
+"""
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from app.services.uploader.service import MediaNotFoundError, UploaderService, UploadError
+
+router = APIRouter()
+
+class UploadRequest(BaseModel):
+    """Request para enviar um vídeo baixado"""
+    external_video_id: str
+    url: str  # Ex: https://postiz.exemplo.com/api/public/v1/upload
+    headers: Dict[str, str] = {}  # Ex: {"Authorization": "..."}
+    field_name: str = "file"
+    fields: Dict[str, str] = {}  # Campos extras do formulário
+    timeout: Optional[float] = Field(None, gt=0)
+
+@router.post("")
+async def upload_content(request: UploadRequest):
+    """
+    Envia o vídeo como multipart/form-data em streaming a partir do disco
+    Retorna status e corpo da resposta do destino
+    404 se o vídeo não estiver no disco; 502 se o destino recusar ou falhar após as tentativas
+    """
+    try:
+        return await UploaderService().upload(
+            request.external_video_id,
+            request.url,
+            headers=request.headers,
+            field_name=request.field_name,
+            fields=request.fields,
+            timeout=request.timeout
+        )
+    except MediaNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"error": str(e), "upstream_status": e.status_code, "upstream_body": e.body}
+        )
@@ -0,0 +1,46 @@
+"""
+Respostas em streaming
+- NDJSON (um objeto JSON por linha): `stream: true` no body ou `Accept: application/x-ndjson`
+- Server-Sent Events: campo "type" vira o nome do evento; heartbeat vira comentário
+"""
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncGenerator, AsyncIterator, Dict
+from app.api.encoding import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _encode_lines(items: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    async for item in items:
+        yield dumps(item) + b"\n"
+
+
+def ndjson_response(items: AsyncIterator[Dict]) -> StreamingResponse:
+    return StreamingResponse(_encode_lines(items), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def _encode_events(events: AsyncGenerator[Dict, None]) -> AsyncIterator[bytes]:
+    try:
+        async for event in events:
+            if event.get("type") == "heartbeat":
+                yield b": keepalive\n\n"
+                continue
+            yield b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+    finally:
+        # Cliente desconectou: encerra a assinatura já, sem esperar o coletor de lixo
+        await events.aclose()
+
+
+def sse_response(events: AsyncGenerator[Dict, None]) -> StreamingResponse:
+    return StreamingResponse(
+        _encode_events(events),
+        media_type=SSE_MEDIA_TYPE,
+        # Sem cache e sem buffer de proxy (nginx) - eventos chegam na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
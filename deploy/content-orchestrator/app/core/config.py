@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Content Orchestrator"
@@ -8,6 +9,102 @@ class Settings(BaseSettings):
     # Storage (local apenas - dados gerenciados via Google Sheets no n8n)
     STORAGE_TYPE: str = "local"
     LOCAL_STORAGE_PATH: str = "downloads"
+    DATABASE_PATH: Optional[str] = None  # Padrão: data/orchestrator.db ao lado de LOCAL_STORAGE_PATH
+    
+    # Executor do yt-dlp (vazio = escala com o número de CPUs)
+    YTDLP_MAX_WORKERS: Optional[int] = None
+    YTDLP_CONCURRENCY_YOUTUBE: Optional[int] = None
+    YTDLP_CONCURRENCY_INSTAGRAM: Optional[int] = None
+    YTDLP_CONCURRENCY_TIKTOK: Optional[int] = None
+    YTDLP_CONCURRENCY_DEFAULT: Optional[int] = None
+    YTDLP_MAX_QUEUE_DEPTH: int = 50  # Chamadas aguardando por plataforma antes de recusar (503)
+    YTDLP_RETRY_AFTER_SECONDS: int = 5
+    YTDLP_POOL_MAX_IDLE: int = 8  # Instâncias de YoutubeDL prontas por perfil de opções
+    YTDLP_POOL_MAX_USES: int = 200  # Recria a instância depois disso (recarrega cookies)
+    YTDLP_POOL_MAX_AGE_SECONDS: float = 1800
+    YTDLP_WARMUP: bool = True  # Importa o yt-dlp e cria instâncias em background após o startup
+    
+    # Proteção contra bloqueio: taxa adaptativa (req/s), novas tentativas e circuit breaker
+    PLATFORM_RATE_LIMITS: Dict[str, float] = {"youtube": 5, "instagram": 0.5, "tiktok": 1}
+    PLATFORM_RATE_LIMIT_DEFAULT: Optional[float] = 1  # Vazio = sem limite de taxa
+    EXTRACTION_MAX_ATTEMPTS: int = 3  # Tentativas em erro transitório (429, 5xx, conexão)
+    EXTRACTION_BACKOFF_INITIAL_SECONDS: float = 2
+    EXTRACTION_BACKOFF_MAX_SECONDS: float = 60
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # Falhas transitórias seguidas para abrir o circuito
+    CIRCUIT_RESET_SECONDS: float = 300  # Tempo com o circuito aberto antes da chamada de teste
+    
+    # Processamento de fontes do n8n
+    SOURCE_FETCH_CONCURRENCY: int = 8  # Fontes buscadas em paralelo
+    SOURCE_FETCH_TIMEOUT_SECONDS: float = 120  # Prazo por fonte
+    WATERMARK_MAX_IDS: int = 50  # IDs lembrados por fonte no modo since_last
+    INCREMENTAL_STOP_AFTER_KNOWN: int = 3  # IDs conhecidos seguidos para encerrar a listagem
+    FETCH_PAGE_SIZE_DEFAULT: int = 50  # Vídeos por página em /v1/fetch/page
+    FETCH_PAGE_SIZE_MAX: int = 500
+    
+    # Seleção de conteúdo (/v1/select): pesos do ranking de candidatos
+    SELECT_WEIGHT_VIEWS: float = 1.0  # Por unidade de log(1 + views)
+    SELECT_WEIGHT_RECENCY: float = 0.5  # Subtraído por dia de idade do vídeo
+    SELECT_WEIGHT_DURATION: float = 5.0  # Duração dentro da faixa do destino
+    SELECT_WEIGHT_DOWNLOADED: float = 2.0  # Vídeo já baixado (publicação imediata)
+    SELECT_DURATION_RANGES: Dict[str, List[float]] = {"instagram": [3, 90], "tiktok": [3, 180]}  # Segundos por destino
+    SELECT_MAX_PUBLISH_ATTEMPTS: int = 3  # Falhas no mesmo destino antes de desistir do vídeo
+    SELECT_LEASE_SECONDS: float = 3600  # Vídeo selecionado fica reservado até confirmar ou expirar
+    
+    # Respostas grandes (fetch, process-sources): compressão negociada por Accept-Encoding
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_BROTLI_QUALITY: int = 4  # Só com o pacote brotli instalado
+    
+    # Fila de downloads
+    DOWNLOAD_WORKERS: int = 4
+    DOWNLOAD_MAX_PENDING_JOBS: int = 500  # Acima disso POST /v1/download responde 429
+    DOWNLOAD_HOST_CONCURRENCY: Dict[str, int] = {}  # JSON, ex: {"youtube.com": 3, "instagram.com": 1}
+    DOWNLOAD_HOST_CONCURRENCY_DEFAULT: int = 2
+    DOWNLOAD_BANDWIDTH_LIMIT: Optional[int] = None  # Bytes/s somando todos os downloads do processo
+    # Perfis de download (app/services/downloader/profiles.py): padrão por plataforma e por grupo
+    DOWNLOAD_PROFILES: Dict[str, Dict[str, Any]] = {}  # JSON, perfis extras ou substituindo os embutidos
+    DOWNLOAD_PLATFORM_PROFILES: Dict[str, str] = {"youtube": "shorts_1080", "instagram": "shorts_1080", "tiktok": "shorts_1080"}
+    DOWNLOAD_GROUP_PROFILES: Dict[str, str] = {}  # JSON, ex: {"podcasts": "shorts_720"}
+    DOWNLOAD_DEFAULT_PROFILE: str = "source"
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_STALE_AFTER_SECONDS: float = 60  # Job running sem heartbeat volta para a fila
+    JOB_MAX_ATTEMPTS: int = 3  # Interrompido tantas vezes (sem heartbeat), o job falha
+    JOB_CALLBACK_TIMEOUT_SECONDS: float = 10
+    
+    # Progresso dos downloads (SSE/WebSocket em /v1/progress)
+    PROGRESS_INTERVAL_SECONDS: float = 0.5  # Intervalo mínimo entre eventos de um download
+    PROGRESS_STALL_SECONDS: float = 60  # Sem avanço de bytes por esse tempo = stalled
+    PROGRESS_HEARTBEAT_SECONDS: float = 15  # Keepalive das conexões sem eventos
+    PROGRESS_QUEUE_SIZE: int = 100  # Eventos pendentes por assinante (descarta os mais antigos)
+    
+    # Cache de metadados de vídeo (TTL abaixo da validade das URLs de formato)
+    VIDEO_INFO_CACHE_SIZE: int = 256
+    VIDEO_INFO_CACHE_TTL_SECONDS: float = 1800
+    VIDEO_INFO_CACHE_DIR: Optional[str] = None  # Ex: /app/data/info-cache (desligado se vazio)
+    
+    # Pós-processamento com ffmpeg
+    FFMPEG_PATH: str = "ffmpeg"
+    PROCESSING_WORKERS: Optional[int] = None  # Processos ffmpeg em paralelo (vazio = número de CPUs)
+    PROCESSING_MAX_PENDING_JOBS: int = 500
+    PROCESSING_TIMEOUT_SECONDS: float = 1800
+    WATERMARK_LOGO_PATH: Optional[str] = None  # Logo padrão do preset watermark
+    ASSETS_PATH: Optional[str] = None  # Diretório de logos aceitos em options.logo_path (além dos downloads)
+    
+    # Cliente HTTP compartilhado e upload para o backend de publicação
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPLOAD_CONCURRENCY: int = 4  # Uploads simultâneos por processo
+    UPLOAD_MAX_ATTEMPTS: int = 3
+    UPLOAD_TIMEOUT_SECONDS: float = 600
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # Retenção do disco de downloads (vazio = sem limite)
+    STORAGE_SWEEP_INTERVAL_SECONDS: float = 300
+    STORAGE_GROUP_QUOTAS: Dict[str, int] = {}  # Bytes por grupo, ex: {"podcasts": 50000000000}
+    STORAGE_DEFAULT_GROUP_QUOTA: Optional[int] = None  # Bytes para grupos sem cota própria
+    STORAGE_TTL_SECONDS: Optional[float] = None  # Remove arquivos sem acesso há mais tempo que isso
+    STORAGE_PUBLISHED_TTL_SECONDS: Optional[float] = None  # Remove arquivos publicados após esse tempo
+    STORAGE_PARTIAL_TTL_SECONDS: float = 86400  # Downloads parciais abandonados
     
     class Config:
         env_file = ".env"
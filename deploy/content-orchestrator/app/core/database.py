@@ -0,0 +1,77 @@
+"""
+Banco SQLite local para o estado do orquestrador (jobs, índices)
+Um arquivo no volume de dados, compartilhado entre workers do uvicorn
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class Database:
+    """Conexão SQLite em modo WAL protegida por lock (uso a partir de várias threads)"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def execute_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        rows = self.execute(sql, params)
+        return rows[0] if rows else None
+
+    def executescript(self, script: str):
+        with self._lock:
+            self._conn.executescript(script)
+
+    def add_columns(self, table: str, columns: Dict[str, str]):
+        """Adiciona colunas ausentes em tabelas criadas por versões anteriores"""
+        with self._lock:
+            existing = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for name, definition in columns.items():
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Transação com lock de escrita (BEGIN IMMEDIATE)
+        Garante atomicidade também entre processos
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _default_path() -> str:
+    """Mesmo diretório de dados usado para cookies.txt"""
+    return os.path.join(settings.LOCAL_STORAGE_PATH, '..', 'data', 'orchestrator.db')
+
+
+@lru_cache()
+def get_database() -> Database:
+    return Database(settings.DATABASE_PATH or _default_path())
@@ -0,0 +1,300 @@
+"""
+Métricas no formato de texto do Prometheus (GET /metrics)
+Implementação mínima sem dependências: contadores, gauges e histogramas com labels
+Atualizar uma métrica é um lock + soma, barato o bastante para ficar sempre ligado
+"""
+import time
+import asyncio
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+# Segundos: de requisições rápidas até downloads longos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Bytes por segundo: 100 KB/s até 100 MB/s
+THROUGHPUT_BUCKETS = (1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7, 1e8)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo; com `callback`, é calculado na hora da coleta
+    (callback retorna {tupla de labels: valor})
+    """
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        if self.callback:
+            try:
+                values = list(self.callback().items())
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e}")
+                values = []
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por label: contagem por bucket (não cumulativa), soma, total
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total_sum, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total_sum)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class _Timer:
+    """Context manager que observa a duração do bloco no histograma"""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self.histogram.observe(self.elapsed, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+FETCH_DURATION = REGISTRY.register(Histogram(
+    "orchestrator_fetch_duration_seconds",
+    "Duration of fetch_from_source_data, including executor queue wait",
+    ["platform"]
+))
+DOWNLOAD_DURATION = REGISTRY.register(Histogram(
+    "orchestrator_download_duration_seconds",
+    "Duration of yt-dlp downloads, including executor queue wait",
+    ["platform"]
+))
+YTDLP_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "orchestrator_ytdlp_queue_wait_seconds",
+    "Time yt-dlp calls waited for a platform slot",
+    ["platform"]
+))
+DOWNLOADED_BYTES = REGISTRY.register(Counter(
+    "orchestrator_downloaded_bytes_total",
+    "Bytes of completed downloads",
+    ["platform"]
+))
+DOWNLOAD_THROUGHPUT = REGISTRY.register(Histogram(
+    "orchestrator_download_throughput_bytes_per_second",
+    "Per-download throughput",
+    ["platform"],
+    buckets=THROUGHPUT_BUCKETS
+))
+ERRORS = REGISTRY.register(Counter(
+    "orchestrator_errors_total",
+    "Errors by component and exception class",
+    ["component", "error"]
+))
+THROTTLE_EVENTS = REGISTRY.register(Counter(
+    "orchestrator_throttle_events_total",
+    "Rate-limit responses (429, bot checks) received from each platform",
+    ["platform"]
+))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "orchestrator_jobs_in_flight",
+    "Background jobs running in this process",
+    ["kind"]
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "orchestrator_http_request_duration_seconds",
+    "HTTP request latency until response headers, by route template",
+    ["method", "route", "status"]
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "orchestrator_http_requests_in_flight",
+    "HTTP requests being handled"
+))
+EVENT_LOOP_LAG = REGISTRY.register(Gauge(
+    "orchestrator_event_loop_lag_seconds",
+    "Delay of the last event loop tick beyond its scheduled time"
+))
+EVENT_LOOP_LAG_MAX = REGISTRY.register(Gauge(
+    "orchestrator_event_loop_lag_max_seconds",
+    "Largest event loop lag since the process started"
+))
+
+
+def record_error(component: str, error: BaseException):
+    ERRORS.inc(component=component, error=type(error).__name__)
+
+
+class EventLoopMonitor:
+    """Mede o atraso do event loop: quanto um sleep(interval) demora além do previsto"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._max_lag = 0.0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            EVENT_LOOP_LAG.set(lag)
+            if lag > self._max_lag:
+                self._max_lag = lag
+                EVENT_LOOP_LAG_MAX.set(lag)
@@ -0,0 +1,184 @@
+"""
+Coalescência de operações idênticas em andamento (single-flight)
+- No processo: chamadas concorrentes com a mesma chave aguardam a mesma task
+- Entre workers do uvicorn: lock de arquivo (flock) em {LOCAL_STORAGE_PATH}/.locks;
+  quem esperou o lock reaproveita o resultado gravado por quem o segurava
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY, Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: só coalescência dentro do processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LOCK_DIR = ".locks"
+
+COALESCED = REGISTRY.register(Counter(
+    "orchestrator_coalesced_requests_total",
+    "Requests served by an identical operation already in flight",
+    ["kind", "scope"]
+))
+
+
+def lock_dir() -> str:
+    return os.path.join(settings.LOCAL_STORAGE_PATH, LOCK_DIR)
+
+
+@asynccontextmanager
+async def file_lock(path: str, poll_interval: float = 0.05, max_poll_interval: float = 0.5) -> AsyncIterator[bool]:
+    """
+    Lock exclusivo entre processos; espera sem ocupar threads (flock não bloqueante + sleep)
+    Retorna True se precisou esperar outro processo
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    contended = False
+    delay = poll_interval
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            contended = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+            continue
+        # Arquivo removido pela limpeza enquanto esperávamos: o lock seria de um inode órfão
+        try:
+            same_file = os.fstat(fd).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            same_file = False
+        if same_file:
+            break
+        os.close(fd)
+
+    try:
+        yield contended
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class SingleFlight:
+    """
+    do(key, func): executa func uma vez por chave enquanto houver chamadas aguardando
+    share_results: grava o resultado (JSON) para os workers que esperavam o mesmo lock
+    """
+
+    def __init__(self, kind: str, share_results: bool = False, cross_process: bool = True):
+        self.kind = kind
+        self.share_results = share_results
+        self.cross_process = cross_process
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def _paths(self, key: str):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        base = os.path.join(lock_dir(), f"{self.kind}-{digest}")
+        return f"{base}.lock", f"{base}.json"
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, func))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            COALESCED.inc(kind=self.kind, scope="process")
+        # shield: cancelar um chamador não cancela a operação dos demais
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Evita "exception was never retrieved" se todos desistiram
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.cross_process:
+            return await func()
+
+        lock_path, result_path = self._paths(key)
+        waiting_since = time.time()
+        async with file_lock(lock_path) as contended:
+            if contended and self.share_results:
+                shared = await asyncio.to_thread(_load_result, result_path, waiting_since)
+                if shared is not None:
+                    COALESCED.inc(kind=self.kind, scope="worker")
+                    return shared["result"]
+            result = await func()
+            if self.share_results:
+                await asyncio.to_thread(_store_result, result_path, result)
+            return result
+
+
+def _load_result(path: str, newer_than: float) -> Optional[Dict]:
+    """Resultado gravado depois que começamos a esperar (senão é de uma chamada anterior)"""
+    try:
+        if os.path.getmtime(path) < newer_than:
+            return None
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_result(path: str, result: Any):
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"result": result}, f, default=str)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not share single-flight result: {e}")
+
+
+def sweep_locks(max_age: float, dry_run: bool = False) -> int:
+    """Remove locks e resultados sem uso recente (bloqueante); locks em uso são preservados"""
+    root = lock_dir()
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(root):
+        try:
+            if entry.stat().st_mtime > cutoff:
+                continue
+            if entry.name.endswith(".lock") and fcntl is not None:
+                fd = os.open(entry.path, os.O_RDWR)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                else:
+                    if not dry_run:
+                        os.remove(entry.path)
+                finally:
+                    os.close(fd)
+            elif not dry_run:
+                os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+@lru_cache(maxsize=None)
+def get_single_flight(kind: str, share_results: bool = False) -> SingleFlight:
+    return SingleFlight(kind, share_results=share_results)
@@ -1,23 +1,140 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from app.api.encoding import FastJSONResponse
 from app.core.config import get_settings
+from app.core.http import close_http_client
 from app.core.logging import setup_logging
-from app.api.routes import fetch, select, download, confirm, health, n8n
+from app.core.metrics import (
+    CONTENT_TYPE, HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION, REGISTRY, EventLoopMonitor, record_error
+)
+from app.api.routes import (
+    fetch, select, download, confirm, health, n8n, media, process, storage, files, upload, progress
+)
+from app.services.downloader.service import DownloaderService
+from app.services.executor.service import QueueFullError, shutdown_executor
+from app.services.executor.ytdlp import close_ytdlp_pool, get_ytdlp_pool
+from app.services.fetcher.service import FetcherService
+from app.services.jobs.service import JobQueueFullError, get_download_queue, get_processing_queue
+from app.services.storage.service import get_retention_sweeper
 
 setup_logging()
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    download_queue = get_download_queue()
+    processing_queue = get_processing_queue()
+    sweeper = get_retention_sweeper()
+    loop_monitor = EventLoopMonitor()
+    await loop_monitor.start()
+    await download_queue.start()
+    await processing_queue.start()
+    await sweeper.start()
+    # yt-dlp é importado e aquecido depois que o servidor já responde /health
+    warmup = None
+    if settings.YTDLP_WARMUP:
+        downloader = DownloaderService()
+        # Um perfil de download por padrão de plataforma
+        download_profiles = sorted(set(settings.DOWNLOAD_PLATFORM_PROFILES.values()))
+        warmup = asyncio.create_task(get_ytdlp_pool().warm_up([
+            FetcherService.listing_options(),
+            downloader.metadata_options(),
+            *(downloader.download_options(name) for name in download_profiles),
+        ]))
+    yield
+    if warmup:
+        await warmup
+    await sweeper.stop()
+    await download_queue.stop()
+    await processing_queue.stop()
+    await loop_monitor.stop()
+    await close_http_client()
+    shutdown_executor()
+    close_ytdlp_pool()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+# Prefixo de inclusão por rota: versões recentes do FastAPI deixam em scope["route"]
+# a rota original do router, com o caminho relativo ao prefixo (chave: id da rota)
+_route_prefixes = {}
+
+def _route_template(request: Request) -> str:
+    """Caminho com parâmetros no lugar dos valores: /v1/download/{job_id}"""
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    return _route_prefixes.get(id(route), "") + route.path
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Latência por rota (template, não URL - cardinalidade fixa)"""
+    HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    except Exception as e:
+        record_error("http", e)
+        raise
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=_route_template(request),
+            status=str(status)
+        )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    """Backpressure: fila do yt-dlp cheia para a plataforma"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "platform": exc.platform},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(JobQueueFullError)
+async def job_queue_full_handler(request: Request, exc: JobQueueFullError):
+    """Backpressure: muitos jobs pendentes na fila"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Include Routers
-app.include_router(n8n.router, prefix=f"{settings.API_V1_STR}/n8n", tags=["n8n"])
-app.include_router(fetch.router, prefix=f"{settings.API_V1_STR}/fetch", tags=["Fetch"])
-app.include_router(select.router, prefix=f"{settings.API_V1_STR}/select", tags=["Select"])
-app.include_router(download.router, prefix=f"{settings.API_V1_STR}/download", tags=["Download"])
-app.include_router(confirm.router, prefix=f"{settings.API_V1_STR}/confirm_publish", tags=["Confirm"])
+ROUTERS = [
+    (n8n.router, "/n8n", "n8n"),
+    (fetch.router, "/fetch", "Fetch"),
+    (select.router, "/select", "Select"),
+    (download.router, "/download", "Download"),
+    (progress.router, "/progress", "Progress"),
+    (process.router, "/process", "Process"),
+    (media.router, "/media", "Media"),
+    (upload.router, "/upload", "Upload"),
+    (files.router, "/files", "Files"),
+    (storage.router, "/storage", "Storage"),
+    (confirm.router, "/confirm_publish", "Confirm"),
+]
+for router, prefix, tag in ROUTERS:
+    app.include_router(router, prefix=f"{settings.API_V1_STR}{prefix}", tags=[tag])
+    _route_prefixes.update((id(route), f"{settings.API_V1_STR}{prefix}") for route in router.routes)
 app.include_router(health.router, tags=["Health"])
 
 @app.get("/", response_class=HTMLResponse)
@@ -69,6 +186,15 @@ def root():
                         <li><code>POST /v1/fetch/run</code></li>
                         <li><code>POST /v1/select</code></li>
                         <li><code>POST /v1/download</code></li>
+                        <li><code>GET /v1/download/{job_id}</code></li>
+                        <li><code>GET /v1/progress/jobs/{job_id}</code> (SSE)</li>
+                        <li><code>POST /v1/download/plan</code></li>
+                        <li><code>POST /v1/process</code></li>
+                        <li><code>GET /v1/media/{external_video_id}</code></li>
+                        <li><code>GET /v1/files/{external_video_id}</code></li>
+                        <li><code>POST /v1/upload</code></li>
+                        <li><code>GET /v1/storage/usage</code></li>
+                        <li><code>GET /metrics</code></li>
                     </ul>
                 </div>
             </div>
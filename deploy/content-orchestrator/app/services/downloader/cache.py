@@ -0,0 +1,119 @@
+"""
+Cache de metadados de vídeo (info dict do yt-dlp) por URL
+LRU em memória com TTL e, opcionalmente, cópia em disco (JSON)
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class VideoInfoCache:
+    """
+    O TTL deve ficar abaixo da validade das URLs de formato (YouTube ~6h)
+    Operações de disco são bloqueantes - chamar fora do event loop
+    """
+
+    def __init__(self, max_entries: int, ttl: float, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _key(self, video_url: str) -> str:
+        return video_url.strip()
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def get(self, video_url: str) -> Optional[Dict]:
+        """Busca apenas em memória (não bloqueia)"""
+        key = self._key(video_url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            stored_at, info = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return info
+
+    def load(self, video_url: str) -> Optional[Dict]:
+        """Memória e, se não encontrar, disco"""
+        info = self.get(video_url)
+        if info is not None or not self.disk_dir:
+            return info
+
+        key = self._key(video_url)
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - data.get("stored_at", 0) > self.ttl:
+            self._remove_file(path)
+            return None
+        self._remember(key, data["stored_at"], data["info"])
+        return data["info"]
+
+    def put(self, video_url: str, info: Dict):
+        key = self._key(video_url)
+        stored_at = time.time()
+        self._remember(key, stored_at, info)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"stored_at": stored_at, "url": key, "info": info}, f)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Could not write video info cache to disk: {e}")
+                self._remove_file(tmp_path)
+
+    def invalidate(self, video_url: str):
+        key = self._key(video_url)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk_dir:
+            self._remove_file(self._disk_path(key))
+
+    def _remember(self, key: str, stored_at: float, info: Dict):
+        with self._lock:
+            self._entries[key] = (stored_at, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@lru_cache()
+def get_video_info_cache() -> VideoInfoCache:
+    return VideoInfoCache(
+        max_entries=settings.VIDEO_INFO_CACHE_SIZE,
+        ttl=settings.VIDEO_INFO_CACHE_TTL_SECONDS,
+        disk_dir=settings.VIDEO_INFO_CACHE_DIR
+    )
@@ -0,0 +1,73 @@
+"""
+Limites de download: concorrência por host e banda global
+"""
+import time
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def download_host(video_url: str) -> Optional[str]:
+    """Host normalizado (sem www./m.) usado para agrupar limites"""
+    host = (urlparse(video_url).hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host or None
+
+
+def host_limit(host: str) -> int:
+    return settings.DOWNLOAD_HOST_CONCURRENCY.get(host, settings.DOWNLOAD_HOST_CONCURRENCY_DEFAULT)
+
+
+class BandwidthLimiter:
+    """
+    Token bucket compartilhado pelos downloads do processo
+    consume() bloqueia a thread do yt-dlp até haver banda disponível
+    """
+
+    def __init__(self, bytes_per_second: int, burst_seconds: float = 1.0):
+        self.rate = bytes_per_second
+        self.capacity = bytes_per_second * burst_seconds
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+    def progress_hook(self) -> Callable[[Dict], None]:
+        """Hook do yt-dlp que debita os bytes recebidos desde a última chamada"""
+        last = {"filename": None, "bytes": 0}
+
+        def hook(progress: Dict):
+            if progress.get("status") != "downloading":
+                return
+            downloaded = progress.get("downloaded_bytes") or 0
+            if progress.get("filename") != last["filename"]:
+                last["filename"] = progress.get("filename")
+                last["bytes"] = 0
+            delta = downloaded - last["bytes"]
+            last["bytes"] = downloaded
+            if delta > 0:
+                self.consume(delta)
+
+        return hook
+
+
+@lru_cache()
+def get_bandwidth_limiter() -> Optional[BandwidthLimiter]:
+    if not settings.DOWNLOAD_BANDWIDTH_LIMIT:
+        return None
+    return BandwidthLimiter(settings.DOWNLOAD_BANDWIDTH_LIMIT)
@@ -0,0 +1,101 @@
+"""
+Planejamento do caminho final dos downloads
+O mesmo cálculo é usado ao enfileirar (resposta da API) e ao baixar,
+então o n8n não precisa normalizar nomes nem reconciliar arquivos com ls/mv
+"""
+import os
+import re
+import unicodedata
+from typing import Dict, Optional
+from app.core.config import get_settings
+from app.services.media.store import get_media_index, folder_name
+
+settings = get_settings()
+
+# Emojis e pictogramas (mesmas faixas usadas desde a primeira versão)
+_EMOJI = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+"
+)
+
+# Convertidos antes da decomposição (ª e º não têm forma NFD com letra base)
+_CHAR_MAP = str.maketrans({
+    'ª': 'a',  # ª (ordinal feminino)
+    'º': 'o',  # º (ordinal masculino)
+    '°': 'o',  # ° (grau)
+    'ç': 'c',  # ç
+    'Ç': 'c',  # Ç
+    'ñ': 'n',  # ñ
+    'Ñ': 'n',  # Ñ
+})
+
+# Tudo que não é ASCII alfanumérico ou separador some (inclui acentos já decompostos)
+_INVALID = re.compile(r"[^A-Za-z0-9 _.\-]+")
+_SEPARATORS = re.compile(r"[ _.\-]+")
+# Sufixo de colisão: IDs diferenciam maiúsculas, então só removemos o que não cabe em nome de arquivo
+_ID_UNSAFE = re.compile(r"[^A-Za-z0-9_\-]+")
+
+
+def slugify(title: str, max_length: int = 200) -> str:
+    """
+    Slug do título: minúsculo, sem acentos, sem emojis, separadores viram um único underscore
+    Ex: "Ação Nº 1 - Vídeo 🎬" -> "acao_no_1_video"
+    """
+    text = unicodedata.normalize("NFD", _EMOJI.sub("", title).translate(_CHAR_MAP))
+    slug = _SEPARATORS.sub("_", _INVALID.sub("", text)).strip("_").lower()
+    if len(slug) > max_length:
+        slug = slug[:max_length].rstrip("_")
+    return slug or "video"
+
+
+def safe_id(external_video_id: str) -> str:
+    """ID usável em nome de arquivo (mantém maiúsculas: IDs do YouTube diferenciam)"""
+    return _ID_UNSAFE.sub("", external_video_id) or "video"
+
+
+def download_dir(platform: str, group_name: Optional[str] = None, source_name: Optional[str] = None) -> str:
+    """Organiza por downloads/{grupo}/{fonte} ou downloads/{plataforma}"""
+    if group_name and source_name:
+        return os.path.join(settings.LOCAL_STORAGE_PATH, folder_name(group_name), folder_name(source_name))
+    return os.path.join(settings.LOCAL_STORAGE_PATH, platform)
+
+
+def plan_path(
+    external_video_id: str,
+    platform: str,
+    group_name: Optional[str] = None,
+    source_name: Optional[str] = None,
+    title: Optional[str] = None
+) -> Dict:
+    """
+    Caminho final do vídeo, estável entre chamadas
+    - já baixado: caminho do índice de mídias
+    - já planejado: caminho reservado anteriormente
+    - novo: {slug}.mp4; se outro vídeo já reservou esse nome, {slug}_{external_video_id}.mp4
+    Sem título, usa {external_video_id}.mp4
+    """
+    index = get_media_index()
+    record = index.get_valid(external_video_id)
+    if record:
+        return {"external_video_id": external_video_id, "path": record["path"], "status": "downloaded"}
+
+    path = index.reserved_path(external_video_id)
+    if path is None:
+        directory = download_dir(platform, group_name, source_name)
+        if title:
+            slug = slugify(title)
+            path = os.path.join(directory, f"{slug}.mp4")
+            if index.reserve_path(external_video_id, path) != external_video_id:
+                path = os.path.join(directory, f"{slug}_{safe_id(external_video_id)}.mp4")
+                index.reserve_path(external_video_id, path)
+        else:
+            path = os.path.join(directory, f"{external_video_id}.mp4")
+            index.reserve_path(external_video_id, path)
+
+    return {"external_video_id": external_video_id, "path": path, "status": "planned"}
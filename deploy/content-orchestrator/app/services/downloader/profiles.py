@@ -0,0 +1,112 @@
+"""
+Perfis de download nomeados: resolução, tamanho, codecs, só áudio e fragmentos em paralelo
+Escolha: profile do request > DOWNLOAD_GROUP_PROFILES > DOWNLOAD_PLATFORM_PROFILES > DOWNLOAD_DEFAULT_PROFILE
+DOWNLOAD_PROFILES (JSON) acrescenta ou substitui perfis
+"""
+import os
+from typing import Any, Dict, Optional
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Campos aceitos em um perfil
+PROFILE_FIELDS = {
+    "max_resolution": int,  # Em "p" (menor lado): 1080 = 1080p também em vídeo vertical
+    "max_filesize": int,  # Bytes por stream; formatos sem tamanho informado passam
+    "video_codec": str,  # Preferência (ex: "h264"); outros codecs só se não houver
+    "audio_codec": str,  # Ex: "aac"
+    "audio_only": bool,
+    "merge": bool,  # Vídeo e áudio separados (DASH/HLS) unidos com ffmpeg em mp4
+    "concurrent_fragments": int,  # Fragmentos DASH/HLS baixados em paralelo
+    "http_chunk_size": int,  # Bytes por requisição HTTP (contorna throttling de downloads longos)
+}
+
+BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Comportamento anterior: melhor arquivo progressivo mp4
+    "source": {},
+    "shorts_1080": {
+        "max_resolution": 1080,
+        "video_codec": "h264",
+        "audio_codec": "aac",
+        "merge": True,
+        "concurrent_fragments": 4,
+    },
+    "shorts_720": {
+        "max_resolution": 720,
+        "max_filesize": 100 * 1024 * 1024,
+        "video_codec": "h264",
+        "audio_codec": "aac",
+        "merge": True,
+        "concurrent_fragments": 4,
+    },
+    "audio": {
+        "audio_only": True,
+        "audio_codec": "aac",
+    },
+}
+
+
+def all_profiles() -> Dict[str, Dict[str, Any]]:
+    return {**BUILTIN_PROFILES, **settings.DOWNLOAD_PROFILES}
+
+
+def get_profile(name: str) -> Dict[str, Any]:
+    """ValueError se o perfil não existir ou tiver campos inválidos"""
+    profile = all_profiles().get(name)
+    if profile is None:
+        raise ValueError(f"Unknown download profile {name!r}; available: {sorted(all_profiles())}")
+    for field, value in profile.items():
+        expected = PROFILE_FIELDS.get(field)
+        if expected is None:
+            raise ValueError(f"Download profile {name!r}: unknown field {field!r}")
+        if value is not None and not isinstance(value, expected):
+            raise ValueError(f"Download profile {name!r}: {field} must be {expected.__name__}")
+    return profile
+
+
+def resolve_profile(platform: str, group_name: Optional[str] = None, requested: Optional[str] = None) -> str:
+    """Nome do perfil a usar (validado)"""
+    name = (
+        requested
+        or settings.DOWNLOAD_GROUP_PROFILES.get(group_name or "")
+        or settings.DOWNLOAD_PLATFORM_PROFILES.get(platform)
+        or settings.DOWNLOAD_DEFAULT_PROFILE
+    )
+    get_profile(name)
+    return name
+
+
+def ytdlp_options(name: str) -> Dict[str, Any]:
+    """Opções do yt-dlp para o perfil: format, format_sort e parâmetros do downloader"""
+    profile = get_profile(name)
+    size = f"[filesize<=?{profile['max_filesize']}]" if profile.get("max_filesize") else ""
+
+    if profile.get("audio_only"):
+        # m4a é mp4 só com áudio (o caminho final continua .mp4)
+        format_spec = f"ba[ext=m4a]{size}/ba[ext=mp4]{size}/best[ext=mp4]{size}/best{size}"
+    elif profile.get("merge"):
+        format_spec = f"bv*{size}+ba/best{size}"
+    else:
+        format_spec = f"best[ext=mp4]{size}/best{size}"
+    options: Dict[str, Any] = {'format': format_spec}
+
+    # Ordenação, não filtro: sem formato dentro do limite, fica o menor acima dele
+    format_sort = []
+    if profile.get("max_resolution"):
+        format_sort.append(f"res:{profile['max_resolution']}")
+    if profile.get("video_codec"):
+        format_sort.append(f"vcodec:{profile['video_codec']}")
+    if profile.get("audio_codec"):
+        format_sort.append(f"acodec:{profile['audio_codec']}")
+    if format_sort:
+        options['format_sort'] = format_sort
+
+    if profile.get("merge"):
+        options['merge_output_format'] = 'mp4'
+        if os.path.dirname(settings.FFMPEG_PATH):
+            options['ffmpeg_location'] = settings.FFMPEG_PATH
+    if profile.get("concurrent_fragments"):
+        options['concurrent_fragment_downloads'] = profile['concurrent_fragments']
+    if profile.get("http_chunk_size"):
+        options['http_chunk_size'] = profile['http_chunk_size']
+    return options
@@ -3,113 +3,99 @@ Serviço de download usando yt-dlp (biblioteca Python)
 Estratégia única e confiável para download de vídeos
 """
 import os
+import copy
+import time
+import shutil
+import asyncio
 import logging
+from functools import partial
 from typing import Optional
 from app.core.config import get_settings
+from app.core.metrics import DOWNLOAD_DURATION, DOWNLOAD_THROUGHPUT, DOWNLOADED_BYTES, ERRORS, record_error
+from app.core.singleflight import file_lock, get_single_flight, lock_dir
+from app.services.executor.service import get_executor
+from app.services.executor.ytdlp import get_ytdlp_pool
+from app.services.downloader.cache import get_video_info_cache
+from app.services.downloader.limits import get_bandwidth_limiter
+from app.services.downloader.paths import download_dir, plan_path, safe_id
+from app.services.downloader.profiles import resolve_profile, ytdlp_options
+from app.services.media.store import get_media_index, folder_name, file_sha256
+from app.services.progress.bus import get_progress_bus
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Pasta (dentro do destino) onde ficam downloads em andamento
+PARTIAL_DIR = ".partial"
+
+# Sem tamanho de referência (reescrito pelo ffmpeg ou origem sem tamanho): abaixo disso é download quebrado
+MIN_FILE_SIZE = 1000
+
+# Pós-processador que só move o arquivo (não altera o conteúdo)
+_MOVE_ONLY_POSTPROCESSORS = ("MoveFiles",)
+
 class DownloaderService:
     def __init__(self):
         """Serviço stateless - não precisa de sessão de banco"""
         pass
 
-    def _sanitize_filename(self, filename: str, max_length: int = 200) -> str:
-        """Limpa o nome do arquivo criando um slug: minúsculo, sem acentos, sem emojis, espaços viram underscores"""
-        import re
-        import unicodedata
-        
-        # Remover emojis e caracteres especiais
-        # Remove emojis (Unicode ranges para emojis)
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "]+", flags=re.UNICODE
-        )
-        filename = emoji_pattern.sub('', filename)
-        
-        # Mapear caracteres especiais ANTES da normalização
-        # Isso garante que caracteres como ª e º sejam convertidos antes de serem decompostos
-        char_map = {
-            '\u00AA': 'a',  # ª (ordinal feminino)
-            '\u00BA': 'o',  # º (ordinal masculino)
-            '\u00B0': 'o',  # ° (grau)
-            '\u00E7': 'c',  # ç
-            '\u00C7': 'c',  # Ç
-            '\u00F1': 'n',  # ñ
-            '\u00D1': 'n',  # Ñ
+    def _cookies_path(self) -> Optional[str]:
+        cookies_path = os.path.join(settings.LOCAL_STORAGE_PATH, '..', 'data', 'cookies.txt')
+        return cookies_path if os.path.exists(cookies_path) else None
+
+    def metadata_options(self) -> dict:
+        """Perfil de metadados (uma extração por vídeo, sem download)"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
         }
-        for old, new in char_map.items():
-            filename = filename.replace(old, new)
-        
-        # Normalizar Unicode (NFD = Normalized Form Decomposed)
-        # Isso separa acentos dos caracteres
-        filename = unicodedata.normalize('NFD', filename)
-        
-        # Remover acentos (diacríticos) - categoria 'Mn' = Mark, Nonspacing
-        filename = ''.join(
-            char for char in filename 
-            if unicodedata.category(char) != 'Mn'  # Remove acentos
-        )
-        
-        # Agora manter apenas letras ASCII, números e alguns caracteres básicos
-        filename = ''.join(
-            char for char in filename 
-            if (char.isascii() and char.isalnum()) or char in ' _-.'  # Mantém apenas ASCII alfanumérico
-        )
-        
-        # Converter para minúsculas
-        filename = filename.lower()
         
-        # Remover caracteres inválidos para nome de arquivo
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        
-        # Substituir espaços, hífens e pontos por underscore
-        filename = re.sub(r'[\s\-_\.]+', '_', filename)
-        
-        # Remover underscores múltiplos
-        filename = re.sub(r'_+', '_', filename)
-        
-        # Remover underscores no início e fim
-        filename = filename.strip('_')
-        
-        # Limitar tamanho
-        if len(filename) > max_length:
-            filename = filename[:max_length].rstrip('_')
-        
-        # Se ficar vazio, usar um nome padrão
-        if not filename:
-            filename = "video"
-        
-        return filename
+        # Tentar usar cookies se existirem
+        cookies_path = self._cookies_path()
+        if cookies_path:
+            ydl_opts['cookiefile'] = cookies_path
+        return ydl_opts
+
+    def download_options(self, profile: Optional[str] = None) -> dict:
+        """
+        Opções de download do perfil (formato, fragmentos, chunk HTTP)
+        outtmpl e progress_hooks são aplicados por chamada
+        """
+        return {
+            **self.metadata_options(),
+            **ytdlp_options(profile or settings.DOWNLOAD_DEFAULT_PROFILE),
+            'continuedl': True,  # Retoma o .part de uma tentativa anterior
+            'nopart': False,
+        }
+
+    def _extract_info(self, video_url: str, ydl_opts: dict) -> dict:
+        """
+        Chamada bloqueante ao yt-dlp - executada no pool do executor
+        process=False: info bruto, a seleção de formato fica para o download
+        """
+        with get_ytdlp_pool().session(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=False, process=False)
+        get_video_info_cache().put(video_url, info)
+        return info
+
+    async def _get_video_info(self, video_url: str, platform: str) -> Optional[dict]:
+        """
+        Busca os metadados do vídeo uma única vez (cache por URL)
+        O mesmo info é usado para nome do arquivo, formato e download
+        """
+        cache = get_video_info_cache()
+        info = cache.get(video_url)
+        if info is None and cache.disk_dir:
+            info = await asyncio.to_thread(cache.load, video_url)
+        if info is not None:
+            logger.info(f"Using cached video info for {video_url}")
+            return info
 
-    async def _get_video_title(self, video_url: str) -> Optional[str]:
-        """Busca o título do vídeo usando yt-dlp"""
         try:
-            import yt_dlp
-            
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'skip_download': True,  # Não baixar, só pegar info
-            }
-            
-            # Tentar usar cookies se existirem
-            cookies_path = os.path.join(settings.LOCAL_STORAGE_PATH, '..', 'data', 'cookies.txt')
-            if os.path.exists(cookies_path):
-                ydl_opts['cookiefile'] = cookies_path
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_url, download=False)
-                return info.get('title')
+            return await get_executor().run(platform, self._extract_info, video_url, self.metadata_options())
         except Exception as e:
-            logger.warning(f"Could not get video title: {e}")
+            logger.warning(f"Could not get video info: {e}")
             return None
 
     async def download_video(
@@ -118,117 +104,272 @@ class DownloaderService:
         platform: str,
         external_video_id: str,
         group_name: Optional[str] = None,
-        source_name: Optional[str] = None
+        source_name: Optional[str] = None,
+        title: Optional[str] = None,
+        profile: Optional[str] = None
     ):
         """
         Faz download de um vídeo usando múltiplas estratégias
         Organiza por: downloads/{grupo}/{fonte}/{titulo_do_video}.mp4
+        profile: perfil de download (padrão: do grupo ou da plataforma)
+        Pedidos simultâneos do mesmo vídeo e perfil (inclusive de outros workers) compartilham um download:
+        quem espera o lock encontra o vídeo já no índice
+        Perfis diferentes do mesmo vídeo rodam um depois do outro (mesmo arquivo final)
         """
-        # Organizar estrutura de pastas
-        if group_name and source_name:
-            group_folder = group_name.replace(" ", "_").lower()
-            source_folder = source_name.replace(" ", "_").lower()
-            download_dir = os.path.join(settings.LOCAL_STORAGE_PATH, group_folder, source_folder)
-        else:
-            download_dir = os.path.join(settings.LOCAL_STORAGE_PATH, platform)
-        
-        os.makedirs(download_dir, exist_ok=True)
+        try:
+            profile = resolve_profile(platform, group_name, profile)
+        except ValueError as e:
+            result = {"status": "failed", "error": f"Download failed: {e}"}
+            get_progress_bus().finish(external_video_id, group_name, result, profile)
+            return result
+
+        result = await get_single_flight("download").do(
+            f"{external_video_id}:{profile}",
+            lambda: self._download_and_report(
+                video_url, platform, external_video_id, group_name, source_name, title, profile
+            )
+        )
+        return dict(result)
+
+    async def _download_and_report(
+        self,
+        video_url: str,
+        platform: str,
+        external_video_id: str,
+        group_name: Optional[str],
+        source_name: Optional[str],
+        title: Optional[str],
+        profile: Optional[str]
+    ):
+        """Publica o evento final (completed/failed) no barramento de progresso"""
+        try:
+            async with file_lock(os.path.join(lock_dir(), f"video-{safe_id(external_video_id)}.lock")):
+                result = await self._download_video(
+                    video_url, platform, external_video_id, group_name, source_name, title, profile
+                )
+        except Exception as e:
+            get_progress_bus().finish(external_video_id, group_name, {"status": "failed", "error": str(e)}, profile)
+            raise
+        get_progress_bus().finish(external_video_id, group_name, result, profile)
+        return result
+
+    async def _download_video(
+        self,
+        video_url: str,
+        platform: str,
+        external_video_id: str,
+        group_name: Optional[str],
+        source_name: Optional[str],
+        title: Optional[str],
+        profile: str
+    ):
+        # Já baixado com este perfil? Consulta O(1) no índice de mídias (sem perfil: anterior aos perfis)
+        record = await asyncio.to_thread(get_media_index().get_valid, external_video_id)
+        if record and record["profile"] not in (None, profile):
+            logger.info(f"{external_video_id} indexed with profile {record['profile']}, downloading as {profile}")
+        elif record:
+            await asyncio.to_thread(get_media_index().touch, external_video_id)
+            logger.info(f"File already indexed: {record['path']} ({record['size']} bytes)")
+            return {"status": "completed", "path": record["path"]}
+
+        # Organizar estrutura de pastas (grupo vai para o índice mesmo sem fonte: cotas e listagem)
+        group_folder = folder_name(group_name) if group_name else None
+        source_folder = folder_name(source_name) if source_name else None
+        directory = download_dir(platform, group_name, source_name)
         
-        # Buscar título do vídeo
-        video_title = await self._get_video_title(video_url)
+        os.makedirs(directory, exist_ok=True)
+        index_fields = {
+            "external_video_id": external_video_id,
+            "platform": platform,
+            "group_name": group_folder,
+            "source_name": source_folder,
+            "profile": profile,
+        }
         
-        # Usar título se disponível, senão usar external_video_id
-        if video_title:
-            filename = self._sanitize_filename(video_title)
-            output_path = os.path.join(download_dir, f"{filename}.mp4")
-            logger.info(f"Using video title as filename: {filename}")
-        else:
-            # Fallback para external_video_id se não conseguir o título
-            output_path = os.path.join(download_dir, f"{external_video_id}.mp4")
+        # Buscar metadados do vídeo (uma extração, reutilizada no download)
+        info = await self._get_video_info(video_url, platform)
+        video_title = title or (info.get('title') if info else None)
+        if not video_title:
             logger.warning(f"Could not get video title, using external_video_id: {external_video_id}")
+        
+        # Mesmo caminho devolvido por /v1/download/plan (reservado no índice)
+        planned = await asyncio.to_thread(plan_path, external_video_id, platform, group_name, source_name, video_title)
+        output_path = planned["path"]
+        logger.info(f"Planned output path: {output_path}")
 
-        # Verificar se arquivo já existe e está completo
-        # Verificar tanto pelo nome do título quanto pelo video_id (caso já tenha sido baixado antes)
+        # Arquivos baixados antes do índice existir: verificar no disco e registrar
+        # Downloads novos só chegam ao caminho final depois de verificados (rename atômico)
+        # Com registro de outro perfil, o arquivo no disco é justamente o que será substituído
         existing_path = None
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-            existing_path = output_path
-        else:
-            # Verificar se existe com o nome antigo (video_id)
-            old_path = os.path.join(download_dir, f"{external_video_id}.mp4")
-            if os.path.exists(old_path) and os.path.getsize(old_path) > 1000:
-                existing_path = old_path
+        if not record:
+            if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
+                existing_path = output_path
+            else:
+                # Verificar se existe com o nome antigo (video_id)
+                old_path = os.path.join(directory, f"{external_video_id}.mp4")
+                if os.path.exists(old_path) and os.path.getsize(old_path) > 1000:
+                    existing_path = old_path
         
         if existing_path:
             logger.info(f"File already exists: {existing_path} ({os.path.getsize(existing_path)} bytes)")
-            return {"status": "completed", "path": existing_path}
+            return await self._index_completed(existing_path, **index_fields)
 
         # Usar yt-dlp como biblioteca (única estratégia)
         try:
-            logger.info(f"Downloading {external_video_id} with yt-dlp")
-            result = await self._download_with_ytdlp_library(video_url, output_path)
-            
-            # Verificar se arquivo foi criado mesmo se status não for "completed"
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-                logger.info(f"Download completed - file created ({os.path.getsize(output_path)} bytes)")
-                return {"status": "completed", "path": output_path}
-            
-            if result.get('status') == 'completed':
-                logger.info("Download completed successfully")
-                return result
-            else:
-                logger.error(f"Download failed: {result.get('error')}")
-                return result
+            logger.info(f"Downloading {external_video_id} with yt-dlp (profile: {profile})")
+            result = await self._download_with_ytdlp_library(
+                video_url, output_path, platform, info, external_video_id, group_name, profile
+            )
         except Exception as e:
             logger.error(f"Download exception: {e}")
-            # Verificar se arquivo foi criado mesmo com exceção
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-                logger.info(f"File created despite exception ({os.path.getsize(output_path)} bytes)")
-                return {"status": "completed", "path": output_path}
             return {"status": "failed", "error": f"Download failed: {str(e)}"}
 
-    async def _download_with_ytdlp_library(self, video_url: str, output_path: str):
-        """Estratégia 1: yt-dlp como biblioteca Python (MAIS CONFIÁVEL)"""
+        if result.get('status') != 'completed':
+            logger.error(f"Download failed: {result.get('error')}")
+            return result
+
+        logger.info(f"Download completed and verified ({os.path.getsize(output_path)} bytes)")
+        return await self._index_completed(
+            output_path, expected_size=result.get("expected_size"), verified=True, **index_fields
+        )
+
+    async def _index_completed(self, path: str, external_video_id: str, **fields) -> dict:
+        """
+        Registra o arquivo concluído no índice de mídias (manifesto: tamanho, esperado, sha256)
+        As origens não publicam hash: o sha256 é o do arquivo recebido (ETag e detecção de troca), não é conferido
+        """
+        size = os.path.getsize(path)
+        sha256 = await asyncio.to_thread(file_sha256, path)
+        await asyncio.to_thread(
+            partial(get_media_index().put, external_video_id, path=path, size=size, sha256=sha256, **fields)
+        )
+        return {"status": "completed", "path": path}
+
+    def _staging_dir(self, output_path: str, external_video_id: str) -> str:
+        """
+        Pasta de trabalho do download, estável entre tentativas
+        Os .part do yt-dlp ficam aqui e são retomados depois de um reinício
+        """
+        return os.path.join(os.path.dirname(output_path), PARTIAL_DIR, safe_id(external_video_id))
+
+    def _finished_file(self, staging_dir: str, reported: Optional[str]) -> Optional[str]:
+        """Arquivo concluído na pasta de trabalho (ignora .part e temporários do yt-dlp)"""
+        if reported and os.path.exists(reported):
+            return reported
+        for name in sorted(os.listdir(staging_dir)):
+            if not name.endswith(('.part', '.ytdl', '.temp')):
+                return os.path.join(staging_dir, name)
+        return None
+
+    def _run_ytdlp_download(self, video_url: str, ydl_opts: dict, info: Optional[dict] = None):
+        """
+        Chamada bloqueante ao yt-dlp - executada no pool do executor
+        Com info já extraído, apenas seleciona o formato e baixa (sem nova extração)
+        """
+        with get_ytdlp_pool().session(ydl_opts) as ydl:
+            if info is not None:
+                ydl.process_ie_result(copy.deepcopy(info), download=True)
+            else:
+                ydl.download([video_url])
+
+    async def _download_with_ytdlp_library(
+        self,
+        video_url: str,
+        output_path: str,
+        platform: str,
+        info: Optional[dict] = None,
+        external_video_id: Optional[str] = None,
+        group_name: Optional[str] = None,
+        profile: Optional[str] = None
+    ):
+        """
+        Estratégia 1: yt-dlp como biblioteca Python (MAIS CONFIÁVEL)
+        Baixa na pasta de trabalho, confere o tamanho esperado e só então
+        move para o caminho final com os.replace (atômico no mesmo disco)
+        """
+        staging_dir = self._staging_dir(output_path, external_video_id or os.path.basename(output_path))
+        os.makedirs(staging_dir, exist_ok=True)
+        finished = {'parts': 0, 'postprocessors': []}
+
+        def on_progress(d):
+            # Chamado na thread do executor; guarda o tamanho informado pela origem antes do fim:
+            # filesize do formato (extrator) ou Content-Length (total_bytes durante o download)
+            # No "finished" o total_bytes é só o que chegou - não serve de referência
+            if d.get('status') == 'downloading' and d.get('total_bytes'):
+                finished['content_length'] = d['total_bytes']
+            elif d.get('status') == 'finished':
+                finished['parts'] += 1
+                finished['filename'] = d.get('filename')
+                finished['expected_size'] = (
+                    (d.get('info_dict') or {}).get('filesize') or finished.pop('content_length', None)
+                )
+
+        def on_postprocess(d):
+            # Merge e correções do ffmpeg (m4a DASH, HLS) reescrevem o arquivo depois do download
+            if d.get('status') == 'finished':
+                finished['postprocessors'].append(d.get('postprocessor'))
+                finished['filepath'] = (d.get('info_dict') or {}).get('filepath')
+
         try:
-            import yt_dlp
-            
-            # Configurações do yt-dlp
+            # Perfil de download + opções desta chamada
             ydl_opts = {
-                'format': 'best[ext=mp4]/best',
-                'outtmpl': output_path.replace('.mp4', '.%(ext)s'),
-                'quiet': True,
-                'no_warnings': True,
-                'noplaylist': True,
+                **self.download_options(profile),
+                'outtmpl': os.path.join(staging_dir, 'video.%(ext)s'),
+                'progress_hooks': [on_progress],
+                'postprocessor_hooks': [on_postprocess],
             }
             
-            # Tentar usar cookies se existirem
-            cookies_path = os.path.join(settings.LOCAL_STORAGE_PATH, '..', 'data', 'cookies.txt')
-            if os.path.exists(cookies_path):
-                ydl_opts['cookiefile'] = cookies_path
-                logger.info("Using cookies file")
-            
-            # Usar yt-dlp como biblioteca
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-            
-            # Verificar se arquivo foi criado
-            if os.path.exists(output_path):
-                return {"status": "completed", "path": output_path}
+            # Bytes, velocidade e ETA para os assinantes (SSE/WebSocket)
+            if external_video_id:
+                progress = get_progress_bus()
+                progress.start(external_video_id, group_name, profile)
+                ydl_opts['progress_hooks'].append(progress.hook(external_video_id, group_name, profile))
             
-            # Procurar arquivo com extensão diferente
-            base_path = output_path.replace('.mp4', '')
-            for ext in ['.mp4', '.webm', '.mkv', '.m4a']:
-                test_path = base_path + ext
-                if os.path.exists(test_path):
-                    # Se não for mp4, renomear para mp4
-                    if ext != '.mp4':
-                        os.rename(test_path, output_path)
-                    return {"status": "completed", "path": output_path}
+            # Limite global de banda (compartilhado entre downloads do processo)
+            bandwidth = get_bandwidth_limiter()
+            if bandwidth:
+                ydl_opts['progress_hooks'].append(bandwidth.progress_hook())
             
-            return {"status": "failed", "error": "File not found after yt-dlp download"}
-                
+            # Usar yt-dlp como biblioteca, fora do event loop
+            started = time.perf_counter()
+            try:
+                await get_executor().run(platform, self._run_ytdlp_download, video_url, ydl_opts, info)
+            finally:
+                elapsed = time.perf_counter() - started
+                DOWNLOAD_DURATION.observe(elapsed, platform=platform)
         except ImportError:
             return {"status": "failed", "error": "yt-dlp library not installed"}
         except Exception as e:
+            record_error("download", e)
             logger.error(f"yt-dlp library error: {e}")
+            # URLs de formato do info em cache podem ter expirado - próxima tentativa extrai de novo
+            get_video_info_cache().invalidate(video_url)
             return {"status": "failed", "error": f"yt-dlp error: {str(e)[:200]}"}
 
+        # Verificar antes de publicar: incompleto nunca chega ao caminho final
+        # Arquivo reescrito pelo ffmpeg (merge de vídeo + áudio ou correção) ou origem sem tamanho
+        # (HLS/DASH só estimam): sem referência, só descarta arquivo vazio/truncado
+        rewritten = finished['parts'] > 1 or any(
+            name not in _MOVE_ONLY_POSTPROCESSORS for name in finished['postprocessors']
+        )
+        reported = finished.get('filepath') or (None if finished['parts'] > 1 else finished.get('filename'))
+        path = self._finished_file(staging_dir, reported)
+        if not path:
+            return {"status": "failed", "error": "File not found after yt-dlp download"}
+
+        size = os.path.getsize(path)
+        expected_size = None if rewritten else finished.get('expected_size')
+        if size == 0 or (expected_size and size != expected_size) or (not expected_size and size <= MIN_FILE_SIZE):
+            ERRORS.inc(component="download", error="IncompleteDownload")
+            os.remove(path)
+            return {
+                "status": "failed",
+                "error": f"Incomplete download: {size} of {expected_size or 'unknown'} bytes"
+            }
+
+        os.replace(path, output_path)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        DOWNLOADED_BYTES.inc(size, platform=platform)
+        if elapsed > 0:
+            DOWNLOAD_THROUGHPUT.observe(size / elapsed, platform=platform)
+        return {"status": "completed", "path": output_path, "expected_size": expected_size}
@@ -0,0 +1,288 @@
+"""
+Executor dedicado para chamadas bloqueantes do yt-dlp
+Mantém o event loop livre e limita concorrência por plataforma
+Cada plataforma tem taxa adaptativa, novas tentativas com backoff e circuit breaker
+"""
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Optional
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY, YTDLP_QUEUE_WAIT, Gauge
+from app.services.executor.throttle import CircuitBreaker, PlatformGuard, is_transient
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PLATFORMS = ("youtube", "instagram", "tiktok")
+
+
+class QueueFullError(Exception):
+    """Fila da plataforma está cheia - cliente deve tentar novamente mais tarde"""
+
+    def __init__(self, platform: str, pending: int, retry_after: int):
+        self.platform = platform
+        self.pending = pending
+        self.retry_after = retry_after
+        super().__init__(f"yt-dlp queue for {platform} is full ({pending} pending)")
+
+
+class PlatformUnavailableError(QueueFullError):
+    """Circuito aberto: plataforma degradada, chamadas falham sem tentar (também vira 503)"""
+
+    def __init__(self, platform: str, pending: int, retry_after: int):
+        self.platform = platform
+        self.pending = pending
+        self.retry_after = retry_after
+        Exception.__init__(self, f"{platform} is temporarily unavailable (circuit open, retry in {retry_after}s)")
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[[], Any]):
+    """Agenda no event loop a partir de outra thread (loop já encerrado: ignora)"""
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
+
+
+def _should_retry(error: BaseException) -> bool:
+    """Prazo estourado e fila cheia voltam direto; erros transitórios da plataforma tentam de novo"""
+    if isinstance(error, (asyncio.TimeoutError, QueueFullError)):
+        return False
+    return is_transient(error)
+
+
+class YtdlpExecutor:
+    """
+    Pool de threads para yt-dlp com limite de concorrência por plataforma
+    Chamadas além do limite aguardam em fila; fila cheia gera QueueFullError
+    Erros transitórios (429, 5xx, conexão) são repetidos com backoff exponencial + jitter
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        limits: Dict[str, int],
+        default_limit: int,
+        max_queue_depth: int,
+        retry_after: int = 5,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: Optional[float] = None,
+        max_attempts: int = 1,
+        backoff_initial: float = 1,
+        backoff_max: float = 60,
+        failure_threshold: int = 5,
+        circuit_reset: float = 300
+    ):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ytdlp")
+        self._limits = limits
+        self._default_limit = default_limit
+        self._max_queue_depth = max_queue_depth
+        self._retry_after = retry_after
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, int] = {}
+        self._rates = rates or {}
+        self._default_rate = default_rate
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_initial = backoff_initial
+        self._backoff_max = backoff_max
+        self._failure_threshold = failure_threshold
+        self._circuit_reset = circuit_reset
+        self._guards: Dict[str, PlatformGuard] = {}
+        self.max_workers = max_workers
+
+    def limit_for(self, platform: str) -> int:
+        return self._limits.get(platform, self._default_limit)
+
+    def pending(self, platform: str) -> int:
+        """Chamadas em execução + aguardando para a plataforma"""
+        return self._pending.get(platform, 0)
+
+    def is_saturated(self, platform: str) -> bool:
+        return self.pending(platform) >= self.limit_for(platform) + self._max_queue_depth
+
+    def check_capacity(self, platform: str):
+        """Levanta QueueFullError se a fila da plataforma estiver cheia"""
+        if self.is_saturated(platform):
+            raise QueueFullError(platform, self.pending(platform), self._retry_after)
+
+    def _semaphore(self, platform: str) -> asyncio.Semaphore:
+        if platform not in self._semaphores:
+            self._semaphores[platform] = asyncio.Semaphore(self.limit_for(platform))
+        return self._semaphores[platform]
+
+    def guard(self, platform: str) -> Optional[PlatformGuard]:
+        """Limitador + circuit breaker da plataforma (None se sem limite de taxa)"""
+        if platform not in self._guards:
+            rate = self._rates.get(platform, self._default_rate)
+            if not rate or rate <= 0:
+                return None
+            self._guards[platform] = PlatformGuard(platform, rate, self._failure_threshold, self._circuit_reset)
+        return self._guards[platform]
+
+    async def run(
+        self,
+        platform: str,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Executa função bloqueante no pool respeitando o limite da plataforma
+        timeout conta só a execução de cada tentativa, não o tempo aguardando na fila
+        (prazo total: asyncio.wait_for em volta de run)
+        Thread não pode ser interrompida: no timeout ou cancelamento ela segue rodando
+        e a vaga da plataforma só é liberada quando termina
+        """
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self._max_attempts),
+            wait=wait_exponential_jitter(initial=self._backoff_initial, max=self._backoff_max),
+            retry=retry_if_exception(_should_retry),
+            before_sleep=lambda state: logger.warning(
+                f"{platform} call failed (attempt {state.attempt_number}/{self._max_attempts}), "
+                f"retrying in {state.next_action.sleep:.1f}s: {state.outcome.exception()}"
+            ),
+            reraise=True
+        )
+        async for attempt in retrying:
+            with attempt:
+                return await self._run_once(platform, func, args, kwargs, timeout)
+
+    async def _run_once(
+        self,
+        platform: str,
+        func: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        timeout: Optional[float]
+    ) -> Any:
+        self.check_capacity(platform)
+        guard = self.guard(platform)
+        if guard and not guard.allow():
+            raise PlatformUnavailableError(platform, self.pending(platform), guard.breaker.retry_after())
+
+        self._pending[platform] = self.pending(platform) + 1
+        queued_at = time.perf_counter()
+        recorded = False
+        semaphore = self._semaphore(platform)
+        release = None
+        try:
+            await semaphore.acquire()
+            release = semaphore.release
+            if guard:
+                await guard.bucket.acquire()
+            YTDLP_QUEUE_WAIT.observe(time.perf_counter() - queued_at, platform=platform)
+            loop = asyncio.get_running_loop()
+            future = self._pool.submit(partial(func, *args, **kwargs))
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except BaseException as e:
+                if not future.done():
+                    # Thread ainda rodando: a vaga volta quando ela terminar
+                    future.add_done_callback(lambda _: _call_soon(loop, semaphore.release))
+                    release = None
+                if guard and isinstance(e, Exception):
+                    guard.record_error(e)
+                    recorded = True
+                raise
+            if guard:
+                guard.record_success()
+                recorded = True
+            return result
+        finally:
+            if release:
+                release()
+            # Cancelada antes de ter resultado: não prende a chamada de teste do circuito
+            if guard and not recorded:
+                guard.release()
+            self._pending[platform] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        platforms = set(PLATFORMS) | set(self._pending)
+        stats = {}
+        for platform in sorted(platforms):
+            stats[platform] = {
+                "pending": self.pending(platform),
+                "limit": self.limit_for(platform),
+                "max_queue_depth": self._max_queue_depth
+            }
+            guard = self.guard(platform)
+            if guard:
+                stats[platform].update(guard.stats())
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._semaphores.clear()
+
+
+def _auto_limit(value: Optional[int]) -> int:
+    """Limite não configurado escala com o número de CPUs"""
+    if value and value > 0:
+        return value
+    return max(2, os.cpu_count() or 1)
+
+
+@lru_cache()
+def get_executor() -> YtdlpExecutor:
+    limits = {
+        "youtube": _auto_limit(settings.YTDLP_CONCURRENCY_YOUTUBE),
+        "instagram": _auto_limit(settings.YTDLP_CONCURRENCY_INSTAGRAM),
+        "tiktok": _auto_limit(settings.YTDLP_CONCURRENCY_TIKTOK),
+    }
+    default_limit = _auto_limit(settings.YTDLP_CONCURRENCY_DEFAULT)
+
+    max_workers = settings.YTDLP_MAX_WORKERS
+    if not max_workers or max_workers <= 0:
+        max_workers = sum(limits.values()) + default_limit
+
+    logger.info(f"Starting yt-dlp executor with {max_workers} workers (limits: {limits})")
+    return YtdlpExecutor(
+        max_workers=max_workers,
+        limits=limits,
+        default_limit=default_limit,
+        max_queue_depth=settings.YTDLP_MAX_QUEUE_DEPTH,
+        retry_after=settings.YTDLP_RETRY_AFTER_SECONDS,
+        rates=settings.PLATFORM_RATE_LIMITS,
+        default_rate=settings.PLATFORM_RATE_LIMIT_DEFAULT,
+        max_attempts=settings.EXTRACTION_MAX_ATTEMPTS,
+        backoff_initial=settings.EXTRACTION_BACKOFF_INITIAL_SECONDS,
+        backoff_max=settings.EXTRACTION_BACKOFF_MAX_SECONDS,
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        circuit_reset=settings.CIRCUIT_RESET_SECONDS
+    )
+
+
+def shutdown_executor():
+    """Encerra o pool atual - próxima chamada a get_executor cria um novo"""
+    if get_executor.cache_info().currsize:
+        get_executor().shutdown()
+        get_executor.cache_clear()
+
+
+REGISTRY.register(Gauge(
+    "orchestrator_ytdlp_pending",
+    "yt-dlp calls running or waiting, by platform",
+    ["platform"],
+    callback=lambda: {(platform,): stats["pending"] for platform, stats in get_executor().stats().items()}
+))
+REGISTRY.register(Gauge(
+    "orchestrator_platform_rate",
+    "Current adaptive request rate per platform (requests/s)",
+    ["platform"],
+    callback=lambda: {(platform,): stats["rate"] for platform, stats in get_executor().stats().items() if "rate" in stats}
+))
+REGISTRY.register(Gauge(
+    "orchestrator_platform_circuit_open",
+    "1 while the platform circuit breaker is open or half-open",
+    ["platform"],
+    callback=lambda: {
+        (platform,): int(stats["circuit"] != CircuitBreaker.CLOSED)
+        for platform, stats in get_executor().stats().items() if "circuit" in stats
+    }
+))
@@ -0,0 +1,169 @@
+"""
+Proteção contra bloqueio das plataformas
+- Token bucket adaptativo por plataforma: reduz a taxa pela metade a cada 429/throttling
+  e volta a subir aos poucos com sucessos (AIMD)
+- Circuit breaker: após falhas seguidas da plataforma (throttling, 5xx), falha rápido até o prazo de reabertura
+- Classificação dos erros do yt-dlp em throttling / transitório / definitivo
+"""
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+from app.core.metrics import THROTTLE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+_THROTTLE_PATTERNS = re.compile(
+    r"HTTP Error 429|Too Many Requests|rate.?limit|Please wait a few minutes|"
+    r"confirm you.re not a bot|temporarily blocked|throttl",
+    re.IGNORECASE
+)
+_SERVER_ERROR_PATTERN = re.compile(r"HTTP Error 5\d\d", re.IGNORECASE)
+_TRANSIENT_PATTERNS = re.compile(
+    r"HTTP Error 5\d\d|timed? ?out|Connection (?:reset|refused|aborted)|"
+    r"Temporary failure|Remote end closed|IncompleteRead|Unable to download (?:webpage|API page)",
+    re.IGNORECASE
+)
+
+
+def is_throttled(error: BaseException) -> bool:
+    return bool(_THROTTLE_PATTERNS.search(str(error)))
+
+
+def is_transient(error: BaseException) -> bool:
+    """Vale tentar de novo: throttling, 5xx, timeouts e erros de conexão"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return is_throttled(error) or bool(_TRANSIENT_PATTERNS.search(str(error)))
+
+
+def is_platform_failure(error: BaseException) -> bool:
+    """Falha do lado da plataforma (throttling ou 5xx); prazo local e erros de rede não contam"""
+    return is_throttled(error) or bool(_SERVER_ERROR_PATTERN.search(str(error)))
+
+
+class AdaptiveTokenBucket:
+    """Taxa em requisições/s; throttling divide por 2 (até min_rate), sucesso soma um passo"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 10
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def on_throttle(self):
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        # Esvazia o balde: a próxima chamada espera o novo ritmo
+        self._tokens = min(self._tokens, 0)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> int:
+        return max(1, round(self._opened_at + self.reset_timeout - time.monotonic()))
+
+    def allow(self) -> bool:
+        """Fechado: sempre; aberto: só depois do prazo, com uma chamada de teste por vez"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._probing = False
+        self.state = self.CLOSED
+
+    def release(self):
+        """Chamada de teste cancelada sem resultado: libera para a próxima"""
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class PlatformGuard:
+    """Limitador + circuit breaker de uma plataforma"""
+
+    def __init__(self, platform: str, rate: float, failure_threshold: int, reset_timeout: float):
+        self.platform = platform
+        self.bucket = AdaptiveTokenBucket(rate)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def allow(self) -> bool:
+        return self.breaker.allow()
+
+    def release(self):
+        self.breaker.release()
+
+    def record_success(self):
+        self.bucket.on_success()
+        self.breaker.record_success()
+
+    def record_error(self, error: BaseException):
+        """
+        Só throttling e 5xx contam contra a plataforma
+        Demais erros (vídeo privado, prazo local...) não mexem na sequência de falhas
+        """
+        if is_throttled(error):
+            self.bucket.on_throttle()
+            THROTTLE_EVENTS.inc(platform=self.platform)
+            logger.warning(f"{self.platform} throttling detected, rate now {self.bucket.rate:.2f}/s")
+        if is_platform_failure(error):
+            was_open = self.breaker.state == CircuitBreaker.OPEN
+            self.breaker.record_failure()
+            if self.breaker.state == CircuitBreaker.OPEN and not was_open:
+                logger.error(f"Circuit opened for {self.platform} for {self.breaker.reset_timeout:g}s")
+        else:
+            # Chamada de teste sem veredito: libera para a próxima
+            self.breaker.release()
+
+    def stats(self) -> Dict:
+        return {
+            "rate": round(self.bucket.rate, 3),
+            "max_rate": self.bucket.max_rate,
+            "circuit": self.breaker.state,
+        }
+
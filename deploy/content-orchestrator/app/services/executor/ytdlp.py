@@ -0,0 +1,189 @@
+"""
+Instâncias de YoutubeDL reaproveitadas entre chamadas
+Criar um YoutubeDL monta a lista de extratores, cookies e o cliente HTTP (~70ms);
+o pool mantém instâncias prontas por perfil de opções (listagem, metadados, download)
+yt_dlp só é importado na primeira instância ou no aquecimento após o startup
+"""
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Opções que mudam a cada chamada: aplicadas na instância emprestada, fora da chave do perfil
+PER_CALL_OPTIONS = ("playlistend", "outtmpl", "progress_hooks", "postprocessor_hooks")
+
+# Extratores inicializados no aquecimento (primeira instância de cada um importa o módulo)
+WARM_EXTRACTORS = ("YoutubeTab", "Youtube")
+
+YTDLP_INSTANCES = REGISTRY.register(Counter(
+    "orchestrator_ytdlp_instances_total",
+    "YoutubeDL instances handed out by the pool, by whether they were created or reused",
+    ["outcome"]
+))
+
+
+class _Instance:
+    def __init__(self, ydl):
+        self.ydl = ydl
+        self.created = time.monotonic()
+        self.uses = 0
+        # outtmpl já normalizado pelo yt-dlp (dict por tipo); restaurado a cada devolução
+        self.outtmpl = dict(ydl.params.get("outtmpl") or {})
+
+
+class YoutubeDLPool:
+    """
+    Uma instância atende uma chamada por vez (empréstimo exclusivo, seguro entre threads)
+    Instâncias são descartadas após erro inesperado, max_uses usos ou max_age segundos
+    (recarrega cookies.txt e libera memória de extratores)
+    """
+
+    def __init__(self, max_idle: int, max_uses: int, max_age: float):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._idle: Dict[str, List[_Instance]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_key(params: Dict) -> str:
+        return repr(sorted((k, v) for k, v in params.items() if k not in PER_CALL_OPTIONS))
+
+    def _create(self, params: Dict) -> _Instance:
+        import yt_dlp
+
+        base = {k: v for k, v in params.items() if k not in PER_CALL_OPTIONS}
+        return _Instance(yt_dlp.YoutubeDL(base))
+
+    def _checkout(self, key: str, params: Dict) -> _Instance:
+        with self._lock:
+            idle = self._idle.get(key)
+            instance = idle.pop() if idle else None
+        if instance is None:
+            YTDLP_INSTANCES.inc(outcome="created")
+            return self._create(params)
+        YTDLP_INSTANCES.inc(outcome="reused")
+        return instance
+
+    def _put_idle(self, key: str, instance: _Instance) -> bool:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(instance)
+                return True
+        return False
+
+    def _checkin(self, key: str, instance: _Instance, reusable: bool):
+        instance.uses += 1
+        fresh = instance.uses < self.max_uses and time.monotonic() - instance.created < self.max_age
+        if not (reusable and fresh and self._put_idle(key, instance)):
+            self._close(instance)
+
+    @staticmethod
+    def _close(instance: _Instance):
+        try:
+            instance.ydl.close()
+        except Exception as e:
+            logger.warning(f"Error closing YoutubeDL instance: {e}")
+
+    @staticmethod
+    def _apply(instance: _Instance, params: Dict):
+        ydl = instance.ydl
+        ydl.params["playlistend"] = params.get("playlistend")
+        ydl.params["outtmpl"] = dict(instance.outtmpl)
+        if params.get("outtmpl"):
+            ydl.params["outtmpl"]["default"] = params["outtmpl"]
+        ydl._progress_hooks = list(params.get("progress_hooks") or [])
+        # Pós-processadores de correção/merge são criados por chamada e copiam esta lista
+        ydl._postprocessor_hooks = list(params.get("postprocessor_hooks") or [])
+
+    @staticmethod
+    def _reset(instance: _Instance):
+        """Estado de uma chamada que não deve vazar para a próxima"""
+        ydl = instance.ydl
+        ydl._progress_hooks = []
+        ydl._postprocessor_hooks = []
+        ydl._playlist_urls.clear()
+        ydl._download_retcode = 0
+
+    @contextmanager
+    def session(self, params: Dict) -> Iterator:
+        """Substitui `with yt_dlp.YoutubeDL(params) as ydl` (sem fechar a instância no fim)"""
+        import yt_dlp
+
+        key = self.profile_key(params)
+        instance = self._checkout(key, params)
+        reusable = False
+        try:
+            self._apply(instance, params)
+            yield instance.ydl
+            reusable = True
+        except yt_dlp.utils.DownloadError:
+            # Erro reportado pelo yt-dlp (vídeo privado, 429...): a instância continua íntegra
+            reusable = True
+            raise
+        finally:
+            self._reset(instance)
+            self._checkin(key, instance, reusable)
+
+    def warm(self, profiles: List[Dict]):
+        """Importa o yt-dlp e deixa uma instância pronta por perfil (bloqueante)"""
+        started = time.perf_counter()
+        for params in profiles:
+            key = self.profile_key(params)
+            instance = self._create(params)
+            for ie_key in WARM_EXTRACTORS:
+                try:
+                    instance.ydl.get_info_extractor(ie_key)
+                except Exception as e:
+                    logger.debug(f"Could not warm extractor {ie_key}: {e}")
+            if not self._put_idle(key, instance):
+                self._close(instance)
+        logger.info(f"yt-dlp warmed up with {len(profiles)} profiles in {time.perf_counter() - started:.2f}s")
+
+    async def warm_up(self, profiles: List[Dict]):
+        try:
+            await asyncio.to_thread(self.warm, profiles)
+        except Exception as e:
+            logger.warning(f"yt-dlp warm-up failed: {e}")
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return sum(len(idle) for idle in self._idle.values())
+
+    def close(self):
+        with self._lock:
+            instances = [instance for idle in self._idle.values() for instance in idle]
+            self._idle.clear()
+        for instance in instances:
+            self._close(instance)
+
+
+@lru_cache()
+def get_ytdlp_pool() -> YoutubeDLPool:
+    return YoutubeDLPool(
+        max_idle=settings.YTDLP_POOL_MAX_IDLE,
+        max_uses=settings.YTDLP_POOL_MAX_USES,
+        max_age=settings.YTDLP_POOL_MAX_AGE_SECONDS
+    )
+
+
+def close_ytdlp_pool():
+    if get_ytdlp_pool.cache_info().currsize:
+        get_ytdlp_pool().close()
+        get_ytdlp_pool.cache_clear()
+
+
+REGISTRY.register(Gauge(
+    "orchestrator_ytdlp_idle_instances",
+    "Warm YoutubeDL instances waiting in the pool",
+    callback=lambda: {(): get_ytdlp_pool().idle_count()}
+))
@@ -0,0 +1,32 @@
+"""
+Token de continuação das páginas de uma fonte (opaco para o chamador)
+Guarda a fonte, a posição da próxima página e o último ID entregue (âncora)
+"""
+import json
+import base64
+import binascii
+from typing import Dict, Optional
+
+TOKEN_VERSION = 1
+
+
+def encode_page_token(key: str, offset: int, anchor: Optional[str]) -> str:
+    payload = json.dumps({"v": TOKEN_VERSION, "k": key, "o": offset, "a": anchor}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_page_token(token: str, key: str) -> Dict:
+    """ValueError se o token for inválido ou de outra fonte"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid page token")
+    if not isinstance(payload, dict) or payload.get("v") != TOKEN_VERSION:
+        raise ValueError("Invalid page token")
+    if payload.get("k") != key:
+        raise ValueError("Page token belongs to another source")
+    offset = payload.get("o")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid page token")
+    return {"offset": offset, "anchor": payload.get("a")}
@@ -2,14 +2,27 @@
 Serviço de busca de conteúdo - stateless
 Recebe dados, processa e retorna resultados
 """
-import yt_dlp
+import json
+import time
+import asyncio
 import logging
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from app.core.config import get_settings
+from app.core.metrics import FETCH_DURATION, record_error
+from app.core.singleflight import get_single_flight
+from app.services.executor.service import get_executor, QueueFullError
+from app.services.executor.ytdlp import get_ytdlp_pool
+from app.services.fetcher.pagination import decode_page_token, encode_page_token
+from app.services.fetcher.watermarks import get_watermark_store, source_key
+from app.services.selection.store import get_candidate_store
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+class FetchError(Exception):
+    """Falha ao listar vídeos de uma fonte"""
+    pass
+
 class FetcherService:
     def __init__(self):
         """Serviço stateless - não precisa de sessão de banco"""
@@ -36,69 +49,279 @@ class FetcherService:
             return f"https://www.tiktok.com/@{external_id}"
         return None
 
+    @staticmethod
+    def listing_options() -> Dict:
+        """Perfil de listagem (flat); playlistend é aplicado por chamada"""
+        return {
+            'quiet': True,
+            'extract_flat': True,
+            'force_generic_extractor': False,
+        }
+
+    @staticmethod
+    def _lazy_entries(ydl, url: str) -> Iterator[Dict]:
+        """
+        Entradas da listagem sob demanda (process=False): as páginas da plataforma
+        são buscadas conforme a iteração avança, sem montar a lista do canal inteiro
+        """
+        info = ydl.extract_info(url, download=False, process=False)
+        # Alguns extratores redirecionam para a URL real da listagem
+        for _ in range(3):
+            if info.get('_type') not in ('url', 'url_transparent'):
+                break
+            info = ydl.extract_info(info['url'], download=False, process=False)
+
+        entries = info.get('entries')
+        if entries is None:
+            entries = [info]
+        for entry in entries:
+            if entry:
+                yield entry
+
+    def _extract_new_entries(
+        self,
+        url: str,
+        ydl_opts: Dict,
+        known_ids: Set[str],
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Percorre a listagem de forma preguiçosa (process=False) e para ao
+        encontrar IDs já conhecidos - evita listar o canal inteiro
+        Tolera vídeos fixados: só para após alguns IDs conhecidos seguidos
+        Sem IDs conhecidos, para no limite
+        """
+        stop_after = min(settings.INCREMENTAL_STOP_AFTER_KNOWN, len(known_ids))
+        new_entries = []
+        consecutive_known = 0
+
+        # Iterar dentro do with: as páginas são buscadas sob demanda
+        with get_ytdlp_pool().session(ydl_opts) as ydl:
+            for entry in self._lazy_entries(ydl, url):
+                if entry.get('id') in known_ids:
+                    consecutive_known += 1
+                    if consecutive_known >= stop_after:
+                        break
+                    continue
+                consecutive_known = 0
+                new_entries.append(entry)
+                if limit and limit > 0 and len(new_entries) >= limit:
+                    break
+
+        return new_entries
+
+    def _extract_page(
+        self,
+        url: str,
+        ydl_opts: Dict,
+        start: int,
+        page_size: int,
+        anchor: Optional[str] = None
+    ) -> Tuple[int, List[Dict], bool]:
+        """
+        Uma página da listagem: só page_size (+1 para saber se há mais) entradas em memória
+        anchor: último ID da página anterior - a página começa logo depois dele, mesmo que
+        vídeos novos no topo tenham deslocado as posições; se não aparecer até start + page_size,
+        vale a posição
+        Retorna (posição da primeira entrada, entradas, há mais)
+        """
+        page: List[Dict] = []
+        fallback: List[Dict] = []
+        page_start = start
+        found = False
+
+        with get_ytdlp_pool().session(ydl_opts) as ydl:
+            for position, entry in enumerate(self._lazy_entries(ydl, url)):
+                if found:
+                    if not page:
+                        page_start = position
+                    page.append(entry)
+                    if len(page) > page_size:
+                        break
+                elif anchor is not None and entry.get('id') == anchor:
+                    found = True
+                elif position >= start:
+                    fallback.append(entry)
+                    if len(fallback) > page_size:
+                        break
+            if not found:
+                page = fallback
+
+        has_more = len(page) > page_size
+        return page_start, page[:page_size], has_more
+
+    @staticmethod
+    def _video_data(platform: str, external_id: str, group_name: Optional[str], entry: Dict) -> Dict:
+        return {
+            "platform": platform,
+            "external_id": external_id,
+            "external_video_id": entry.get('id'),
+            "title": entry.get('title'),
+            "url": entry.get('url') or entry.get('webpage_url'),
+            "duration": entry.get('duration'),
+            "view_count": entry.get('view_count'),
+            "group_name": group_name,
+            "fetched_at": entry.get('upload_date') or entry.get('timestamp')
+        }
+
     async def fetch_from_source_data(
         self,
         platform: str,
         external_id: str,
         group_name: Optional[str] = None,
         limit: Optional[int] = None,
-        video_type: str = "videos"
+        video_type: str = "videos",
+        raise_errors: bool = False,
+        timeout: Optional[float] = None,
+        since_last: bool = False,
+        cursor: Optional[str] = None
     ) -> List[Dict]:
         """
         Busca vídeos de uma fonte específica
         Retorna lista de vídeos encontrados
+        raise_errors: levanta FetchError em vez de retornar lista vazia
+        timeout: prazo da extração (asyncio.TimeoutError), sem contar a fila
+        since_last: retorna só vídeos novos desde o último fetch com since_last
+        cursor: ID do vídeo mais recente que o chamador já conhece
+        Chamadas idênticas simultâneas (inclusive de outros workers) compartilham uma busca
         """
+        key = json.dumps([platform, external_id, group_name, limit, video_type, since_last, cursor])
+        try:
+            videos = await get_single_flight("fetch", share_results=True).do(
+                key,
+                lambda: self._fetch(
+                    platform, external_id, group_name, limit, video_type, timeout, since_last, cursor
+                )
+            )
+        except FetchError:
+            if raise_errors:
+                raise
+            return []
+        # Cada chamador recebe sua cópia (a lista é compartilhada entre eles)
+        return [dict(video) for video in videos]
+
+    async def _fetch(
+        self,
+        platform: str,
+        external_id: str,
+        group_name: Optional[str],
+        limit: Optional[int],
+        video_type: str,
+        timeout: Optional[float],
+        since_last: bool,
+        cursor: Optional[str]
+    ) -> List[Dict]:
+        """Busca de fato; erros viram FetchError (fila cheia e timeout seguem como estão)"""
         logger.info(f"Fetching from {platform}: {external_id} (limit: {limit}, type: {video_type})")
         
         url = self._construct_url(platform, external_id, video_type)
         if not url:
             logger.warning(f"Could not construct URL for {platform}: {external_id}")
-            return []
+            raise FetchError(f"Unsupported platform: {platform}")
 
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': True,
-            'force_generic_extractor': False,
-        }
+        ydl_opts = self.listing_options()
         
         # Limitar quantidade de vídeos se fornecido
         if limit and limit > 0:
             ydl_opts['playlistend'] = limit
 
+        # IDs já vistos: marca d'água da fonte e/ou cursor do chamador
+        watermark_key = source_key(platform, external_id, video_type)
+        known_ids = set()
+        if since_last:
+            watermark = await asyncio.to_thread(get_watermark_store().get, watermark_key)
+            if watermark:
+                known_ids.update(watermark["last_ids"])
+        if cursor:
+            known_ids.add(cursor)
+
         videos = []
+        started = time.perf_counter()
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-            if 'entries' in info:
-                entries = info['entries']
-            else:
-                entries = [info]
-
-            # Limitar resultados se ainda não foi limitado pelo yt-dlp
-            if limit and limit > 0 and len(entries) > limit:
-                entries = entries[:limit]
-
-            for entry in entries:
-                    if not entry:
-                        continue
-                    
-                    video_data = {
-                        "platform": platform,
-                        "external_id": external_id,
-                        "external_video_id": entry.get('id'),
-                        "title": entry.get('title'),
-                        "url": entry.get('url') or entry.get('webpage_url'),
-                        "duration": entry.get('duration'),
-                        "view_count": entry.get('view_count'),
-                        "group_name": group_name,
-                        "fetched_at": entry.get('upload_date') or entry.get('timestamp')
-                    }
-                    videos.append(video_data)
+            # Sem IDs conhecidos a iteração para no limite (sem materializar o canal)
+            entries = await get_executor().run(
+                platform, self._extract_new_entries, url, ydl_opts, known_ids, limit, timeout=timeout
+            )
+            videos = [self._video_data(platform, external_id, group_name, entry) for entry in entries]
 
+        except (QueueFullError, asyncio.TimeoutError) as e:
+            record_error("fetch", e)
+            raise
         except Exception as e:
+            record_error("fetch", e)
             logger.error(f"Error fetching from {platform}: {external_id} - {e}")
-            return []
+            raise FetchError(str(e)) from e
+        finally:
+            FETCH_DURATION.observe(time.perf_counter() - started, platform=platform)
+
+        if since_last:
+            await asyncio.to_thread(
+                get_watermark_store().advance,
+                watermark_key,
+                [v["external_video_id"] for v in videos if v["external_video_id"]]
+            )
+
+        # Candidatos para /v1/select (ranqueados no servidor)
+        await asyncio.to_thread(get_candidate_store().add, videos)
 
         logger.info(f"Found {len(videos)} videos from {platform}: {external_id}")
         return videos
+
+    async def fetch_page(
+        self,
+        platform: str,
+        external_id: str,
+        group_name: Optional[str] = None,
+        video_type: str = "videos",
+        page_size: Optional[int] = None,
+        start: int = 0,
+        page_token: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Uma página da listagem da fonte (para canais grandes: memória limitada ao tamanho da página)
+        start: posição inicial (0 = mais recente); page_token: continuação da página anterior
+        Erros levantam FetchError (fila cheia e timeout seguem como estão)
+        ValueError: token inválido ou de outra fonte
+        """
+        page_size = min(max(page_size or settings.FETCH_PAGE_SIZE_DEFAULT, 1), settings.FETCH_PAGE_SIZE_MAX)
+        key = source_key(platform, external_id, video_type)
+        anchor = None
+        if page_token:
+            token = decode_page_token(page_token, key)
+            start, anchor = token["offset"], token["anchor"]
+
+        url = self._construct_url(platform, external_id, video_type)
+        if not url:
+            raise FetchError(f"Unsupported platform: {platform}")
+
+        logger.info(f"Fetching page from {platform}: {external_id} (start: {start}, size: {page_size})")
+        started = time.perf_counter()
+        try:
+            page_start, entries, has_more = await get_executor().run(
+                platform, self._extract_page, url, self.listing_options(), start, page_size, anchor,
+                timeout=timeout
+            )
+        except (QueueFullError, asyncio.TimeoutError) as e:
+            record_error("fetch", e)
+            raise
+        except Exception as e:
+            record_error("fetch", e)
+            logger.error(f"Error fetching page from {platform}: {external_id} - {e}")
+            raise FetchError(str(e)) from e
+        finally:
+            FETCH_DURATION.observe(time.perf_counter() - started, platform=platform)
+
+        videos = [self._video_data(platform, external_id, group_name, entry) for entry in entries]
+        await asyncio.to_thread(get_candidate_store().add, videos)
+
+        next_token = None
+        if has_more and videos:
+            next_token = encode_page_token(key, page_start + len(videos), videos[-1]["external_video_id"])
+        return {
+            "videos": videos,
+            "start": page_start,
+            "size": len(videos),
+            "has_more": has_more,
+            "next_page_token": next_token
+        }
@@ -0,0 +1,57 @@
+"""
+Marca d'água por fonte: últimos IDs vistos e horário do último fetch
+Permite listar apenas vídeos novos desde a última execução
+"""
+import json
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+from app.core.config import get_settings
+from app.core.database import Database, get_database
+
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_watermarks (
+    source_key TEXT PRIMARY KEY,
+    last_ids TEXT NOT NULL,
+    last_fetched_at REAL NOT NULL
+);
+"""
+
+
+def source_key(platform: str, external_id: str, video_type: str) -> str:
+    return f"{platform}:{external_id}:{video_type}"
+
+
+class WatermarkStore:
+    def __init__(self, db: Database, max_ids: int):
+        self.db = db
+        self.max_ids = max_ids
+        self.db.executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.db.execute_one("SELECT * FROM source_watermarks WHERE source_key = ?", (key,))
+        if not row:
+            return None
+        return {
+            "last_ids": json.loads(row["last_ids"]),
+            "last_fetched_at": row["last_fetched_at"],
+        }
+
+    def advance(self, key: str, new_ids: List[str]):
+        """Novos IDs entram na frente; mantém os max_ids mais recentes"""
+        current = self.get(key)
+        known = current["last_ids"] if current else []
+        merged = list(dict.fromkeys(new_ids + known))[:self.max_ids]
+        self.db.execute(
+            "INSERT INTO source_watermarks (source_key, last_ids, last_fetched_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(source_key) DO UPDATE SET last_ids = excluded.last_ids, "
+            "last_fetched_at = excluded.last_fetched_at",
+            (key, json.dumps(merged), time.time())
+        )
+
+
+@lru_cache()
+def get_watermark_store() -> WatermarkStore:
+    return WatermarkStore(get_database(), settings.WATERMARK_MAX_IDS)
@@ -0,0 +1,273 @@
+"""
+Fila de jobs durável com pool limitado de workers
+Estado em SQLite: sobrevive a reinícios e funciona com vários workers do uvicorn
+"""
+import os
+import uuid
+import socket
+import asyncio
+import logging
+import httpx
+from functools import lru_cache, partial
+from typing import Awaitable, Callable, Dict, List, Optional
+from app.core.config import get_settings
+from app.core.database import get_database
+from app.core.http import get_http_client
+from app.core.metrics import ERRORS, JOBS_IN_FLIGHT, record_error
+from app.services.downloader.limits import host_limit
+from app.services.jobs.store import JobStore, QUEUED, RUNNING, COMPLETED, FAILED
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+JobHandler = Callable[[Dict], Awaitable[Dict]]
+
+
+class JobQueueFullError(Exception):
+    """Fila de jobs atingiu o limite de pendentes"""
+
+    def __init__(self, kind: str, pending: int, retry_after: int):
+        self.kind = kind
+        self.pending = pending
+        self.retry_after = retry_after
+        super().__init__(f"{kind} queue is full ({pending} pending jobs)")
+
+
+class JobQueue:
+    """
+    Executa jobs de um tipo com no máximo `concurrency` em paralelo
+    O handler recebe o payload e retorna {"status": "completed"|"failed", "path", "error"}
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        kind: str,
+        handler: JobHandler,
+        concurrency: int,
+        max_pending: int,
+        poll_interval: float,
+        stale_after: float,
+        host_limit: Optional[Callable[[str], int]] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.store = store
+        self.kind = kind
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.host_limit = host_limit
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def ensure_capacity(self, count: int = 1):
+        """Levanta JobQueueFullError se `count` novos jobs excederem o limite"""
+        pending = self.store.count(self.kind, [QUEUED])
+        if pending + count > self.max_pending:
+            raise JobQueueFullError(self.kind, pending, settings.YTDLP_RETRY_AFTER_SECONDS)
+
+    def enqueue(
+        self,
+        payload: Dict,
+        priority: int = 0,
+        callback_url: Optional[str] = None,
+        video_id: Optional[str] = None,
+        host: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        check_capacity: bool = True,
+        unique: bool = False
+    ) -> Dict:
+        """
+        unique: job queued/running do mesmo vídeo e perfil é reaproveitado (deduplicated=True)
+        e não conta para o limite da fila
+        """
+        if unique and video_id:
+            active = self.store.find_active(self.kind, video_id, payload.get("profile"))
+            if active:
+                return {**active, "deduplicated": True}
+        if check_capacity:
+            self.ensure_capacity()
+
+        job = self.store.create(
+            self.kind,
+            payload,
+            priority=priority,
+            callback_url=callback_url,
+            video_id=video_id,
+            host=host,
+            batch_id=batch_id,
+            unique=unique
+        )
+        if job.get("deduplicated"):
+            return job
+        self._wake()
+        logger.info(f"Queued {self.kind} job {job['job_id']}")
+        return job
+
+    def _wake(self):
+        """Acorda os workers; enqueue pode rodar fora do event loop (asyncio.to_thread)"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.store.get(job_id)
+        if job and job["kind"] != self.kind:
+            return None
+        return job
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        requeued = await asyncio.to_thread(self.store.requeue_stale, self.kind, self.stale_after, self.max_attempts)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted {self.kind} jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+        logger.info(f"Started {self.concurrency} {self.kind} workers ({self.owner})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _maintenance(self):
+        """Heartbeat dos jobs deste processo e recuperação de jobs órfãos"""
+        interval = max(1.0, self.stale_after / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                if await asyncio.to_thread(self.store.requeue_stale, self.kind, self.stale_after, self.max_attempts):
+                    self._wakeup.set()
+            except Exception as e:
+                logger.error(f"Job maintenance error: {e}")
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.kind, self.owner, self.host_limit)
+            except Exception as e:
+                logger.error(f"Could not claim {self.kind} job: {e}")
+                job = None
+
+            if not job:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._execute(job)
+
+    async def _execute(self, job: Dict):
+        logger.info(f"Running {self.kind} job {job['job_id']} (attempt {job['attempts']})")
+        JOBS_IN_FLIGHT.inc(kind=self.kind)
+        try:
+            result = await self.handler(job["payload"])
+        except Exception as e:
+            record_error(f"{self.kind}_job", e)
+            logger.error(f"{self.kind} job {job['job_id']} raised: {e}")
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            JOBS_IN_FLIGHT.dec(kind=self.kind)
+
+        # Chaves além de status/path/error ficam em job["result"]
+        extra = {k: v for k, v in result.items() if k not in ("status", "path", "error")}
+        if result.get("status") == "completed":
+            path = result.get("path")
+            size = os.path.getsize(path) if path and os.path.exists(path) else None
+            finish = partial(self.store.finish, job["job_id"], COMPLETED, path=path, size=size, result=extra)
+        else:
+            finish = partial(self.store.finish, job["job_id"], FAILED, error=result.get("error"), result=extra)
+        job = await asyncio.to_thread(finish)
+
+        # Vaga liberada: outros workers podem pegar jobs do mesmo host
+        self._wakeup.set()
+        logger.info(f"{self.kind} job {job['job_id']} {job['state']}")
+        if job["callback_url"]:
+            await self._notify(job)
+
+    async def _notify(self, job: Dict):
+        """POST do estado final para a URL de callback (até 3 tentativas)"""
+        client = get_http_client()
+        for attempt in range(1, 4):
+            try:
+                response = await client.post(
+                    job["callback_url"], json=job, timeout=settings.JOB_CALLBACK_TIMEOUT_SECONDS
+                )
+                if response.status_code < 500:
+                    return
+                logger.warning(f"Callback for job {job['job_id']} returned {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Callback for job {job['job_id']} failed: {e}")
+            await asyncio.sleep(attempt)
+        ERRORS.inc(component="job_callback", error="CallbackFailed")
+        logger.error(f"Giving up on callback for job {job['job_id']}")
+
+
+async def _run_download_job(payload: Dict) -> Dict:
+    from app.services.downloader.service import DownloaderService
+
+    payload = dict(payload)
+    postprocess = payload.pop("postprocess", None)
+    result = await DownloaderService().download_video(**payload)
+
+    # Encadear pós-processamento após download concluído
+    if postprocess and result.get("status") == "completed":
+        callback_url = postprocess.pop("callback_url", None)
+        job = get_processing_queue().enqueue(
+            payload={"external_video_id": payload["external_video_id"], **postprocess},
+            callback_url=callback_url,
+            video_id=payload["external_video_id"],
+            check_capacity=False
+        )
+        result = {**result, "process_job_id": job["job_id"]}
+    return result
+
+
+async def _run_processing_job(payload: Dict) -> Dict:
+    from app.services.processor.service import ProcessorService
+
+    return await ProcessorService().process(**payload)
+
+
+@lru_cache()
+def get_job_store() -> JobStore:
+    return JobStore(get_database())
+
+
+@lru_cache()
+def get_download_queue() -> JobQueue:
+    return JobQueue(
+        store=get_job_store(),
+        kind="download",
+        handler=_run_download_job,
+        concurrency=settings.DOWNLOAD_WORKERS,
+        max_pending=settings.DOWNLOAD_MAX_PENDING_JOBS,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        stale_after=settings.JOB_STALE_AFTER_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        host_limit=host_limit
+    )
+
+
+@lru_cache()
+def get_processing_queue() -> JobQueue:
+    return JobQueue(
+        store=get_job_store(),
+        kind="process",
+        handler=_run_processing_job,
+        concurrency=settings.PROCESSING_WORKERS or os.cpu_count() or 1,
+        max_pending=settings.PROCESSING_MAX_PENDING_JOBS,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        stale_after=settings.JOB_STALE_AFTER_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS
+    )
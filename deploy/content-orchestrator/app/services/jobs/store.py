@@ -0,0 +1,241 @@
+"""
+Armazenamento durável de jobs em SQLite
+Jobs sobrevivem a reinícios; jobs órfãos (sem heartbeat) voltam para a fila
+"""
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+from app.core.database import Database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    path TEXT,
+    bytes INTEGER,
+    error TEXT,
+    callback_url TEXT,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (kind, state, priority, created_at);
+"""
+
+# Colunas adicionadas depois da primeira versão da tabela
+EXTRA_COLUMNS = {
+    "video_id": "TEXT",
+    "host": "TEXT",
+    "batch_id": "TEXT",
+    "result": "TEXT",
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_video ON jobs (kind, video_id, state);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id);
+"""
+
+# Estados possíveis de um job
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Job queued/running do vídeo; perfil (no payload) só quando informado
+ACTIVE_VIDEO = (
+    "kind = ? AND video_id = ? AND state IN (?, ?) "
+    "AND (? IS NULL OR json_extract(payload, '$.profile') = ?)"
+)
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class JobStore:
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+        self.db.add_columns("jobs", EXTRA_COLUMNS)
+        self.db.executescript(INDEXES)
+
+    def create(
+        self,
+        kind: str,
+        payload: Dict,
+        priority: int = 0,
+        callback_url: Optional[str] = None,
+        video_id: Optional[str] = None,
+        host: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        unique: bool = False
+    ) -> Dict:
+        """
+        unique: havendo job queued/running do mesmo vídeo e perfil, devolve esse job (deduplicated=True)
+        Busca e INSERT na mesma transação (BEGIN IMMEDIATE): pedidos simultâneos não duplicam o job
+        """
+        job_id = uuid.uuid4().hex
+        with self.db.transaction() as conn:
+            if unique and video_id:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE " + ACTIVE_VIDEO + " ORDER BY created_at LIMIT 1",
+                    self._active_params(kind, video_id, payload.get("profile"))
+                ).fetchone()
+                if row:
+                    return {**self._to_dict(row), "deduplicated": True}
+            conn.execute(
+                "INSERT INTO jobs (id, kind, state, payload, priority, callback_url, video_id, host, batch_id, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), priority, callback_url, video_id, host, batch_id,
+                 time.time())
+            )
+        return self.get(job_id)
+
+    def find_active(self, kind: str, video_id: str, profile: Optional[str] = None) -> Optional[Dict]:
+        """Job queued/running para o mesmo vídeo (e perfil, se informado), se houver"""
+        row = self.db.execute_one(
+            "SELECT * FROM jobs WHERE " + ACTIVE_VIDEO + " ORDER BY created_at LIMIT 1",
+            self._active_params(kind, video_id, profile)
+        )
+        return self._to_dict(row) if row else None
+
+    def _active_params(self, kind: str, video_id: str, profile: Optional[str]) -> tuple:
+        return (kind, video_id, QUEUED, RUNNING, profile, profile)
+
+    def list_batch(self, batch_id: str) -> List[Dict]:
+        rows = self.db.execute(
+            "SELECT * FROM jobs WHERE batch_id = ? ORDER BY priority DESC, created_at",
+            (batch_id,)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self.db.execute_one("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_dict(row) if row else None
+
+    def count(self, kind: str, states: List[str]) -> int:
+        placeholders = ",".join("?" * len(states))
+        row = self.db.execute_one(
+            f"SELECT COUNT(*) AS total FROM jobs WHERE kind = ? AND state IN ({placeholders})",
+            (kind, *states)
+        )
+        return row["total"]
+
+    def active_video_ids(self) -> Set[str]:
+        """Vídeos com job queued/running (de qualquer tipo) - não podem ser removidos do disco"""
+        rows = self.db.execute(
+            "SELECT DISTINCT video_id FROM jobs WHERE state IN (?, ?) AND video_id IS NOT NULL",
+            (QUEUED, RUNNING)
+        )
+        return {row["video_id"] for row in rows}
+
+    def claim(
+        self,
+        kind: str,
+        owner: str,
+        host_limit: Optional[Callable[[str], int]] = None
+    ) -> Optional[Dict]:
+        """
+        Marca o próximo job da fila como running e o retorna
+        Atômico entre processos (BEGIN IMMEDIATE)
+        host_limit: pula jobs de hosts que já atingiram o limite de jobs running
+        """
+        now = time.time()
+        with self.db.transaction() as conn:
+            saturated = []
+            if host_limit:
+                running = conn.execute(
+                    "SELECT host, COUNT(*) AS total FROM jobs WHERE kind = ? AND state = ? "
+                    "AND host IS NOT NULL GROUP BY host",
+                    (kind, RUNNING)
+                ).fetchall()
+                saturated = [r["host"] for r in running if r["total"] >= host_limit(r["host"])]
+
+            host_filter = ""
+            if saturated:
+                host_filter = f"AND (host IS NULL OR host NOT IN ({','.join('?' * len(saturated))})) "
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND state = ? " + host_filter +
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (kind, QUEUED, *saturated)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, owner = ?, heartbeat_at = ?, started_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, owner, now, now, row["id"])
+            )
+        return self.get(row["id"])
+
+    def heartbeat(self, owner: str):
+        self.db.execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND state = ?",
+            (time.time(), owner, RUNNING)
+        )
+
+    def requeue_stale(self, kind: str, stale_after: float, max_attempts: Optional[int] = None) -> int:
+        """
+        Devolve para a fila jobs running cujo worker parou de enviar heartbeat
+        Com max_attempts, jobs que já foram interrompidos tantas vezes falham (não voltam para sempre)
+        """
+        now = time.time()
+        cutoff = now - stale_after
+        stale = "kind = ? AND state = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        with self.db.transaction() as conn:
+            if max_attempts:
+                conn.execute(
+                    f"UPDATE jobs SET state = ?, owner = NULL, finished_at = ?, "
+                    f"error = 'Interrupted ' || attempts || ' times (worker stopped responding)' "
+                    f"WHERE {stale} AND attempts >= ?",
+                    (FAILED, now, kind, RUNNING, cutoff, max_attempts)
+                )
+            cursor = conn.execute(
+                f"UPDATE jobs SET state = ?, owner = NULL WHERE {stale}",
+                (QUEUED, kind, RUNNING, cutoff)
+            )
+            return cursor.rowcount
+
+    def finish(
+        self,
+        job_id: str,
+        state: str,
+        path: Optional[str] = None,
+        size: Optional[int] = None,
+        error: Optional[str] = None,
+        result: Optional[Dict] = None
+    ) -> Dict:
+        self.db.execute(
+            "UPDATE jobs SET state = ?, path = ?, bytes = ?, error = ?, result = ?, finished_at = ? WHERE id = ?",
+            (state, path, size, error, json.dumps(result) if result else None, time.time(), job_id)
+        )
+        return self.get(job_id)
+
+    def _to_dict(self, row) -> Dict:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "state": row["state"],
+            "payload": json.loads(row["payload"]),
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "path": row["path"],
+            "bytes": row["bytes"],
+            "error": row["error"],
+            "callback_url": row["callback_url"],
+            "batch_id": row["batch_id"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": _iso(row["created_at"]),
+            "started_at": _iso(row["started_at"]),
+            "finished_at": _iso(row["finished_at"]),
+        }
@@ -0,0 +1,283 @@
+"""
+Índice local de mídias baixadas (SQLite)
+Substitui sondagens no sistema de arquivos e `ls` no n8n
+"""
+import os
+import time
+import hashlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+from app.core.database import Database, get_database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    external_video_id TEXT PRIMARY KEY,
+    platform TEXT,
+    group_name TEXT,
+    source_name TEXT,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_media_group_source ON media (group_name, source_name);
+CREATE TABLE IF NOT EXISTS media_paths (
+    path TEXT PRIMARY KEY,
+    external_video_id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL
+);
+"""
+
+# Manifesto de conclusão: tamanho esperado (informado pela origem) e quando foi verificado
+# Retenção: último acesso, confirmação de publicação, pin manual e uso temporário (upload)
+EXTRA_COLUMNS = {
+    "expected_size": "INTEGER",
+    "verified_at": "REAL",
+    "last_accessed_at": "REAL",
+    "published_at": "REAL",
+    "pinned": "INTEGER NOT NULL DEFAULT 0",
+    "leased_until": "REAL",
+    "profile": "TEXT",  # Perfil de download que gerou o arquivo
+}
+
+
+def folder_name(name: str) -> str:
+    """Nome de pasta usado para grupo/fonte em LOCAL_STORAGE_PATH"""
+    return name.replace(" ", "_").lower()
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash do arquivo em blocos - bloqueante, chamar fora do event loop"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class MediaIndex:
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+        self.db.add_columns("media", EXTRA_COLUMNS)
+
+    def get(self, external_video_id: str) -> Optional[Dict]:
+        row = self.db.execute_one("SELECT * FROM media WHERE external_video_id = ?", (external_video_id,))
+        return self._to_dict(row) if row else None
+
+    def get_by_path(self, path: str) -> Optional[Dict]:
+        """Registro do arquivo (caminho como gravado ou resolvido)"""
+        row = self.db.execute_one(
+            "SELECT * FROM media WHERE path IN (?, ?) ORDER BY updated_at DESC LIMIT 1",
+            (path, os.path.realpath(path))
+        )
+        return self._to_dict(row) if row else None
+
+    def get_valid(self, external_video_id: str) -> Optional[Dict]:
+        """
+        Registro cujo arquivo ainda existe com o tamanho registrado
+        Registros obsoletos são removidos
+        """
+        record = self.get(external_video_id)
+        if not record:
+            return None
+        try:
+            if os.path.getsize(record["path"]) == record["size"]:
+                return record
+        except OSError:
+            pass
+        self.remove(external_video_id)
+        return None
+
+    def put(
+        self,
+        external_video_id: str,
+        path: str,
+        size: int,
+        sha256: Optional[str] = None,
+        platform: Optional[str] = None,
+        group_name: Optional[str] = None,
+        source_name: Optional[str] = None,
+        expected_size: Optional[int] = None,
+        verified: bool = False,
+        profile: Optional[str] = None
+    ) -> Dict:
+        """Insere ou atualiza o registro em uma única instrução (atômico)"""
+        now = time.time()
+        verified_at = now if verified else None
+        self.db.execute(
+            "INSERT INTO media (external_video_id, platform, group_name, source_name, path, size, sha256, "
+            "expected_size, verified_at, profile, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(external_video_id) DO UPDATE SET platform = excluded.platform, "
+            "group_name = excluded.group_name, source_name = excluded.source_name, path = excluded.path, "
+            "size = excluded.size, sha256 = excluded.sha256, expected_size = excluded.expected_size, "
+            "verified_at = excluded.verified_at, profile = excluded.profile, updated_at = excluded.updated_at",
+            (external_video_id, platform, group_name, source_name, path, size, sha256,
+             expected_size, verified_at, profile, now, now)
+        )
+        return self.get(external_video_id)
+
+    def reserved_path(self, external_video_id: str) -> Optional[str]:
+        row = self.db.execute_one(
+            "SELECT path FROM media_paths WHERE external_video_id = ?", (external_video_id,)
+        )
+        return row["path"] if row else None
+
+    def reserve_path(self, external_video_id: str, path: str) -> str:
+        """
+        Reserva o caminho para o vídeo (o primeiro a reservar fica com ele)
+        Retorna o external_video_id dono do caminho
+        """
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO media_paths (path, external_video_id, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT DO NOTHING",
+                (path, external_video_id, time.time())
+            )
+            row = conn.execute("SELECT external_video_id FROM media_paths WHERE path = ?", (path,)).fetchone()
+        return row["external_video_id"] if row else external_video_id
+
+    def touch(self, external_video_id: str):
+        """Registra acesso (ordem LRU da retenção)"""
+        self.db.execute(
+            "UPDATE media SET last_accessed_at = ? WHERE external_video_id = ?",
+            (time.time(), external_video_id)
+        )
+
+    def mark_published(self, external_video_id: str) -> bool:
+        """Publicação confirmada: arquivo vira candidato preferencial à remoção"""
+        with self.db.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE media SET published_at = ?, pinned = 0 WHERE external_video_id = ?",
+                (time.time(), external_video_id)
+            )
+        return cursor.rowcount > 0
+
+    def set_pinned(self, external_video_id: str, pinned: bool) -> bool:
+        with self.db.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE media SET pinned = ? WHERE external_video_id = ?",
+                (int(pinned), external_video_id)
+            )
+        return cursor.rowcount > 0
+
+    def lease(self, external_video_id: str, seconds: float) -> float:
+        """
+        Protege o arquivo da retenção por `seconds` (vale entre processos e expira sozinho)
+        Retorna o prazo, usado para liberar
+        """
+        until = time.time() + seconds
+        self.db.execute(
+            "UPDATE media SET leased_until = MAX(COALESCE(leased_until, 0), ?) WHERE external_video_id = ?",
+            (until, external_video_id)
+        )
+        return until
+
+    def release(self, external_video_id: str, until: float):
+        """Libera o lease, a menos que outro uso o tenha estendido"""
+        self.db.execute(
+            "UPDATE media SET leased_until = NULL WHERE external_video_id = ? AND leased_until = ?",
+            (external_video_id, until)
+        )
+
+    def usage(self) -> List[Dict]:
+        """Arquivos e bytes por grupo/fonte"""
+        rows = self.db.execute(
+            "SELECT group_name, source_name, COUNT(*) AS files, SUM(size) AS bytes, "
+            "SUM(pinned) AS pinned, COUNT(published_at) AS published "
+            "FROM media GROUP BY group_name, source_name ORDER BY group_name, source_name"
+        )
+        return [dict(row) for row in rows]
+
+    def eviction_candidates(self, group_name: Optional[str] = None) -> List[Dict]:
+        """
+        Registros não fixados nem em uso na ordem de remoção:
+        publicados primeiro (mais antigos antes), depois o menos acessado recentemente
+        """
+        where = "WHERE pinned = 0 AND COALESCE(leased_until, 0) < ?"
+        params = (time.time(),)
+        if group_name is not None:
+            where += " AND group_name IS ?"
+            params += (group_name,)
+        rows = self.db.execute(
+            f"SELECT * FROM media {where} "
+            "ORDER BY published_at IS NULL, published_at, COALESCE(last_accessed_at, created_at)",
+            params
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def expired(self, accessed_before: Optional[float], published_before: Optional[float]) -> List[Dict]:
+        """Registros não fixados nem em uso cujo TTL (por acesso ou por publicação) venceu"""
+        clauses = []
+        params = []
+        if accessed_before is not None:
+            clauses.append("COALESCE(last_accessed_at, created_at) < ?")
+            params.append(accessed_before)
+        if published_before is not None:
+            clauses.append("published_at < ?")
+            params.append(published_before)
+        if not clauses:
+            return []
+        rows = self.db.execute(
+            f"SELECT * FROM media WHERE pinned = 0 AND COALESCE(leased_until, 0) < ? AND ({' OR '.join(clauses)})",
+            (time.time(), *params)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def remove(self, external_video_id: str):
+        self.db.execute("DELETE FROM media WHERE external_video_id = ?", (external_video_id,))
+
+    def list(
+        self,
+        group_name: Optional[str] = None,
+        source_name: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict]:
+        clauses = []
+        params = []
+        if group_name:
+            clauses.append("group_name = ?")
+            params.append(folder_name(group_name))
+        if source_name:
+            clauses.append("source_name = ?")
+            params.append(folder_name(source_name))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.execute(
+            f"SELECT * FROM media {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def _to_dict(self, row) -> Dict:
+        return {
+            "external_video_id": row["external_video_id"],
+            "platform": row["platform"],
+            "group_name": row["group_name"],
+            "source_name": row["source_name"],
+            "path": row["path"],
+            "file_name": os.path.basename(row["path"]),
+            "size": row["size"],
+            "sha256": row["sha256"],
+            "expected_size": row["expected_size"],
+            "verified_at": _iso(row["verified_at"]),
+            "last_accessed_at": _iso(row["last_accessed_at"]),
+            "published_at": _iso(row["published_at"]),
+            "pinned": bool(row["pinned"]),
+            "profile": row["profile"],
+            "created_at": _iso(row["created_at"]),
+            "updated_at": _iso(row["updated_at"]),
+        }
+
+
+@lru_cache()
+def get_media_index() -> MediaIndex:
+    return MediaIndex(get_database())
@@ -0,0 +1,213 @@
+"""
+Pós-processamento com ffmpeg (marca d'água, escala, re-encode)
+Cada job roda um processo ffmpeg; a fila limita quantos rodam em paralelo
+"""
+import os
+import asyncio
+import logging
+from functools import partial
+from typing import Dict, List, Optional
+from app.core.config import get_settings
+from app.services.media.store import get_media_index, file_sha256
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ProcessingError(Exception):
+    """Preset inválido, arquivo ausente ou falha do ffmpeg"""
+    pass
+
+
+# Valores aceitos nas opções que vão direto para a linha de comando do ffmpeg
+X264_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+AUDIO_BITRATES = ("64k", "96k", "128k", "160k", "192k", "256k", "320k")
+
+
+def _inside(path: str, root: Optional[str]) -> bool:
+    if not root:
+        return False
+    root = os.path.realpath(root)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def check_options(options: Dict):
+    """ProcessingError se alguma opção estiver fora do permitido"""
+    if options.get("x264_preset", "veryfast") not in X264_PRESETS:
+        raise ProcessingError(f"x264_preset must be one of: {', '.join(X264_PRESETS)}")
+    if options.get("audio_bitrate", "128k") not in AUDIO_BITRATES:
+        raise ProcessingError(f"audio_bitrate must be one of: {', '.join(AUDIO_BITRATES)}")
+    try:
+        crf = int(options.get("crf", 23))
+        for field in ("logo_scale", "logo_opacity"):
+            float(options.get(field, 0))
+        for field in ("bottom_margin", "width", "height"):
+            int(options.get(field, 0))
+    except (TypeError, ValueError) as e:
+        raise ProcessingError(f"Invalid numeric option: {e}")
+    if not 0 <= crf <= 51:
+        raise ProcessingError("crf must be between 0 and 51")
+    logo_path = options.get("logo_path")
+    if logo_path and not (_inside(logo_path, settings.LOCAL_STORAGE_PATH) or _inside(logo_path, settings.ASSETS_PATH)):
+        raise ProcessingError("logo_path must be inside the downloads or assets directory")
+
+
+def _watermark_args(options: Dict) -> List[str]:
+    """Logo centralizada na parte de baixo + vinheta suave (mesmo estilo do fluxo n8n)"""
+    logo_path = options.get("logo_path") or settings.WATERMARK_LOGO_PATH
+    if not logo_path or not os.path.exists(logo_path):
+        raise ProcessingError(f"Watermark logo not found: {logo_path}")
+
+    scale = float(options.get("logo_scale", 0.30))
+    opacity = float(options.get("logo_opacity", 0.6))
+    margin = int(options.get("bottom_margin", 110))
+    logo = f"[1]scale=iw*{scale}:ih*{scale},format=rgba,colorchannelmixer=aa={opacity}[logo]"
+    if options.get("vignette", True):
+        base = "[0]vignette=angle=PI/2.8:aspect=1,eq=brightness=0.12:contrast=1.03[vin]"
+    else:
+        base = "[0]null[vin]"
+    overlay = f"[vin][logo]overlay=(W-w)/2:H-h-{margin}"
+
+    return [
+        "-i", logo_path,
+        "-filter_complex", f"{logo};{base};{overlay}",
+        "-c:v", "libx264", "-preset", options.get("x264_preset", "veryfast"),
+        "-c:a", "copy",
+    ]
+
+
+def _scale_args(options: Dict) -> List[str]:
+    """Redimensiona mantendo proporção (-2 = calcular lado par automaticamente)"""
+    width = int(options.get("width", -2))
+    height = int(options.get("height", 1920))
+    return [
+        "-vf", f"scale={width}:{height}",
+        "-c:v", "libx264", "-preset", options.get("x264_preset", "veryfast"),
+        "-crf", str(int(options.get("crf", 23))),
+        "-c:a", "copy",
+    ]
+
+
+def _reencode_args(options: Dict) -> List[str]:
+    return [
+        "-c:v", "libx264", "-preset", options.get("x264_preset", "medium"),
+        "-crf", str(int(options.get("crf", 23))),
+        "-c:a", "aac", "-b:a", options.get("audio_bitrate", "128k"),
+    ]
+
+
+PRESETS = {
+    "watermark": _watermark_args,
+    "scale": _scale_args,
+    "reencode": _reencode_args,
+}
+
+
+class ProcessorService:
+    def _resolve_input(self, external_video_id: Optional[str], path: Optional[str]) -> str:
+        """Arquivo de entrada: pelo índice de mídias ou caminho dentro de LOCAL_STORAGE_PATH"""
+        if external_video_id:
+            record = get_media_index().get_valid(external_video_id)
+            if not record:
+                raise ProcessingError(f"Media {external_video_id} not found")
+            return record["path"]
+
+        if not path:
+            raise ProcessingError("Either external_video_id or path is required")
+        real_path = os.path.realpath(path)
+        if not _inside(real_path, settings.LOCAL_STORAGE_PATH):
+            raise ProcessingError("Path must be inside the downloads directory")
+        if not os.path.exists(real_path):
+            raise ProcessingError(f"File not found: {path}")
+        return real_path
+
+    def build_command(self, preset: str, input_path: str, output_path: str, options: Dict) -> List[str]:
+        if preset not in PRESETS:
+            raise ProcessingError(f"Unknown preset: {preset}")
+        check_options(options)
+        return [
+            settings.FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+            "-i", input_path,
+            *PRESETS[preset](options),
+            "-movflags", "+faststart",
+            output_path,
+        ]
+
+    async def _run_ffmpeg(self, command: List[str]):
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), settings.PROCESSING_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            raise ProcessingError(f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='replace')[-500:]}")
+
+    async def process(
+        self,
+        preset: str,
+        external_video_id: Optional[str] = None,
+        path: Optional[str] = None,
+        options: Optional[Dict] = None,
+        replace_original: bool = True,
+        output_prefix: str = "styled_"
+    ) -> Dict:
+        """
+        Aplica o preset e grava a saída de forma atômica (arquivo temporário + os.replace)
+        replace_original: substitui o arquivo; senão grava {output_prefix}{nome},
+        indexado à parte como {output_prefix}{external_video_id} (o original continua no índice)
+        """
+        options = options or {}
+        try:
+            input_path = await asyncio.to_thread(self._resolve_input, external_video_id, path)
+            if not external_video_id:
+                # Entrada por caminho: o registro do arquivo também precisa ser atualizado
+                record = await asyncio.to_thread(get_media_index().get_by_path, input_path)
+                external_video_id = record["external_video_id"] if record else None
+            directory, name = os.path.split(input_path)
+            final_path = input_path if replace_original else os.path.join(directory, f"{output_prefix}{name}")
+            # Temporário no mesmo diretório: os.replace é atômico no mesmo sistema de arquivos
+            tmp_path = os.path.join(directory, f".{name}.{preset}.tmp.mp4")
+            command = self.build_command(preset, input_path, tmp_path, options)
+        except ProcessingError as e:
+            return {"status": "failed", "error": str(e)}
+
+        logger.info(f"Processing {input_path} with preset {preset}")
+        try:
+            await self._run_ffmpeg(command)
+            os.replace(tmp_path, final_path)
+        except asyncio.TimeoutError:
+            return {"status": "failed", "error": f"ffmpeg timed out after {settings.PROCESSING_TIMEOUT_SECONDS}s"}
+        except (ProcessingError, OSError) as e:
+            logger.error(f"Processing failed for {input_path}: {e}")
+            return {"status": "failed", "error": str(e)}
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Substituído: índice com tamanho e hash novos; cópia: registro próprio (retenção e cotas)
+        output_id = None
+        if external_video_id:
+            output_id = external_video_id if replace_original else f"{output_prefix}{external_video_id}"
+            record = await asyncio.to_thread(get_media_index().get, external_video_id)
+            sha256 = await asyncio.to_thread(file_sha256, final_path)
+            await asyncio.to_thread(partial(
+                get_media_index().put,
+                output_id,
+                path=final_path,
+                size=os.path.getsize(final_path),
+                sha256=sha256,
+                platform=record["platform"] if record else None,
+                group_name=record["group_name"] if record else None,
+                source_name=record["source_name"] if record else None,
+                verified=True,
+                profile=record["profile"] if record else None
+            ))
+
+        logger.info(f"Processed {final_path} ({preset})")
+        return {"status": "completed", "path": final_path, "preset": preset, "external_video_id": output_id}
@@ -0,0 +1,201 @@
+"""
+Barramento de progresso dos downloads (em memória, por processo)
+- progress_hooks do yt-dlp publicam bytes, total, velocidade e ETA (a partir da thread do executor)
+- Assinantes por vídeo ou por grupo recebem os eventos numa fila própria (SSE / WebSocket)
+- Eventos finais: completed / failed; stalled quando os bytes param de avançar
+- Cada evento leva o perfil do download: jobs do mesmo vídeo com perfis diferentes não se misturam
+Com vários workers do uvicorn cada um só vê os downloads que executa
+"""
+import time
+import asyncio
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Tipos de evento
+STARTED = "started"
+PROGRESS = "progress"
+STALLED = "stalled"
+COMPLETED = "completed"
+FAILED = "failed"
+TERMINAL = (COMPLETED, FAILED)
+
+
+def video_topic(external_video_id: str) -> str:
+    return f"video:{external_video_id}"
+
+
+def group_topic(group_name: str) -> str:
+    return f"group:{group_name}"
+
+
+class Subscription:
+    """Fila de eventos de um assinante; cheia, descarta o evento mais antigo"""
+
+    def __init__(self, topic: str, maxsize: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event: Dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """Próximo evento ou None após `timeout` sem eventos"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ProgressBus:
+    def __init__(self, queue_size: int, interval: float, stall_after: float):
+        self.queue_size = queue_size
+        self.interval = interval
+        self.stall_after = stall_after
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        # Último evento de cada download em andamento (por external_video_id)
+        self._active: Dict[str, Dict] = {}
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[Subscription]:
+        subscription = Subscription(topic, self.queue_size)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def publish(self, event: Dict):
+        """Só no event loop (da thread do executor use o hook)"""
+        video_id = event["external_video_id"]
+        if event["type"] in TERMINAL:
+            self._active.pop(video_id, None)
+        else:
+            previous = self._active.get(video_id)
+            # progressed_at: última mudança de bytes (base da detecção de travamento)
+            # Mudança e não aumento: vídeo e áudio separados recomeçam a contagem
+            if previous and event.get("bytes_done") == previous.get("bytes_done"):
+                event["progressed_at"] = previous["progressed_at"]
+            else:
+                event["progressed_at"] = event["timestamp"]
+            self._active[video_id] = event
+
+        topics = [video_topic(video_id)]
+        if event.get("group_name"):
+            topics.append(group_topic(event["group_name"]))
+        for topic in topics:
+            for subscription in list(self._subscribers.get(topic, ())):
+                subscription.put(event)
+
+    def _event(self, event_type: str, external_video_id: str, group_name: Optional[str], **fields) -> Dict:
+        return {
+            "type": event_type,
+            "external_video_id": external_video_id,
+            "group_name": group_name,
+            "timestamp": time.time(),
+            **fields
+        }
+
+    def start(self, external_video_id: str, group_name: Optional[str], profile: Optional[str] = None):
+        self.publish(self._event(STARTED, external_video_id, group_name, profile=profile, bytes_done=0))
+
+    def finish(self, external_video_id: str, group_name: Optional[str], result: Dict, profile: Optional[str] = None):
+        """Evento final a partir do resultado do download"""
+        if result.get("status") == "completed":
+            event = self._event(COMPLETED, external_video_id, group_name, profile=profile, path=result.get("path"))
+        else:
+            event = self._event(FAILED, external_video_id, group_name, profile=profile, error=result.get("error"))
+        self.publish(event)
+
+    def hook(
+        self,
+        external_video_id: str,
+        group_name: Optional[str],
+        profile: Optional[str] = None
+    ) -> Callable[[Dict], None]:
+        """
+        progress_hook do yt-dlp (roda na thread do executor)
+        Repassa ao event loop no máximo um evento a cada `interval` (e sempre o de arquivo concluído)
+        """
+        loop = asyncio.get_running_loop()
+        last = {"sent": 0.0}
+
+        def hook(progress: Dict):
+            status = progress.get("status")
+            if status not in ("downloading", "finished"):
+                return
+            now = time.monotonic()
+            if status == "downloading" and now - last["sent"] < self.interval:
+                return
+            last["sent"] = now
+
+            done = progress.get("downloaded_bytes") or 0
+            total = progress.get("total_bytes") or progress.get("total_bytes_estimate")
+            event = self._event(
+                PROGRESS, external_video_id, group_name,
+                profile=profile,
+                bytes_done=done,
+                total_bytes=total,
+                percent=round(100.0 * done / total, 1) if total else None,
+                speed=progress.get("speed"),
+                eta=progress.get("eta"),
+                transferred=status == "finished"
+            )
+            try:
+                loop.call_soon_threadsafe(self.publish, event)
+            except RuntimeError:  # Loop encerrado (shutdown)
+                pass
+
+        return hook
+
+    def is_stalled(self, event: Dict, now: Optional[float] = None) -> bool:
+        now = now or time.time()
+        return now - event["progressed_at"] >= self.stall_after
+
+    def active(self, group_name: Optional[str] = None) -> List[Dict]:
+        """Downloads em andamento neste processo (último evento + stalled)"""
+        now = time.time()
+        return [
+            {**event, "stalled": self.is_stalled(event, now)}
+            for event in self._active.values()
+            if group_name is None or event.get("group_name") == group_name
+        ]
+
+    def stalled_events(self, topic: str, already: Set[str]) -> List[Dict]:
+        """Eventos stalled ainda não enviados ao assinante do tópico (marca em `already`)"""
+        now = time.time()
+        events = []
+        for video_id, event in self._active.items():
+            if video_id in already or not self.is_stalled(event, now):
+                continue
+            if topic not in (video_topic(video_id), group_topic(event.get("group_name") or "")):
+                continue
+            already.add(video_id)
+            events.append(self._event(
+                STALLED, video_id, event.get("group_name"),
+                profile=event.get("profile"),
+                bytes_done=event.get("bytes_done"),
+                total_bytes=event.get("total_bytes"),
+                stalled_for=round(now - event["progressed_at"], 1)
+            ))
+        return events
+
+
+@lru_cache()
+def get_progress_bus() -> ProgressBus:
+    return ProgressBus(
+        queue_size=settings.PROGRESS_QUEUE_SIZE,
+        interval=settings.PROGRESS_INTERVAL_SECONDS,
+        stall_after=settings.PROGRESS_STALL_SECONDS
+    )
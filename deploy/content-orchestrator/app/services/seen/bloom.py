@@ -0,0 +1,43 @@
+"""
+Bloom filter compacto para enviar o conjunto de IDs já vistos
+
+Formato (para montar o filtro no n8n):
+- `size` bits, serializados em base64, bit i = byte[i // 8] >> (i % 8) & 1
+- digest = sha256(id em UTF-8); h1 = bytes 0-7, h2 = bytes 8-15 (big-endian)
+- posição do hash j (0 <= j < `hashes`) = (h1 + j * h2) mod size
+"""
+import base64
+import hashlib
+from typing import List
+
+
+class BloomFilter:
+    def __init__(self, size: int, hashes: int, bits: bytearray = None):
+        if size <= 0 or hashes <= 0:
+            raise ValueError("Bloom filter size and hashes must be positive")
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+        if len(self.bits) * 8 < size:
+            raise ValueError(f"Bloom filter needs {(size + 7) // 8} bytes, got {len(self.bits)}")
+
+    @classmethod
+    def from_base64(cls, data: str, size: int, hashes: int) -> "BloomFilter":
+        try:
+            bits = bytearray(base64.b64decode(data, validate=True))
+        except ValueError as e:
+            raise ValueError(f"Invalid bloom filter encoding: {e}") from e
+        return cls(size, hashes, bits)
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big")
+        return [(h1 + j * h2) % self.size for j in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p // 8] >> (p % 8) & 1 for p in self._positions(item))
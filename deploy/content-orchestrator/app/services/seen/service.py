@@ -0,0 +1,49 @@
+"""
+Filtro de vídeos já vistos aplicado antes de serializar a resposta
+Combina lista de IDs, Bloom filter e o conjunto persistido
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.services.seen.bloom import BloomFilter
+from app.services.seen.store import get_seen_store
+
+
+class ExclusionFilter:
+    def __init__(
+        self,
+        ids: Iterable[str] = (),
+        bloom: Optional[BloomFilter] = None,
+        use_store: bool = False
+    ):
+        self.ids = set(ids)
+        self.bloom = bloom
+        self.use_store = use_store
+
+    @property
+    def active(self) -> bool:
+        return bool(self.ids or self.bloom or self.use_store)
+
+    def apply(self, videos: List[Dict]) -> Tuple[List[Dict], int]:
+        """
+        Remove vídeos excluídos; entradas de erro passam direto
+        Retorna (vídeos mantidos, quantidade removida)
+        Consulta o SQLite com use_store: chamar fora do event loop
+        """
+        if not self.active:
+            return videos, 0
+
+        candidate_ids = [v["external_video_id"] for v in videos if v.get("external_video_id")]
+        seen = set()
+        if self.use_store and candidate_ids:
+            seen = get_seen_store().seen_among(candidate_ids)
+
+        kept = []
+        for video in videos:
+            video_id = video.get("external_video_id")
+            if video_id and (
+                video_id in self.ids
+                or video_id in seen
+                or (self.bloom is not None and video_id in self.bloom)
+            ):
+                continue
+            kept.append(video)
+        return kept, len(videos) - len(kept)
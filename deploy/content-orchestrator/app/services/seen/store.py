@@ -0,0 +1,68 @@
+"""
+Conjunto persistido de vídeos já consumidos (SQLite)
+Substitui a leitura da planilha inteira no n8n a cada execução
+"""
+import time
+from functools import lru_cache
+from typing import Iterable, List, Optional, Set
+from app.core.database import Database, get_database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_videos (
+    external_video_id TEXT PRIMARY KEY,
+    group_name TEXT,
+    seen_at REAL NOT NULL
+);
+"""
+
+# Limite de parâmetros por consulta IN (SQLite aceita 999 em versões antigas)
+_CHUNK = 500
+
+
+class SeenStore:
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+
+    def mark(self, video_ids: Iterable[str], group_name: Optional[str] = None) -> int:
+        now = time.time()
+        rows = [(video_id, group_name, now) for video_id in dict.fromkeys(video_ids) if video_id]
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO seen_videos (external_video_id, group_name, seen_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(external_video_id) DO UPDATE SET seen_at = excluded.seen_at",
+                rows
+            )
+        return len(rows)
+
+    def unmark(self, video_ids: Iterable[str]) -> int:
+        """Remove os IDs do conjunto; retorna quantos estavam marcados"""
+        ids = list(dict.fromkeys(video_ids))
+        removed = 0
+        with self.db.transaction() as conn:
+            for start in range(0, len(ids), _CHUNK):
+                chunk = ids[start:start + _CHUNK]
+                cursor = conn.execute(
+                    f"DELETE FROM seen_videos WHERE external_video_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                removed += cursor.rowcount
+        return removed
+
+    def seen_among(self, video_ids: List[str]) -> Set[str]:
+        """Quais dos IDs informados já foram marcados como consumidos"""
+        seen = set()
+        for start in range(0, len(video_ids), _CHUNK):
+            chunk = video_ids[start:start + _CHUNK]
+            rows = self.db.execute(
+                f"SELECT external_video_id FROM seen_videos "
+                f"WHERE external_video_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            seen.update(row["external_video_id"] for row in rows)
+        return seen
+
+
+@lru_cache()
+def get_seen_store() -> SeenStore:
+    return SeenStore(get_database())
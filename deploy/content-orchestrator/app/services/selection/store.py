@@ -0,0 +1,305 @@
+"""
+Índice de candidatos à publicação por grupo (SQLite) e estado de publicação por destino
+Alimentado pelos fetches; /v1/select consulta e ranqueia aqui, sem receber o backlog inteiro
+"""
+import math
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from app.core.database import Database, get_database
+from app.services.media.store import get_media_index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    external_video_id TEXT PRIMARY KEY,
+    platform TEXT,
+    external_id TEXT,
+    group_name TEXT,
+    title TEXT,
+    url TEXT,
+    duration REAL,
+    view_count INTEGER,
+    log_views REAL NOT NULL DEFAULT 0,
+    published_at REAL,
+    added_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_group ON candidates (group_name);
+CREATE TABLE IF NOT EXISTS publications (
+    external_video_id TEXT NOT NULL,
+    destination_platform TEXT NOT NULL,
+    destination_account_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    platform_post_id TEXT,
+    error_message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (destination_platform, destination_account_id, external_video_id)
+);
+CREATE INDEX IF NOT EXISTS idx_publications_video ON publications (external_video_id);
+"""
+
+# Estados em publications: selected (reservado por uma seleção), success, error
+SELECTED = "selected"
+SUCCESS = "success"
+ERROR = "error"
+
+_CANDIDATE_FIELDS = (
+    "external_video_id", "platform", "external_id", "group_name", "title",
+    "url", "duration", "view_count", "published_at", "added_at"
+)
+
+
+def _timestamp(value) -> Optional[float]:
+    """upload_date (YYYYMMDD) ou timestamp do yt-dlp"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value)
+    if len(text) == 8 and text.isdigit():
+        return datetime.strptime(text, "%Y%m%d").replace(tzinfo=timezone.utc).timestamp()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class CandidateStore:
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+
+    def add(self, videos: Iterable[Dict]) -> int:
+        """Upsert dos vídeos de um fetch (entradas de erro são ignoradas); atualiza views e título"""
+        now = time.time()
+        rows = []
+        for video in videos:
+            video_id = video.get("external_video_id")
+            if not video_id or video.get("error"):
+                continue
+            views = video.get("view_count")
+            rows.append((
+                video_id,
+                video.get("platform"),
+                video.get("external_id"),
+                video.get("group_name"),
+                video.get("title"),
+                video.get("url"),
+                video.get("duration"),
+                views,
+                math.log1p(views) if views and views > 0 else 0.0,
+                _timestamp(video.get("published_at") or video.get("fetched_at")),
+                now,
+                now,
+            ))
+        if not rows:
+            return 0
+        with self.db.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO candidates (
+                    external_video_id, platform, external_id, group_name, title, url,
+                    duration, view_count, log_views, published_at, added_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(external_video_id) DO UPDATE SET
+                    group_name = COALESCE(excluded.group_name, candidates.group_name),
+                    title = COALESCE(excluded.title, candidates.title),
+                    url = COALESCE(excluded.url, candidates.url),
+                    duration = COALESCE(excluded.duration, candidates.duration),
+                    view_count = COALESCE(excluded.view_count, candidates.view_count),
+                    log_views = CASE WHEN excluded.view_count IS NULL
+                        THEN candidates.log_views ELSE excluded.log_views END,
+                    published_at = COALESCE(excluded.published_at, candidates.published_at),
+                    updated_at = excluded.updated_at
+                """,
+                rows
+            )
+        return len(rows)
+
+    def remove(self, external_video_id: str) -> bool:
+        with self.db.transaction() as conn:
+            cursor = conn.execute("DELETE FROM candidates WHERE external_video_id = ?", (external_video_id,))
+        return cursor.rowcount > 0
+
+    def rank(
+        self,
+        destination_platform: str,
+        destination_account_id: str,
+        group_name: Optional[str] = None,
+        limit: int = 1,
+        weights: Optional[Dict[str, float]] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        strict_duration: bool = False,
+        max_attempts: int = 3,
+        lease_seconds: float = 3600,
+        reserve: bool = False
+    ) -> List[Dict]:
+        """
+        Melhores candidatos ainda não publicados neste destino
+        score = w_views·log(1 + views) + w_recency·(idade em dias, negativa)
+              + w_duration·[duração na faixa] + w_downloaded·[já no índice de mídias]
+        Excluídos: publicados com sucesso no destino, reservados há menos de lease_seconds
+        e com max_attempts falhas
+        reserve: marca os escolhidos como selected (seleções concorrentes não repetem o vídeo)
+        """
+        weights = weights or {}
+        now = time.time()
+        fit = "1"
+        if min_duration is not None:
+            fit += " AND c.duration >= :min_duration"
+        if max_duration is not None:
+            fit += " AND c.duration <= :max_duration"
+        fit_expr = f"(CASE WHEN c.duration IS NOT NULL AND {fit} THEN 1 ELSE 0 END)"
+
+        where = ["(p.status IS NULL OR (p.status = :selected AND p.updated_at < :lease_before) "
+                 "OR (p.status = :error AND p.attempts < :max_attempts))"]
+        if group_name is not None:
+            where.append("c.group_name = :group_name")
+        if strict_duration and (min_duration is not None or max_duration is not None):
+            where.append(f"{fit_expr} = 1")
+
+        params = {
+            "destination_platform": destination_platform,
+            "destination_account_id": destination_account_id,
+            "group_name": group_name,
+            "min_duration": min_duration,
+            "max_duration": max_duration,
+            "selected": SELECTED,
+            "error": ERROR,
+            "lease_before": now - lease_seconds,
+            "max_attempts": max_attempts,
+            "now": now,
+            "w_views": weights.get("views", 0.0),
+            "w_recency": weights.get("recency", 0.0),
+            "w_duration": weights.get("duration", 0.0),
+            "w_downloaded": weights.get("downloaded", 0.0),
+            "limit": limit,
+        }
+        sql = f"""
+            SELECT c.*, p.status AS publish_status, p.attempts AS publish_attempts,
+                m.path AS local_path,
+                :w_views * c.log_views
+                + :w_recency * (COALESCE(c.published_at, c.added_at) - :now) / 86400.0
+                + :w_duration * {fit_expr}
+                + :w_downloaded * (m.external_video_id IS NOT NULL) AS score
+            FROM candidates c
+            LEFT JOIN publications p
+                ON p.external_video_id = c.external_video_id
+                AND p.destination_platform = :destination_platform
+                AND p.destination_account_id = :destination_account_id
+            LEFT JOIN media m ON m.external_video_id = c.external_video_id
+            WHERE {' AND '.join(where)}
+            ORDER BY score DESC, c.added_at DESC
+            LIMIT :limit
+        """
+        if not reserve:
+            return [self._to_dict(row) for row in self.db.execute(sql, params)]
+
+        with self.db.transaction() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            conn.executemany(
+                """
+                INSERT INTO publications (
+                    external_video_id, destination_platform, destination_account_id, status, updated_at
+                ) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(destination_platform, destination_account_id, external_video_id)
+                DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at
+                """,
+                [(row["external_video_id"], destination_platform, destination_account_id, SELECTED, now)
+                 for row in rows]
+            )
+        return [self._to_dict(row) for row in rows]
+
+    def record_publish(
+        self,
+        external_video_id: str,
+        destination_platform: str,
+        destination_account_id: str,
+        status: str,
+        platform_post_id: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> Dict:
+        """Resultado do /v1/confirm; falhas acumulam tentativas"""
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO publications (
+                    external_video_id, destination_platform, destination_account_id,
+                    status, platform_post_id, error_message, attempts, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(destination_platform, destination_account_id, external_video_id)
+                DO UPDATE SET status = excluded.status,
+                    platform_post_id = COALESCE(excluded.platform_post_id, publications.platform_post_id),
+                    error_message = excluded.error_message,
+                    attempts = publications.attempts + excluded.attempts,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    external_video_id, destination_platform, destination_account_id, status,
+                    platform_post_id, error_message, int(status == ERROR), time.time()
+                )
+            )
+            row = conn.execute(
+                "SELECT * FROM publications WHERE destination_platform = ? "
+                "AND destination_account_id = ? AND external_video_id = ?",
+                (destination_platform, destination_account_id, external_video_id)
+            ).fetchone()
+        return dict(row)
+
+    def publications(self, external_video_id: str) -> List[Dict]:
+        rows = self.db.execute(
+            "SELECT * FROM publications WHERE external_video_id = ? ORDER BY updated_at DESC",
+            (external_video_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def publish_settled(self, external_video_id: str, max_attempts: int) -> bool:
+        """
+        Publicado em algum destino e nenhum outro em aberto
+        (selected, ou error ainda com tentativas sobrando)
+        """
+        row = self.db.execute_one(
+            "SELECT SUM(status = ?) AS succeeded, "
+            "SUM(status = ? OR (status = ? AND attempts < ?)) AS open "
+            "FROM publications WHERE external_video_id = ?",
+            (SUCCESS, SELECTED, ERROR, max_attempts, external_video_id)
+        )
+        return bool(row["succeeded"]) and not row["open"]
+
+    def stats(self, group_name: Optional[str] = None) -> List[Dict]:
+        """Candidatos e publicações com sucesso por grupo"""
+        sql = """
+            SELECT c.group_name, COUNT(*) AS candidates,
+                SUM(EXISTS (
+                    SELECT 1 FROM publications p
+                    WHERE p.external_video_id = c.external_video_id AND p.status = ?
+                )) AS published
+            FROM candidates c
+        """
+        params = (SUCCESS,)
+        if group_name is not None:
+            sql += " WHERE c.group_name = ?"
+            params = (SUCCESS, group_name)
+        sql += " GROUP BY c.group_name ORDER BY c.group_name"
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        record = {field: row[field] for field in _CANDIDATE_FIELDS}
+        record.update(
+            score=round(row["score"], 4),
+            downloaded=row["local_path"] is not None,
+            local_path=row["local_path"],
+            publish_status=row["publish_status"],
+            publish_attempts=row["publish_attempts"] or 0,
+        )
+        return record
+
+
+@lru_cache()
+def get_candidate_store() -> CandidateStore:
+    get_media_index()  # Garante a tabela media usada no ranking
+    return CandidateStore(get_database())
@@ -0,0 +1,210 @@
+"""
+Retenção do volume de downloads
+Remove arquivos por TTL e por cota de grupo (publicados primeiro, depois LRU),
+sem tocar em vídeos fixados ou com job em andamento
+"""
+import os
+import time
+import shutil
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+from app.core.config import get_settings
+from app.core.singleflight import sweep_locks
+from app.services.downloader.paths import safe_id
+from app.services.downloader.service import PARTIAL_DIR
+from app.services.jobs.service import get_job_store
+from app.services.jobs.store import JobStore
+from app.services.media.store import MediaIndex, get_media_index, folder_name
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class RetentionSweeper:
+    def __init__(
+        self,
+        index: MediaIndex,
+        jobs: JobStore,
+        root: str,
+        interval: float,
+        group_quotas: Dict[str, int],
+        default_quota: Optional[int] = None,
+        ttl: Optional[float] = None,
+        published_ttl: Optional[float] = None,
+        partial_ttl: Optional[float] = None
+    ):
+        self.index = index
+        self.jobs = jobs
+        self.root = root
+        self.interval = interval
+        self.group_quotas = {folder_name(group): quota for group, quota in group_quotas.items()}
+        self.default_quota = default_quota
+        self.ttl = ttl
+        self.published_ttl = published_ttl
+        self.partial_ttl = partial_ttl
+        self._task: Optional[asyncio.Task] = None
+
+    def quota_for(self, group_name: Optional[str]) -> Optional[int]:
+        return self.group_quotas.get(group_name, self.default_quota)
+
+    def usage(self) -> Dict:
+        """Uso por grupo e fonte (a partir do índice) e do disco como um todo"""
+        groups: Dict[str, Dict] = {}
+        for row in self.index.usage():
+            key = row["group_name"] or ""
+            group = groups.setdefault(key, {
+                "group_name": row["group_name"],
+                "files": 0,
+                "bytes": 0,
+                "quota": self.quota_for(row["group_name"]),
+                "sources": [],
+            })
+            group["files"] += row["files"]
+            group["bytes"] += row["bytes"] or 0
+            group["sources"].append({
+                "source_name": row["source_name"],
+                "files": row["files"],
+                "bytes": row["bytes"] or 0,
+                "pinned": row["pinned"] or 0,
+                "published": row["published"],
+            })
+
+        disk = None
+        if os.path.isdir(self.root):
+            total, used, free = shutil.disk_usage(self.root)
+            disk = {"total": total, "used": used, "free": free}
+
+        return {
+            "bytes": sum(group["bytes"] for group in groups.values()),
+            "files": sum(group["files"] for group in groups.values()),
+            "disk": disk,
+            "groups": list(groups.values()),
+        }
+
+    def _evict(self, record: Dict, reason: str, dry_run: bool) -> Dict:
+        if not dry_run:
+            try:
+                os.remove(record["path"])
+            except FileNotFoundError:
+                pass
+            self.index.remove(record["external_video_id"])
+        logger.info(f"Evicted {record['path']} ({reason}){' [dry run]' if dry_run else ''}")
+        return {
+            "external_video_id": record["external_video_id"],
+            "path": record["path"],
+            "group_name": record["group_name"],
+            "bytes": record["size"],
+            "reason": reason,
+        }
+
+    def _sweep_partials(self, active: Set[str], now: float, dry_run: bool) -> int:
+        """Pastas de download parcial abandonadas (sem job ativo e sem alteração recente)"""
+        if self.partial_ttl is None or not os.path.isdir(self.root):
+            return 0
+        active_dirs = {safe_id(video_id) for video_id in active}
+        removed = 0
+        for dirpath, dirnames, _ in os.walk(self.root):
+            if os.path.basename(dirpath) != PARTIAL_DIR:
+                continue
+            for name in list(dirnames):
+                path = os.path.join(dirpath, name)
+                if name in active_dirs or os.path.getmtime(path) > now - self.partial_ttl:
+                    continue
+                if not dry_run:
+                    shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            dirnames.clear()
+        return removed
+
+    def sweep(self, dry_run: bool = False) -> Dict:
+        """
+        Uma passada de retenção - bloqueante, chamar fora do event loop
+        1. TTL por último acesso e por publicação
+        2. Cotas por grupo: remove até voltar ao limite
+        3. Downloads parciais abandonados e locks de coalescência sem uso
+        """
+        now = time.time()
+        active = self.jobs.active_video_ids()
+        evicted: List[Dict] = []
+        removed_ids: Set[str] = set()
+
+        accessed_before = now - self.ttl if self.ttl is not None else None
+        published_before = now - self.published_ttl if self.published_ttl is not None else None
+        for record in self.index.expired(accessed_before, published_before):
+            if record["external_video_id"] in active:
+                continue
+            reason = "published_ttl" if record["published_at"] and published_before is not None else "ttl"
+            evicted.append(self._evict(record, reason, dry_run))
+            removed_ids.add(record["external_video_id"])
+
+        # Em dry run o índice não muda: descontar o que o TTL já teria liberado
+        groups: Dict[Optional[str], int] = {}
+        for row in self.index.usage():
+            groups[row["group_name"]] = groups.get(row["group_name"], 0) + (row["bytes"] or 0)
+        if dry_run:
+            for record in evicted:
+                groups[record["group_name"]] -= record["bytes"]
+
+        for group_name, used in groups.items():
+            quota = self.quota_for(group_name)
+            if quota is None or used <= quota:
+                continue
+            for record in self.index.eviction_candidates(group_name):
+                if used <= quota:
+                    break
+                if record["external_video_id"] in active or record["external_video_id"] in removed_ids:
+                    continue
+                evicted.append(self._evict(record, "quota", dry_run))
+                removed_ids.add(record["external_video_id"])
+                used -= record["size"]
+            if used > quota:
+                logger.warning(f"Group {group_name} still over quota ({used} > {quota}): remaining files are pinned")
+
+        partials = self._sweep_partials(active, now, dry_run)
+        locks = sweep_locks(self.partial_ttl, dry_run) if self.partial_ttl is not None else 0
+        return {
+            "dry_run": dry_run,
+            "evicted": evicted,
+            "bytes_freed": sum(e["bytes"] for e in evicted),
+            "partials_removed": partials,
+            "locks_removed": locks,
+        }
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await asyncio.to_thread(self.sweep)
+                if result["evicted"] or result["partials_removed"]:
+                    logger.info(
+                        f"Retention sweep freed {result['bytes_freed']} bytes "
+                        f"({len(result['evicted'])} files, {result['partials_removed']} partials)"
+                    )
+            except Exception as e:
+                logger.error(f"Retention sweep error: {e}")
+
+
+@lru_cache()
+def get_retention_sweeper() -> RetentionSweeper:
+    return RetentionSweeper(
+        index=get_media_index(),
+        jobs=get_job_store(),
+        root=settings.LOCAL_STORAGE_PATH,
+        interval=settings.STORAGE_SWEEP_INTERVAL_SECONDS,
+        group_quotas=settings.STORAGE_GROUP_QUOTAS,
+        default_quota=settings.STORAGE_DEFAULT_GROUP_QUOTA,
+        ttl=settings.STORAGE_TTL_SECONDS,
+        published_ttl=settings.STORAGE_PUBLISHED_TTL_SECONDS,
+        partial_ttl=settings.STORAGE_PARTIAL_TTL_SECONDS
+    )
@@ -0,0 +1,207 @@
+"""
+Upload de vídeos baixados para o backend de publicação (ex: Postiz /upload)
+O arquivo vai do disco para a rede em blocos (multipart em streaming), sem cópia em memória
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Optional
+import httpx
+from app.core.config import get_settings
+from app.core.http import get_http_client
+from app.core.metrics import record_error
+from app.services.media.store import get_media_index
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Respostas que valem nova tentativa (além de erros de conexão)
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class MediaNotFoundError(Exception):
+    """Vídeo não está no índice local ou o arquivo não pode ser lido"""
+
+
+class UploadError(Exception):
+    """Upload falhou após todas as tentativas (status_code/body: resposta do destino)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: Optional[str] = None):
+        self.status_code = status_code
+        self.body = body
+        super().__init__(message)
+
+
+class MultipartFile:
+    """
+    Corpo multipart/form-data com um arquivo lido do disco sob demanda
+    Content-Length é conhecido antes de enviar (sem chunked encoding)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        field_name: str = "file",
+        filename: Optional[str] = None,
+        content_type: str = "video/mp4",
+        fields: Optional[Dict[str, str]] = None,
+        chunk_size: int = 1024 * 1024
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        filename = filename or os.path.basename(path)
+
+        preamble = b""
+        for name, value in (fields or {}).items():
+            preamble += (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode()
+        preamble += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self.preamble = preamble
+        self.epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+        self.file_size = os.path.getsize(path)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def content_length(self) -> int:
+        return len(self.preamble) + self.file_size + len(self.epilogue)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Leituras do disco em thread para não bloquear o event loop"""
+        yield self.preamble
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        yield self.epilogue
+
+
+class UploaderService:
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def _slots(cls) -> asyncio.Semaphore:
+        """Limite de uploads simultâneos no processo"""
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+        return cls._semaphore
+
+    async def upload(
+        self,
+        external_video_id: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        field_name: str = "file",
+        fields: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Envia o vídeo como multipart para `url` e devolve a resposta do destino
+        Novas tentativas em erro de conexão, 429 e 5xx (backoff 1s, 2s, ...)
+        O arquivo fica protegido da retenção enquanto o upload durar
+        """
+        index = get_media_index()
+        if not await asyncio.to_thread(index.get_valid, external_video_id):
+            raise MediaNotFoundError(f"Media {external_video_id} not found")
+
+        timeout = timeout or settings.UPLOAD_TIMEOUT_SECONDS
+        attempts = settings.UPLOAD_MAX_ATTEMPTS
+        async with self._slots():
+            # Todas as tentativas + backoff entre elas
+            until = await asyncio.to_thread(
+                index.lease, external_video_id, timeout * attempts + attempts * (attempts + 1) / 2
+            )
+            try:
+                record = await asyncio.to_thread(index.get_valid, external_video_id)
+                if not record:
+                    raise MediaNotFoundError(f"Media {external_video_id} not found")
+                await asyncio.to_thread(index.touch, external_video_id)
+                return await self._send(external_video_id, record, url, headers, field_name, fields, timeout)
+            finally:
+                await asyncio.to_thread(index.release, external_video_id, until)
+
+    async def _send(
+        self,
+        external_video_id: str,
+        record: Dict,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        field_name: str,
+        fields: Optional[Dict[str, str]],
+        timeout: float
+    ) -> Dict:
+        client = get_http_client()
+        last_error = None
+        for attempt in range(1, settings.UPLOAD_MAX_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try:
+                body = MultipartFile(
+                    record["path"],
+                    field_name=field_name,
+                    filename=record["file_name"],
+                    fields=fields,
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE
+                )
+                request_headers = {
+                    **(headers or {}),
+                    "Content-Type": body.content_type,
+                    "Content-Length": str(body.content_length),
+                }
+                response = await client.post(url, content=body.stream(), headers=request_headers, timeout=timeout)
+            except OSError as e:
+                # Arquivo sumiu ou ficou ilegível: nova tentativa não adianta
+                raise MediaNotFoundError(f"Media {external_video_id} unreadable: {e}")
+            except httpx.HTTPError as e:
+                record_error("upload", e)
+                last_error = UploadError(f"Upload failed: {e}")
+                logger.warning(f"Upload of {external_video_id} failed (attempt {attempt}): {e}")
+            else:
+                if response.status_code < 400:
+                    logger.info(
+                        f"Uploaded {external_video_id} ({body.file_size} bytes) "
+                        f"in {time.perf_counter() - started:.1f}s"
+                    )
+                    return {
+                        "status": "uploaded",
+                        "external_video_id": external_video_id,
+                        "bytes": body.file_size,
+                        "attempts": attempt,
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                        "status_code": response.status_code,
+                        "response": _response_body(response),
+                    }
+                last_error = UploadError(
+                    f"Upload rejected with {response.status_code}",
+                    status_code=response.status_code,
+                    body=response.text[:1000]
+                )
+                if response.status_code not in RETRY_STATUS:
+                    break
+                record_error("upload", last_error)
+                logger.warning(f"Upload of {external_video_id} returned {response.status_code} (attempt {attempt})")
+
+            if attempt < settings.UPLOAD_MAX_ATTEMPTS:
+                await asyncio.sleep(attempt)
+
+        raise last_error
+
+
+def _response_body(response: httpx.Response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
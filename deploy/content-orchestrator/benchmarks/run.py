@@ -0,0 +1,295 @@
+"""
+Benchmarks offline do content-orchestrator (sem rede)
+
+Uso (a partir de deploy/content-orchestrator):
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --baseline results.json --tolerance 0.25
+
+Cenários:
+- process_sources: vazão de /v1/n8n/process-sources por número de fontes
+- download: /v1/download/batch de ponta a ponta por número de workers
+- slugify: custo por chamada do slug de nomes de arquivo
+- api_latency: latência de GET /health e /v1/media sob carga concorrente
+
+Resultado em JSON; com --baseline, sai com código 1 se alguma métrica piorar além da tolerância
+"""
+import os
+import sys
+import json
+import time
+import logging
+import shutil
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+from typing import Dict, List
+
+# Configuração precisa existir antes de importar o app (get_settings é lido na importação)
+_WORKDIR = tempfile.mkdtemp(prefix="orchestrator-bench-")
+os.environ.update({
+    "DATABASE_PATH": os.path.join(_WORKDIR, "bench.db"),
+    "LOCAL_STORAGE_PATH": os.path.join(_WORKDIR, "downloads"),
+    "YTDLP_CONCURRENCY_YOUTUBE": "64",
+    "YTDLP_MAX_WORKERS": "64",
+    "YTDLP_MAX_QUEUE_DEPTH": "10000",
+    "DOWNLOAD_HOST_CONCURRENCY_DEFAULT": "64",
+    "DOWNLOAD_MAX_PENDING_JOBS": "100000",
+    "JOB_POLL_INTERVAL_SECONDS": "0.05",
+    "PLATFORM_RATE_LIMITS": '{"youtube": 100000}',  # Mede o serviço, não o limitador
+})
+
+import httpx  # noqa: E402
+from benchmarks.stubs import MediaServer, StubConfig, install  # noqa: E402
+
+install()
+
+from app.main import app  # noqa: E402
+from app.services.downloader.paths import slugify  # noqa: E402
+from app.services.jobs.service import get_download_queue  # noqa: E402
+
+# Logs do app vão para stdout; manter só avisos para não misturar com o JSON
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300)
+
+
+async def bench_process_sources(source_counts: List[int], repeats: int) -> List[Dict]:
+    results = []
+    async with _client() as client:
+        for count in source_counts:
+            payload = {
+                "sources": [{"platform": "youtube", "external_id": f"@bench{i}"} for i in range(count)],
+                "concurrency": count,
+            }
+            timings = []
+            videos = 0
+            for _ in range(repeats):
+                started = time.perf_counter()
+                response = await client.post("/v1/n8n/process-sources", json=payload)
+                timings.append(time.perf_counter() - started)
+                response.raise_for_status()
+                videos = response.json()["videos_found"]
+            best = min(timings)
+            results.append({
+                "sources": count,
+                "videos": videos,
+                "seconds": round(best, 4),
+                "sources_per_second": round(count / best, 2),
+                "videos_per_second": round(videos / best, 2),
+            })
+    return results
+
+
+async def bench_download(worker_counts: List[int], videos_per_run: int) -> List[Dict]:
+    results = []
+    queue = get_download_queue()
+    async with _client() as client:
+        for run, workers in enumerate(worker_counts):
+            queue.concurrency = workers
+            await queue.start()
+            try:
+                items = [
+                    {
+                        "video_url": f"https://www.youtube.com/watch?v=dl{run}-{i}",
+                        "platform": "youtube",
+                        "external_video_id": f"dl{run}-{i}",
+                    }
+                    for i in range(videos_per_run)
+                ]
+                started = time.perf_counter()
+                response = await client.post("/v1/download/batch", json={"items": items})
+                response.raise_for_status()
+                batch_id = response.json()["batch_id"]
+                while True:
+                    status = (await client.get(f"/v1/download/batch/{batch_id}")).json()
+                    if status["progress"] >= 1:
+                        break
+                    await asyncio.sleep(0.02)
+                elapsed = time.perf_counter() - started
+            finally:
+                await queue.stop()
+
+            failed = status["states"].get("failed", 0)
+            results.append({
+                "workers": workers,
+                "videos": videos_per_run,
+                "failed": failed,
+                "seconds": round(elapsed, 4),
+                "videos_per_second": round(videos_per_run / elapsed, 2),
+                "megabytes_per_second": round(status["bytes_completed"] / elapsed / 1e6, 2),
+            })
+    return results
+
+
+def bench_slugify(iterations: int) -> Dict:
+    titles = [
+        "Ação Nº 1 - Vídeo 🎬 incrível: o MELHOR de 2024!!! #shorts",
+        "Podcast ep. 342 | Convidado especial — parte 2/3",
+        "plain ascii title",
+        "Ñandú & Çedilha ºª° ☕️ 😂😂😂",
+        "x" * 300,
+    ]
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for title in titles:
+            slugify(title)
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": iterations * len(titles),
+        "microseconds_per_call": round(elapsed / (iterations * len(titles)) * 1e6, 3),
+    }
+
+
+async def bench_api_latency(concurrency: int, requests_per_worker: int) -> Dict:
+    results = {}
+    async with _client() as client:
+        for path in ("/health", "/v1/media/dl0-0"):
+            latencies: List[float] = []
+
+            async def worker():
+                for _ in range(requests_per_worker):
+                    started = time.perf_counter()
+                    await client.get(path)
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            results[path] = {
+                "concurrency": concurrency,
+                "requests": len(latencies),
+                "requests_per_second": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+                "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+            }
+    return results
+
+
+# Vazões comparadas com o baseline: cenário -> (chave da linha, métrica)
+_TRACKED = {
+    "process_sources": ("sources", "sources_per_second"),
+    "download": ("workers", "videos_per_second"),
+}
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Lista de regressões além da tolerância (fração, ex: 0.2 = 20%)"""
+    regressions = []
+    for scenario, (key, metric) in _TRACKED.items():
+        previous = {row[key]: row[metric] for row in baseline["results"].get(scenario, [])}
+        for row in current["results"].get(scenario, []):
+            before = previous.get(row[key])
+            if before and row[metric] < before * (1 - tolerance):
+                regressions.append(f"{scenario}[{key}={row[key]}].{metric}: {before} -> {row[metric]}")
+
+    before = baseline["results"].get("slugify", {}).get("microseconds_per_call")
+    after = current["results"].get("slugify", {}).get("microseconds_per_call")
+    if before and after and after > before * (1 + tolerance):
+        regressions.append(f"slugify.microseconds_per_call: {before} -> {after}")
+
+    for path, row in current["results"].get("api_latency", {}).items():
+        before = baseline["results"].get("api_latency", {}).get(path, {}).get("p95_ms")
+        if before and row["p95_ms"] > before * (1 + tolerance):
+            regressions.append(f"api_latency[{path}].p95_ms: {before} -> {row['p95_ms']}")
+    return regressions
+
+
+async def main(args) -> Dict:
+    StubConfig.entries_per_listing = args.entries
+    StubConfig.extract_latency = args.extract_latency
+    StubConfig.video_size = args.video_size
+    StubConfig.media_server = MediaServer(rate=args.server_rate).start()
+
+    results = {}
+    try:
+        scenarios = set(args.scenarios)
+        if "process_sources" in scenarios:
+            results["process_sources"] = await bench_process_sources(args.sources, args.repeats)
+        if "download" in scenarios:
+            results["download"] = await bench_download(args.workers, args.videos)
+        if "slugify" in scenarios:
+            results["slugify"] = bench_slugify(args.slugify_iterations)
+        if "api_latency" in scenarios:
+            results["api_latency"] = await bench_api_latency(args.concurrency, args.requests)
+    finally:
+        StubConfig.media_server.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {
+                "entries_per_listing": args.entries,
+                "extract_latency": args.extract_latency,
+                "video_size": args.video_size,
+                "server_rate": args.server_rate,
+            },
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the content-orchestrator")
+    parser.add_argument("--scenarios", nargs="+", default=["process_sources", "download", "slugify", "api_latency"])
+    parser.add_argument("--sources", type=int, nargs="+", default=[1, 5, 20, 50])
+    parser.add_argument("--entries", type=int, default=50, help="Videos per synthetic channel listing")
+    parser.add_argument("--extract-latency", type=float, default=0.05, help="Seconds per stubbed extraction")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--videos", type=int, default=16, help="Downloads per concurrency level")
+    parser.add_argument("--video-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--server-rate", type=int, default=8 * 1024 * 1024, help="Bytes/s per connection (0 = unlimited)")
+    parser.add_argument("--slugify-iterations", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per concurrent client")
+    parser.add_argument("--quick", action="store_true", help="Smaller run for CI")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sources = [1, 10]
+        args.workers = [1, 4]
+        args.videos = 8
+        args.repeats = 1
+        args.slugify_iterations = 2000
+        args.requests = 10
+    args.server_rate = args.server_rate or None
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    try:
+        report = asyncio.run(main(arguments))
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            regressions = compare(report, json.load(f), arguments.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,152 @@
+"""
+Dublês para rodar os benchmarks sem rede
+- StubYoutubeDL: yt-dlp real, mas extract_info devolve listagens/vídeos sintéticos
+- MediaServer: servidor HTTP local com arquivos de vídeo falsos (suporta Range)
+"""
+import re
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+import yt_dlp
+
+_CHUNK = 64 * 1024
+
+
+class MediaServer:
+    """
+    Serve /video/{nome}.mp4?size=N com N bytes
+    rate: bytes/s por conexão (simula a banda de uma CDN); None = sem limite
+    """
+
+    def __init__(self, rate: Optional[int] = None):
+        rate_limit = rate
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                match = re.search(r"size=(\d+)", self.path)
+                size = int(match.group(1)) if match else 1024 * 1024
+                start = 0
+                range_header = self.headers.get("Range")
+                if range_header:
+                    start = int(re.match(r"bytes=(\d+)-", range_header).group(1))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(size - start))
+                self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+
+                remaining = size - start
+                chunk = b"\0" * _CHUNK
+                started = time.perf_counter()
+                sent = 0
+                while remaining > 0:
+                    piece = chunk[:min(_CHUNK, remaining)]
+                    self.wfile.write(piece)
+                    remaining -= len(piece)
+                    sent += len(piece)
+                    if rate_limit:
+                        ahead = sent / rate_limit - (time.perf_counter() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def url(self, name: str, size: int) -> str:
+        return f"{self.base_url}/video/{name}.mp4?size={size}"
+
+    def start(self) -> "MediaServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StubConfig:
+    """Parâmetros compartilhados pelas instâncias do stub (configurados pelo runner)"""
+    entries_per_listing: int = 50
+    extract_latency: float = 0.0  # Segundos por extract_info (simula a ida à plataforma)
+    video_size: int = 2 * 1024 * 1024
+    media_server: Optional[MediaServer] = None
+
+
+class StubYoutubeDL(yt_dlp.YoutubeDL):
+    """
+    extract_info sintético; seleção de formato e download (HTTP) são os do yt-dlp real
+    Listagens: IDs {canal}-{i}, do mais novo para o mais antigo
+    """
+
+    def __init__(self, params=None, *args, **kwargs):
+        # Barra de progresso do yt-dlp vai para stdout e misturaria com o JSON do runner
+        super().__init__({**(params or {}), "noprogress": True}, *args, **kwargs)
+
+    def extract_info(self, url, download=True, ie_key=None, extra_info=None, process=True, force_generic_extractor=False):
+        if StubConfig.extract_latency:
+            time.sleep(StubConfig.extract_latency)
+
+        match = re.search(r"watch\?v=([^&]+)", url)
+        if match:
+            info = self._video(match.group(1), url)
+            if process:
+                return self.process_ie_result(info, download=download)
+            return info
+        return self._listing(url)
+
+    def _listing(self, url: str) -> Dict:
+        channel = re.sub(r"\W+", "", url.split("youtube.com/")[-1].split("/")[0]) or "channel"
+        count = StubConfig.entries_per_listing
+        playlistend = self.params.get("playlistend")
+        if playlistend:
+            count = min(count, playlistend)
+        return {
+            "_type": "playlist",
+            "id": channel,
+            "title": f"Channel {channel}",
+            "webpage_url": url,
+            "entries": [
+                {
+                    "_type": "url",
+                    "id": f"{channel}-{i}",
+                    "title": f"Vídeo {i} do canal {channel} 🎬",
+                    "url": f"https://www.youtube.com/watch?v={channel}-{i}",
+                    "duration": 60,
+                    "view_count": 1000 - i,
+                }
+                for i in range(count)
+            ],
+        }
+
+    def _video(self, video_id: str, url: str) -> Dict:
+        server = StubConfig.media_server
+        return {
+            "id": video_id,
+            "title": f"Vídeo {video_id}",
+            "ext": "mp4",
+            "url": server.url(video_id, StubConfig.video_size) if server else url,
+            "filesize": StubConfig.video_size,
+            "webpage_url": url,
+            "extractor": "stub",
+            "extractor_key": "Stub",
+        }
+
+
+def install():
+    """Substitui yt_dlp.YoutubeDL (fetcher e downloader o buscam no módulo a cada chamada)"""
+    yt_dlp.YoutubeDL = StubYoutubeDL
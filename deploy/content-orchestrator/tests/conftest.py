@@ -0,0 +1,20 @@
+"""
+Ambiente isolado para os testes: downloads e banco num diretório temporário
+As variáveis precisam existir antes do primeiro import de app.core.config (settings em cache)
+"""
+import os
+import tempfile
+import pytest
+
+_ROOT = tempfile.mkdtemp(prefix="orchestrator-tests-")
+os.environ["LOCAL_STORAGE_PATH"] = os.path.join(_ROOT, "downloads")
+os.environ["DATABASE_PATH"] = os.path.join(_ROOT, "data", "orchestrator.db")
+os.environ["YTDLP_WARMUP"] = "false"
+
+from app.core.database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Banco SQLite novo por teste"""
+    return Database(str(tmp_path / "test.db"))
@@ -0,0 +1,44 @@
+import base64
+import hashlib
+import pytest
+from app.services.seen.bloom import BloomFilter
+
+
+def _encode(ids, size, hashes):
+    """Filtro montado como o n8n faz, direto do formato documentado em bloom.py"""
+    bits = bytearray((size + 7) // 8)
+    for video_id in ids:
+        digest = hashlib.sha256(video_id.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big")
+        for j in range(hashes):
+            position = (h1 + j * h2) % size
+            bits[position // 8] |= 1 << (position % 8)
+    return base64.b64encode(bytes(bits)).decode("ascii")
+
+
+def test_decodes_wire_format_without_false_negatives():
+    ids = [f"video-{i}" for i in range(1000)]
+    bloom = BloomFilter.from_base64(_encode(ids, 9586, 7), 9586, 7)
+    assert all(video_id in bloom for video_id in ids)
+
+
+def test_false_positive_rate_close_to_design():
+    ids = [f"video-{i}" for i in range(1000)]
+    bloom = BloomFilter.from_base64(_encode(ids, 9586, 7), 9586, 7)  # ~1% para 1000 itens
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_add_matches_wire_format():
+    bloom = BloomFilter(1024, 5)
+    bloom.add("abc")
+    assert "abc" in bloom
+    assert base64.b64encode(bytes(bloom.bits)).decode() == _encode(["abc"], 1024, 5)
+    assert "xyz" not in BloomFilter(1024, 5)
+
+
+@pytest.mark.parametrize("data,size", [("not base64!", 64), (base64.b64encode(b"\0").decode(), 64)])
+def test_rejects_invalid_encoding(data, size):
+    with pytest.raises(ValueError):
+        BloomFilter.from_base64(data, size, 3)
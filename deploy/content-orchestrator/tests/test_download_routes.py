@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.jobs import service as jobs_module
+from app.services.jobs.store import JobStore
+
+ITEM = {"video_url": "https://www.youtube.com/watch?v=abc", "platform": "youtube", "external_video_id": "abc"}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    # Fila sem workers: os jobs ficam queued
+    queue = jobs_module.JobQueue(
+        store=JobStore(db), kind="download", handler=None, concurrency=0,
+        max_pending=100, poll_interval=1, stale_after=60
+    )
+    monkeypatch.setattr("app.api.routes.download.get_download_queue", lambda: queue)
+    return TestClient(app)
+
+
+def test_active_job_is_reused(client):
+    first = client.post("/v1/download", json=ITEM).json()
+    second = client.post("/v1/download", json=ITEM).json()
+    assert second["job_id"] == first["job_id"]
+    assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+
+
+def test_other_profile_gets_its_own_job(client):
+    first = client.post("/v1/download", json=ITEM).json()
+    audio = client.post("/v1/download", json={**ITEM, "profile": "audio"}).json()
+    assert audio["job_id"] != first["job_id"]
+    assert not audio["deduplicated"]
+
+
+def test_saturated_platform_is_refused(client, monkeypatch):
+    from app.services.executor.service import get_executor
+
+    executor = get_executor()
+    monkeypatch.setattr(executor, "is_saturated", lambda platform: platform == "youtube")
+    response = client.post("/v1/download", json=ITEM)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    batch = client.post("/v1/download/batch", json={"items": [ITEM]})
+    assert batch.status_code == 503
+    assert client.post("/v1/download", json={**ITEM, "platform": "tiktok"}).status_code == 200
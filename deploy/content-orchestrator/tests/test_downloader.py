@@ -0,0 +1,154 @@
+import os
+import asyncio
+import pytest
+from app.services.downloader import service as downloader_module
+from app.services.downloader.service import DownloaderService
+
+
+class _InlineExecutor:
+    """Executa a chamada bloqueante numa thread, sem fila nem limites por plataforma"""
+
+    async def run(self, platform, func, *args, timeout=None, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def inline_executor(monkeypatch):
+    monkeypatch.setattr(downloader_module, "get_executor", lambda: _InlineExecutor())
+
+
+def _fake_download(downloaded: int, final: int, postprocessor=None):
+    """Simula o yt-dlp: baixa `downloaded` bytes e, com pós-processador, reescreve o arquivo com `final` bytes"""
+
+    def run(self, video_url, ydl_opts, info=None):
+        path = ydl_opts["outtmpl"].replace("%(ext)s", "m4a")
+        with open(path, "wb") as f:
+            f.write(b"\0" * downloaded)
+        for hook in ydl_opts["progress_hooks"]:
+            hook({"status": "downloading", "filename": path, "downloaded_bytes": 0, "total_bytes": downloaded})
+            hook({"status": "finished", "filename": path, "total_bytes": downloaded})
+        if postprocessor:
+            with open(path, "wb") as f:
+                f.write(b"\0" * final)
+            for hook in ydl_opts["postprocessor_hooks"]:
+                hook({"status": "finished", "postprocessor": postprocessor, "info_dict": {"filepath": path}})
+
+    return run
+
+
+def _download(tmp_path, monkeypatch, runner):
+    monkeypatch.setattr(DownloaderService, "_run_ytdlp_download", runner)
+    output = str(tmp_path / "out" / "video.mp4")
+    os.makedirs(os.path.dirname(output))
+    result = asyncio.run(DownloaderService()._download_with_ytdlp_library(
+        "https://example.com/v", output, "youtube", external_video_id="v1", profile="audio"
+    ))
+    return result, output
+
+
+def test_fixup_rewrite_is_not_reported_as_incomplete(tmp_path, monkeypatch):
+    # FixupM4a/FixupM3u8 reescrevem o arquivo: o tamanho muda depois do hook "finished"
+    result, output = _download(tmp_path, monkeypatch, _fake_download(50_000, 48_000, "FFmpegFixupM4a"))
+    assert result["status"] == "completed"
+    assert result["expected_size"] is None
+    assert os.path.getsize(output) == 48_000
+
+
+def _truncated(**declared):
+    """Conexão caiu em 10 KB; no "finished" o yt-dlp informa o que chegou como total"""
+
+    def run(self, video_url, ydl_opts, info=None):
+        path = ydl_opts["outtmpl"].replace("%(ext)s", "mp4")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 10_000)
+        for hook in ydl_opts["progress_hooks"]:
+            hook({"status": "downloading", "filename": path, "downloaded_bytes": 0, **declared})
+            hook({"status": "finished", "filename": path, "total_bytes": 10_000, "info_dict": declared})
+
+    return run
+
+
+@pytest.mark.parametrize("declared", [{"total_bytes": 50_000}, {"filesize": 50_000}])
+def test_size_mismatch_without_postprocessing_fails(tmp_path, monkeypatch, declared):
+    # Referência: Content-Length (total_bytes durante o download) ou filesize do formato
+    result, output = _download(tmp_path, monkeypatch, _truncated(**declared))
+    assert result["status"] == "failed"
+    assert "Incomplete" in result["error"]
+    assert not os.path.exists(output)
+
+
+def test_move_only_postprocessor_keeps_exact_check(tmp_path, monkeypatch):
+    result, _ = _download(tmp_path, monkeypatch, _fake_download(50_000, 50_000, "MoveFiles"))
+    assert result["status"] == "completed"
+    assert result["expected_size"] == 50_000
+
+
+def test_rewritten_file_must_not_be_truncated(tmp_path, monkeypatch):
+    result, _ = _download(tmp_path, monkeypatch, _fake_download(50_000, 10, "FFmpegFixupM3u8"))
+    assert result["status"] == "failed"
+
+
+def test_group_indexed_without_source(db, monkeypatch):
+    from app.services.downloader import paths as paths_module
+    from app.services.media.store import MediaIndex
+
+    index = MediaIndex(db)
+    monkeypatch.setattr(downloader_module, "get_media_index", lambda: index)
+    monkeypatch.setattr(paths_module, "get_media_index", lambda: index)
+
+    async def info(self, video_url, platform):
+        return {"title": "Clip"}
+
+    async def download(self, video_url, output_path, *args, **kwargs):
+        with open(output_path, "wb") as f:
+            f.write(b"\0" * 5000)
+        return {"status": "completed", "expected_size": 5000}
+
+    monkeypatch.setattr(DownloaderService, "_get_video_info", info)
+    monkeypatch.setattr(DownloaderService, "_download_with_ytdlp_library", download)
+    result = asyncio.run(DownloaderService().download_video(
+        "https://example.com/g1", "youtube", "g1", group_name="Cortes Podcast"
+    ))
+
+    assert result["status"] == "completed"
+    record = index.get("g1")
+    assert (record["group_name"], record["source_name"]) == ("cortes_podcast", None)
+
+
+def test_single_flight_per_video_and_profile(db, monkeypatch):
+    from app.services.downloader import paths as paths_module
+    from app.services.media.store import MediaIndex
+
+    index = MediaIndex(db)
+    monkeypatch.setattr(downloader_module, "get_media_index", lambda: index)
+    monkeypatch.setattr(paths_module, "get_media_index", lambda: index)
+    runs = []
+
+    async def info(self, video_url, platform):
+        return {"title": "Shared"}
+
+    async def download(self, video_url, output_path, platform, info, external_video_id, group_name, profile):
+        runs.append(profile)
+        await asyncio.sleep(0.05)
+        with open(output_path, "wb") as f:
+            f.write(b"\0" * (5000 + len(runs)))
+        return {"status": "completed"}
+
+    monkeypatch.setattr(DownloaderService, "_get_video_info", info)
+    monkeypatch.setattr(DownloaderService, "_download_with_ytdlp_library", download)
+
+    def request(profile):
+        return DownloaderService().download_video("https://example.com/s1", "youtube", "s1", profile=profile)
+
+    async def scenario():
+        return await asyncio.gather(request("shorts_1080"), request("shorts_1080"), request("audio"))
+
+    results = asyncio.run(scenario())
+    assert all(result["status"] == "completed" for result in results)
+    # Mesmo perfil: um download; outro perfil: download próprio (depois, não junto)
+    assert sorted(runs) == ["audio", "shorts_1080"]
+    assert index.get("s1")["profile"] == runs[-1]
+
+    # Já indexado com o perfil: nada a baixar
+    asyncio.run(request(runs[-1]))
+    assert len(runs) == 2
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import threading
+import pytest
+from app.services.executor.service import YtdlpExecutor
+
+
+def _executor(**kwargs):
+    options = dict(max_workers=4, limits={"youtube": 1}, default_limit=1, max_queue_depth=10)
+    options.update(kwargs)
+    return YtdlpExecutor(**options)
+
+
+def test_timeout_keeps_slot_until_thread_returns():
+    executor = _executor()
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run("youtube", release.wait, timeout=0.05)
+        # Thread ainda ocupa a única vaga: a próxima chamada espera
+        second = asyncio.create_task(executor.run("youtube", lambda: "ok"))
+        await asyncio.sleep(0.1)
+        assert not second.done()
+        release.set()
+        assert await asyncio.wait_for(second, 2) == "ok"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_outer_deadline_covers_queue_wait():
+    executor = _executor()
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.create_task(executor.run("youtube", release.wait))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        # Prazo por tentativa não conta a fila; o wait_for externo conta
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run("youtube", lambda: "ok", timeout=5), 0.1)
+        assert time.monotonic() - started < 1
+        assert executor.pending("youtube") == 1
+        release.set()
+        await first
+        assert executor.pending("youtube") == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_breaker_counts_only_platform_failures():
+    executor = _executor(rates={"youtube": 1000}, failure_threshold=2, circuit_reset=60)
+
+    def fail(message):
+        raise Exception(message)
+
+    async def scenario():
+        guard = executor.guard("youtube")
+        # Prazo local e erro definitivo não abrem o circuito nem zeram a sequência
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run("youtube", time.sleep, 0.2, timeout=0.01)
+        with pytest.raises(Exception):
+            await executor.run("youtube", fail, "ERROR: HTTP Error 503: Service Unavailable")
+        with pytest.raises(Exception):
+            await executor.run("youtube", fail, "ERROR: Private video")
+        assert guard.breaker.state == "closed"
+        with pytest.raises(Exception):
+            await executor.run("youtube", fail, "ERROR: HTTP Error 429: Too Many Requests")
+        assert guard.breaker.state == "open"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.api.routes import files as files_module
+from app.main import app
+from app.services.media.store import MediaIndex, file_sha256
+
+CONTENT = bytes(range(256)) * 16
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    index = MediaIndex(db)
+    path = str(tmp_path / "v1.mp4")
+    with open(path, "wb") as f:
+        f.write(CONTENT)
+    index.put("v1", path, len(CONTENT), sha256=file_sha256(path))
+    monkeypatch.setattr(files_module, "get_media_index", lambda: index)
+    return TestClient(app)
+
+
+def test_full_file_with_etag(client):
+    response = client.get("/v1/files/v1")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_range_request(client):
+    response = client.get("/v1/files/v1", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+
+def test_if_none_match(client):
+    etag = client.head("/v1/files/v1").headers["etag"]
+    assert client.get("/v1/files/v1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/v1/files/v1", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/v1/files/v1", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_missing_media(client):
+    assert client.get("/v1/files/nope").status_code == 404
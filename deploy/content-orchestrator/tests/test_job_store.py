@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.services.jobs.store import JobStore, QUEUED, RUNNING, FAILED
+
+
+@pytest.fixture
+def store(db):
+    return JobStore(db)
+
+
+def _stall(store, job_id):
+    """Worker parou: heartbeat antigo"""
+    store.db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 3600, job_id))
+
+
+def test_stale_job_requeued(store):
+    job = store.create("download", {"external_video_id": "v1"}, video_id="v1")
+    assert store.claim("download", "worker-a")["state"] == RUNNING
+    _stall(store, job["job_id"])
+
+    assert store.requeue_stale("download", 60, max_attempts=3) == 1
+    job = store.get(job["job_id"])
+    assert (job["state"], job["attempts"]) == (QUEUED, 1)
+    assert store.claim("download", "worker-b")["attempts"] == 2
+
+
+def test_live_job_not_requeued(store):
+    store.create("download", {})
+    store.claim("download", "worker-a")
+    store.heartbeat("worker-a")
+    assert store.requeue_stale("download", 60, max_attempts=3) == 0
+
+
+def test_stale_job_fails_after_max_attempts(store):
+    job = store.create("download", {})
+    for attempt in range(3):
+        store.claim("download", f"worker-{attempt}")
+        _stall(store, job["job_id"])
+        store.requeue_stale("download", 60, max_attempts=3)
+
+    job = store.get(job["job_id"])
+    assert job["state"] == FAILED
+    assert "Interrupted 3 times" in job["error"]
+    assert job["finished_at"] is not None
+    assert store.claim("download", "worker-x") is None
+
+
+def test_unique_create_is_atomic(store):
+    payload = {"external_video_id": "v1", "profile": "source"}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        jobs = list(pool.map(lambda _: store.create("download", payload, video_id="v1", unique=True), range(16)))
+
+    assert len({job["job_id"] for job in jobs}) == 1
+    assert sum(1 for job in jobs if not job.get("deduplicated")) == 1
+    assert store.count("download", [QUEUED]) == 1
+
+    audio = store.create("download", {**payload, "profile": "audio"}, video_id="v1", unique=True)
+    assert not audio.get("deduplicated")
+    assert store.find_active("download", "v1", "audio")["job_id"] == audio["job_id"]
@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def _routes(client):
+    lines = client.get("/metrics").text.splitlines()
+    return {line for line in lines if line.startswith("orchestrator_http_request_duration_seconds_count")}
+
+
+def test_route_label_is_the_template():
+    client = TestClient(app)
+    client.get("/v1/download/abc123")
+    client.get("/v1/download/download")
+    client.get("/no/such/path")
+    routes = " ".join(_routes(client))
+    assert 'route="/v1/download/{job_id}"' in routes
+    assert 'route="unmatched"' in routes
+    assert "abc123" not in routes
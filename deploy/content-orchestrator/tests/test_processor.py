@@ -0,0 +1,75 @@
+import os
+import asyncio
+import pytest
+from app.core.config import get_settings
+from app.services.media.store import MediaIndex
+from app.services.processor import service as processor_module
+from app.services.processor.service import ProcessingError, ProcessorService
+
+settings = get_settings()
+
+
+@pytest.fixture
+def index(db, monkeypatch):
+    index = MediaIndex(db)
+    monkeypatch.setattr(processor_module, "get_media_index", lambda: index)
+    return index
+
+
+@pytest.mark.parametrize("options", [
+    {"x264_preset": "veryfast -i /etc/passwd"},
+    {"audio_bitrate": "128k -map 1"},
+    {"crf": "23 -y"},
+    {"crf": 80},
+    {"logo_path": "/etc/passwd"},
+])
+def test_rejects_unsafe_options(options):
+    with pytest.raises(ProcessingError):
+        ProcessorService().build_command("reencode", "in.mp4", "out.mp4", options)
+
+
+def test_logo_inside_downloads_is_accepted():
+    logo = os.path.join(settings.LOCAL_STORAGE_PATH, "logo.png")
+    command = ProcessorService().build_command("reencode", "in.mp4", "out.mp4", {"logo_path": logo, "crf": 20})
+    assert command[command.index("-crf") + 1] == "20"
+
+
+def test_copy_is_indexed_separately(index, monkeypatch):
+    os.makedirs(settings.LOCAL_STORAGE_PATH, exist_ok=True)
+    path = os.path.join(settings.LOCAL_STORAGE_PATH, "v1.mp4")
+    with open(path, "wb") as f:
+        f.write(b"\0" * 2048)
+    index.put("v1", path, 2048, group_name="g", source_name="s")
+
+    async def fake_ffmpeg(self, command):
+        with open(command[-1], "wb") as f:
+            f.write(b"\1" * 4096)
+
+    monkeypatch.setattr(ProcessorService, "_run_ffmpeg", fake_ffmpeg)
+    result = asyncio.run(ProcessorService().process("reencode", external_video_id="v1", replace_original=False))
+
+    assert result["status"] == "completed"
+    assert result["external_video_id"] == "styled_v1"
+    assert index.get("v1")["path"] == path
+    styled = index.get("styled_v1")
+    assert styled["path"] == os.path.join(settings.LOCAL_STORAGE_PATH, "styled_v1.mp4")
+    assert (styled["size"], styled["group_name"]) == (4096, "g")
+
+
+def test_in_place_replace_by_path_updates_index(index, monkeypatch):
+    os.makedirs(settings.LOCAL_STORAGE_PATH, exist_ok=True)
+    path = os.path.join(settings.LOCAL_STORAGE_PATH, "v2.mp4")
+    with open(path, "wb") as f:
+        f.write(b"\0" * 2048)
+    index.put("v2", path, 2048, group_name="g")
+
+    async def fake_ffmpeg(self, command):
+        with open(command[-1], "wb") as f:
+            f.write(b"\1" * 1024)
+
+    monkeypatch.setattr(ProcessorService, "_run_ffmpeg", fake_ffmpeg)
+    result = asyncio.run(ProcessorService().process("reencode", path=path))
+
+    assert (result["status"], result["external_video_id"]) == ("completed", "v2")
+    record = index.get_valid("v2")
+    assert (record["size"], record["group_name"]) == (1024, "g")
@@ -0,0 +1,47 @@
+import pytest
+from app.services.downloader import profiles
+from app.services.downloader.profiles import get_profile, resolve_profile, ytdlp_options
+
+
+def test_source_keeps_progressive_mp4():
+    assert ytdlp_options("source") == {"format": "best[ext=mp4]/best"}
+
+
+def test_shorts_1080_merges_and_prefers_h264_aac():
+    options = ytdlp_options("shorts_1080")
+    assert options["format"] == "bv*+ba/best"
+    assert options["format_sort"] == ["res:1080", "vcodec:h264", "acodec:aac"]
+    assert options["merge_output_format"] == "mp4"
+    assert options["concurrent_fragment_downloads"] == 4
+
+
+def test_size_cap_applies_to_every_alternative():
+    options = ytdlp_options("shorts_720")
+    cap = f"[filesize<=?{100 * 1024 * 1024}]"
+    assert options["format"] == f"bv*{cap}+ba/best{cap}"
+    assert options["format_sort"][0] == "res:720"
+
+
+def test_audio_only():
+    options = ytdlp_options("audio")
+    assert options["format"].startswith("ba[ext=m4a]/")
+    assert options["format_sort"] == ["acodec:aac"]
+    assert "merge_output_format" not in options
+
+
+def test_resolution_order(monkeypatch):
+    monkeypatch.setattr(profiles.settings, "DOWNLOAD_GROUP_PROFILES", {"podcasts": "audio"})
+    monkeypatch.setattr(profiles.settings, "DOWNLOAD_PLATFORM_PROFILES", {"youtube": "shorts_720"})
+    monkeypatch.setattr(profiles.settings, "DOWNLOAD_DEFAULT_PROFILE", "source")
+    assert resolve_profile("youtube", "podcasts", "shorts_1080") == "shorts_1080"
+    assert resolve_profile("youtube", "podcasts") == "audio"
+    assert resolve_profile("youtube", "other") == "shorts_720"
+    assert resolve_profile("tiktok") == "source"
+
+
+def test_invalid_profiles(monkeypatch):
+    with pytest.raises(ValueError):
+        get_profile("nope")
+    monkeypatch.setattr(profiles.settings, "DOWNLOAD_PROFILES", {"bad": {"max_resolution": "1080"}})
+    with pytest.raises(ValueError):
+        get_profile("bad")
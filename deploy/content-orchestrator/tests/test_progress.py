@@ -0,0 +1,42 @@
+import asyncio
+from app.api.routes import progress as progress_routes
+from app.services.progress.bus import ProgressBus
+
+
+class FakeQueue:
+    def __init__(self, job):
+        self.job = job
+
+    def get(self, job_id):
+        return self.job if job_id == self.job["job_id"] else None
+
+
+def test_job_stream_ignores_other_profiles_of_the_same_video(monkeypatch):
+    bus = ProgressBus(queue_size=100, interval=0, stall_after=60)
+    job = {
+        "job_id": "j1",
+        "state": "running",
+        "payload": {"external_video_id": "v1", "profile": "shorts_1080"},
+        "path": None,
+        "error": None,
+    }
+    monkeypatch.setattr(progress_routes, "get_progress_bus", lambda: bus)
+    monkeypatch.setattr(progress_routes, "get_download_queue", lambda: FakeQueue(job))
+
+    async def run():
+        events = []
+        stream = progress_routes._job_events(job)
+        events.append(await stream.__anext__())
+        bus.start("v1", "g", "audio")
+        bus.finish("v1", "g", {"status": "completed", "path": "/a.m4a"}, "audio")
+        bus.start("v1", "g", "shorts_1080")
+        bus.finish("v1", "g", {"status": "completed", "path": "/v.mp4"}, "shorts_1080")
+        async for event in stream:
+            events.append(event)
+        return events
+
+    events = asyncio.run(asyncio.wait_for(run(), 5))
+
+    assert [event["type"] for event in events] == ["job", "started", "completed"]
+    assert all(event["job_id"] == "j1" for event in events)
+    assert events[-1]["path"] == "/v.mp4"
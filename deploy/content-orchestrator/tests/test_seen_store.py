@@ -0,0 +1,20 @@
+import pytest
+from app.services.seen.store import SeenStore
+
+
+@pytest.fixture
+def store(db):
+    return SeenStore(db)
+
+
+def test_unmark_counts_only_marked_ids(store):
+    store.mark(["a", "b", "c"], group_name="g")
+    assert store.unmark(["a", "a", "missing"]) == 1
+    assert store.seen_among(["a", "b", "c"]) == {"b", "c"}
+
+
+def test_unmark_across_chunks(store):
+    ids = [f"v{i}" for i in range(1200)]
+    store.mark(ids)
+    assert store.unmark(ids + ["extra"]) == 1200
+    assert store.seen_among(ids) == set()
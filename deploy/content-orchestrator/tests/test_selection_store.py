@@ -0,0 +1,83 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.services.media.store import MediaIndex
+from app.services.selection.store import CandidateStore
+
+WEIGHTS = {"views": 1.0, "recency": 0.0, "duration": 0.0, "downloaded": 0.0}
+
+
+@pytest.fixture
+def store(db):
+    MediaIndex(db)  # rank junta com a tabela de mídias (mesmo banco em produção)
+    store = CandidateStore(db)
+    store.add([
+        {"external_video_id": "low", "group_name": "g", "view_count": 10},
+        {"external_video_id": "high", "group_name": "g", "view_count": 100000},
+        {"external_video_id": "mid", "group_name": "g", "view_count": 1000},
+        {"external_video_id": "other", "group_name": "h", "view_count": 10 ** 9},
+        {"external_video_id": "broken", "error": "Timed out"},
+    ])
+    return store
+
+
+def _ids(candidates):
+    return [candidate["external_video_id"] for candidate in candidates]
+
+
+def _rank(store, **kwargs):
+    options = dict(group_name="g", limit=10, weights=WEIGHTS)
+    options.update(kwargs)
+    return store.rank("tiktok", "acc", **options)
+
+
+def test_rank_by_views_within_group(store):
+    assert _ids(_rank(store)) == ["high", "mid", "low"]
+
+
+def test_success_excludes_only_that_destination(store):
+    store.record_publish("high", "tiktok", "acc", "success")
+    assert _ids(_rank(store)) == ["mid", "low"]
+    assert _ids(store.rank("tiktok", "other-account", group_name="g", limit=10, weights=WEIGHTS))[0] == "high"
+
+
+def test_errors_count_until_max_attempts(store):
+    for _ in range(2):
+        store.record_publish("high", "tiktok", "acc", "error", error_message="boom")
+    assert "high" in _ids(_rank(store, max_attempts=3))
+    store.record_publish("high", "tiktok", "acc", "error")
+    assert "high" not in _ids(_rank(store, max_attempts=3))
+
+
+def test_reservation_lease_expires(store, monkeypatch):
+    assert _ids(_rank(store, limit=1, reserve=True)) == ["high"]
+    # Reservado: seleções seguintes pulam o vídeo até o lease vencer
+    assert _ids(_rank(store, limit=1, reserve=True, lease_seconds=60)) == ["mid"]
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert _ids(_rank(store, limit=1, lease_seconds=60)) == ["high"]
+
+
+def test_confirm_rejects_unknown_result():
+    from app.main import app
+    client = TestClient(app)
+    response = client.post("/v1/confirm_publish", json={
+        "video_id": "v1",
+        "destination_platform": "tiktok",
+        "destination_account_id": "acc",
+        "result": "published"
+    })
+    assert response.status_code == 422
+
+
+def test_publish_settled_waits_for_every_destination(store):
+    for platform, account in (("tiktok", "a"), ("instagram", "b")):
+        assert _ids(store.rank(platform, account, group_name="g", weights=WEIGHTS, reserve=True)) == ["high"]
+
+    store.record_publish("high", "tiktok", "a", "success")
+    assert not store.publish_settled("high", max_attempts=2)
+
+    store.record_publish("high", "instagram", "b", "error")
+    assert not store.publish_settled("high", max_attempts=2)
+    store.record_publish("high", "instagram", "b", "error")
+    assert store.publish_settled("high", max_attempts=2)
@@ -0,0 +1,36 @@
+import asyncio
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": len(calls)}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)), flight.do("other", work))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result == results[0] for result in results[:5])
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("test-cancel", cross_process=False)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,75 @@
+import os
+import asyncio
+import httpx
+import pytest
+from app.services.media.store import MediaIndex
+from app.services.uploader import service as uploader_module
+from app.services.uploader.service import MediaNotFoundError, UploaderService, UploadError
+
+
+@pytest.fixture
+def index(db, monkeypatch):
+    index = MediaIndex(db)
+    monkeypatch.setattr(uploader_module, "get_media_index", lambda: index)
+    monkeypatch.setattr(uploader_module.asyncio, "sleep", _no_sleep)
+    return index
+
+
+async def _no_sleep(seconds):
+    return None
+
+
+def _media(index, tmp_path, video_id="v1"):
+    path = str(tmp_path / f"{video_id}.mp4")
+    with open(path, "wb") as f:
+        f.write(b"\0" * 2048)
+    index.put(video_id, path, 2048, group_name="g")
+    return path
+
+
+def _upload(monkeypatch, handler, video_id="v1"):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(uploader_module, "get_http_client", lambda: client)
+    return asyncio.run(UploaderService().upload(video_id, "http://publisher/upload"))
+
+
+def test_missing_media_is_not_an_upstream_error(index, monkeypatch):
+    with pytest.raises(MediaNotFoundError):
+        _upload(monkeypatch, lambda request: httpx.Response(200))
+
+
+def test_upstream_404_is_an_upload_error(index, tmp_path, monkeypatch):
+    _media(index, tmp_path)
+    with pytest.raises(UploadError) as error:
+        _upload(monkeypatch, lambda request: httpx.Response(404, text="no such endpoint"))
+    assert error.value.status_code == 404
+
+
+def test_media_leased_during_upload(index, tmp_path, monkeypatch):
+    _media(index, tmp_path)
+    seen = {}
+
+    def handler(request):
+        request.read()
+        seen["candidates"] = index.eviction_candidates("g")
+        return httpx.Response(201, json={"id": "x"})
+
+    result = _upload(monkeypatch, handler)
+    assert result["status"] == "uploaded"
+    assert seen["candidates"] == []
+    assert [record["external_video_id"] for record in index.eviction_candidates("g")] == ["v1"]
+
+
+def test_file_removed_between_attempts(index, tmp_path, monkeypatch):
+    path = _media(index, tmp_path)
+    calls = []
+
+    def handler(request):
+        request.read()
+        calls.append(1)
+        os.remove(path)
+        return httpx.Response(503)
+
+    with pytest.raises(MediaNotFoundError):
+        _upload(monkeypatch, handler)
+    assert len(calls) == 1